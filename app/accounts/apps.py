@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class AccountsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "app.accounts"
+
+    def ready(self):
+        # Registra a invalidação do cache de usuários (post_save/post_delete)
+        from app.accounts.services import user_cache  # noqa: F401
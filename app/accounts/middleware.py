@@ -2,16 +2,20 @@ from urllib.parse import parse_qs
 
 from channels.db import database_sync_to_async
 from django.conf import settings
-from django.contrib.auth import get_user_model
 from django.contrib.auth.models import AnonymousUser
 from jwt import ExpiredSignatureError, InvalidTokenError
 from jwt import decode as jwt_decode
 
-User = get_user_model()
+from app.accounts.services.user_cache import user_cache
 
 
-@database_sync_to_async
-def get_user(token_key: str):
+async def get_user(token_key: str):
+    """
+    Resolve o usuário do token sem consultar o banco quando ele está em cache.
+
+    Um acerto no nível local do `user_cache` não sai do event loop; só as faltas
+    vão para a thread do ORM (cache compartilhado e, por fim, o banco).
+    """
     signing_key = settings.SIMPLE_JWT.get("SIGNING_KEY", settings.SECRET_KEY)
     algorithm = settings.SIMPLE_JWT.get("ALGORITHM", "HS256")
     user_id_claim = settings.SIMPLE_JWT.get("USER_ID_CLAIM", "user_id")
@@ -21,9 +25,13 @@ def get_user(token_key: str):
         user_id = payload.get(user_id_claim)
         if not user_id:
             return AnonymousUser()
-        return User.objects.get(id=user_id)
-    except (InvalidTokenError, ExpiredSignatureError, User.DoesNotExist):
+        user = user_cache.get_local(user_id) or await database_sync_to_async(user_cache.get)(user_id)
+    except (InvalidTokenError, ExpiredSignatureError, ValueError):
+        return AnonymousUser()
+
+    if user is None or not user.is_active:
         return AnonymousUser()
+    return user
 
 
 class JwtAuthMiddleware:
@@ -0,0 +1,143 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import structlog
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from app.accounts.models import User
+
+logger = structlog.get_logger(__name__)
+
+
+class UserCache:
+    """
+    Cache dos usuários autenticados por JWT, indexado pelo `user_id` do token.
+
+    Dois níveis, como o cache de veredictos:
+    - Local: LRU em memória do processo (`USER_CACHE_LOCAL_SIZE`), com entradas de vida
+      curta (`USER_CACHE_LOCAL_TTL` segundos).
+    - Compartilhado (opcional): cache Django (`USER_CACHE_ALIAS`, Redis em produção),
+      expirando após `USER_CACHE_TTL` segundos.
+
+    Guarda apenas os campos usados por consumers, views e permissões (`FIELDS`); o
+    usuário devolvido é uma instância com os demais campos adiados, então um `save()`
+    grava só esses campos, nunca a senha.
+
+    Salvar ou excluir um usuário (ex: desativação) invalida o nível compartilhado e o
+    local do processo que fez a alteração. Os demais processos não são avisados: eles
+    continuam aceitando a versão antiga até a entrada local expirar, ou seja, por no
+    máximo `USER_CACHE_LOCAL_TTL` segundos. Depois disso, releem o nível compartilhado
+    (já invalidado) ou o banco.
+    """
+
+    KEY_PREFIX = "accounts:user"
+    FIELDS = ("id", "name", "email", "is_active", "is_staff", "is_superuser")
+
+    def __init__(self):
+        self._local: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_local(self, user_id) -> User | None:
+        """Busca apenas no nível local; não faz I/O, então pode ser chamado no event loop."""
+        fields = self._get_local(self._key(user_id))
+        return self._build(fields) if fields is not None else None
+
+    def get(self, user_id) -> User | None:
+        """
+        Busca o usuário nos níveis local e compartilhado e, se ausente, no banco.
+
+        Args:
+            user_id: ID do usuário (claim do token)
+
+        Returns:
+            User com os campos de `FIELDS`, ou None se o usuário não existe
+        """
+        key = self._key(user_id)
+        fields = self._get_local(key)
+
+        if fields is None and settings.USER_CACHE_SHARED_ENABLED:
+            try:
+                fields = caches[settings.USER_CACHE_ALIAS].get(key)
+            except Exception as exc:
+                logger.warning("user_cache_shared_get_failed", error=str(exc))
+            if fields is not None:
+                self._store_local(key, fields)
+
+        if fields is None:
+            fields = User.objects.filter(id=user_id).values(*self.FIELDS).first()
+            if fields is None:
+                return None
+            self._set(key, fields)
+
+        return self._build(fields)
+
+    def invalidate(self, user_id) -> None:
+        """Remove o usuário dos dois níveis."""
+        key = self._key(user_id)
+        with self._lock:
+            self._local.pop(key, None)
+
+        if settings.USER_CACHE_SHARED_ENABLED:
+            try:
+                caches[settings.USER_CACHE_ALIAS].delete(key)
+            except Exception as exc:
+                logger.warning("user_cache_shared_delete_failed", error=str(exc))
+
+    def clear(self) -> None:
+        """Esvazia o nível local do processo."""
+        with self._lock:
+            self._local.clear()
+
+    def _set(self, key: str, fields: dict) -> None:
+        self._store_local(key, fields)
+
+        if settings.USER_CACHE_SHARED_ENABLED:
+            try:
+                caches[settings.USER_CACHE_ALIAS].set(key, fields, timeout=settings.USER_CACHE_TTL)
+            except Exception as exc:
+                logger.warning("user_cache_shared_set_failed", error=str(exc))
+
+    def _get_local(self, key: str) -> dict | None:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return None
+            expires_at, fields = entry
+            if expires_at <= now:
+                del self._local[key]
+                return None
+            self._local.move_to_end(key)
+            return fields
+
+    def _store_local(self, key: str, fields: dict) -> None:
+        # Vida curta: limita a janela em que outros processos enxergam um usuário já desativado
+        expires_at = time.monotonic() + min(settings.USER_CACHE_LOCAL_TTL, settings.USER_CACHE_TTL)
+        with self._lock:
+            self._local[key] = (expires_at, fields)
+            self._local.move_to_end(key)
+            while len(self._local) > settings.USER_CACHE_LOCAL_SIZE:
+                self._local.popitem(last=False)
+
+    def _build(self, fields: dict) -> User:
+        return User.from_db("default", list(self.FIELDS), [fields[name] for name in self.FIELDS])
+
+    def _key(self, user_id) -> str:
+        return f"{self.KEY_PREFIX}:{uuid.UUID(str(user_id))}"
+
+
+user_cache = UserCache()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance: User, **kwargs) -> None:
+    """Invalida o usuário alterado ou excluído (de novo após o commit, para não recachear o valor antigo)."""
+    user_cache.invalidate(instance.pk)
+    transaction.on_commit(lambda: user_cache.invalidate(instance.pk))
@@ -0,0 +1,137 @@
+import time
+import uuid
+
+import pytest
+from model_bakery import baker
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from app.accounts.middleware import get_user
+from app.accounts.models import User
+from app.accounts.services.user_cache import UserCache, user_cache
+
+
+@pytest.mark.unit
+@pytest.mark.django_db
+class TestUserCache:
+    """Testes do cache de usuários autenticados."""
+
+    def test_second_lookup_skips_database(self, user: User, django_assert_num_queries) -> None:
+        with django_assert_num_queries(1):
+            user_cache.get(user.id)
+        with django_assert_num_queries(0):
+            cached = user_cache.get(user.id)
+
+        assert cached.pk == user.pk
+        assert (cached.name, cached.email, cached.is_active) == (user.name, user.email, True)
+
+    def test_shared_tier_serves_other_processes(self, user: User, django_assert_num_queries) -> None:
+        user_cache.get(user.id)
+        user_cache.clear()
+
+        with django_assert_num_queries(0):
+            assert user_cache.get(user.id).pk == user.pk
+
+    def test_save_invalidates_cached_user(self, user: User) -> None:
+        user_cache.get(user.id)
+
+        user.is_active = False
+        user.save()
+
+        assert user_cache.get(user.id).is_active is False
+
+    def test_deactivation_reaches_other_processes_within_local_ttl(self, user: User, settings, monkeypatch) -> None:
+        other_process = UserCache()
+        assert other_process.get(user.id).is_active is True
+
+        user.is_active = False
+        user.save()
+
+        # Outro processo: o nível compartilhado já foi invalidado, mas a entrada local vale até expirar
+        assert UserCache().get(user.id).is_active is False
+        assert other_process.get(user.id).is_active is True
+
+        now = time.monotonic()
+        monkeypatch.setattr(time, "monotonic", lambda: now + settings.USER_CACHE_LOCAL_TTL + 0.1)
+        assert other_process.get(user.id).is_active is False
+
+    def test_delete_invalidates_cached_user(self, user: User) -> None:
+        user_cache.get(user.id)
+        user_id = user.id
+
+        user.delete()
+
+        assert user_cache.get(user_id) is None
+
+    def test_cached_user_save_never_touches_password(self, user: User) -> None:
+        user.set_password("segredo-123")
+        user.save()
+
+        cached = user_cache.get(user.id)
+        cached.name = "Novo Nome"
+        cached.save()
+
+        user.refresh_from_db()
+        assert user.name == "Novo Nome"
+        assert user.check_password("segredo-123")
+
+
+@pytest.mark.integration
+@pytest.mark.django_db(transaction=True)
+class TestJwtAuthMiddlewareCache:
+    """Testes da resolução de usuário do WebSocket."""
+
+    async def test_inactive_user_is_anonymous(self) -> None:
+        from channels.db import database_sync_to_async
+
+        inactive = await database_sync_to_async(baker.make)(User, is_active=False)
+
+        user = await get_user(str(AccessToken.for_user(inactive)))
+
+        assert not user.is_authenticated
+
+    async def test_local_hit_resolves_without_thread_hop(self, monkeypatch) -> None:
+        from channels.db import database_sync_to_async
+
+        cached_user = await database_sync_to_async(baker.make)(User)
+        await database_sync_to_async(user_cache.get)(cached_user.id)
+        monkeypatch.setattr("app.accounts.middleware.database_sync_to_async", None)
+
+        user = await get_user(str(AccessToken.for_user(cached_user)))
+
+        assert user.pk == cached_user.pk
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+class TestCachedJWTAuthentication:
+    """Testes da autenticação REST com usuário em cache."""
+
+    def test_repeated_requests_skip_user_query(
+        self, authenticated_client: APIClient, user: User, django_assert_num_queries
+    ) -> None:
+        authenticated_client.get(f"/api/auth/users/{user.id}/")
+
+        # Apenas a consulta do próprio endpoint
+        with django_assert_num_queries(1):
+            response = authenticated_client.get(f"/api/auth/users/{user.id}/")
+
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_deactivated_user_is_rejected(self, authenticated_client: APIClient, user: User) -> None:
+        authenticated_client.get(f"/api/auth/users/{user.id}/")
+
+        user.is_active = False
+        user.save()
+
+        response = authenticated_client.get(f"/api/auth/users/{user.id}/")
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_unknown_user_is_rejected(self, api_client: APIClient) -> None:
+        token = AccessToken()
+        token["user_id"] = str(uuid.uuid4())
+        api_client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+        response = api_client.get("/api/auth/users/")
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
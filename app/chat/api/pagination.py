@@ -1,9 +1,99 @@
-from rest_framework.pagination import CursorPagination
+import uuid
+from datetime import timedelta
 
+from django.conf import settings
+from django.utils import timezone
+from rest_framework.response import Response
 
-class MessageCursorPagination(CursorPagination):
-    """Paginação por cursor para mensagens (scroll infinito)."""
+from app.utils.pagination import KeysetPagination
+
+
+def settled_sync_position() -> tuple:
+    """
+    Posição de sincronização até a qual as alterações de mensagens já estão visíveis.
+
+    `updated_at` é gerado pela aplicação antes do commit, então uma transação lenta
+    pode gravar um valor menor que o de outra já lida. A sincronização só avança até
+    `MESSAGE_SYNC_SETTLE_SECONDS` atrás, para que essas linhas não fiquem para trás do token.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.MESSAGE_SYNC_SETTLE_SECONDS)
+    return cutoff, uuid.UUID(int=0)
+
+
+class MessageCursorPagination(KeysetPagination):
+    """
+    Paginação keyset em (created_at, id) para mensagens (scroll infinito).
+
+    A primeira página também traz o token `since`, a partir do qual o cliente
+    sincroniza as mensagens criadas ou alteradas depois da leitura.
+    """
 
     page_size = 20
-    ordering = "-created_at"
-    cursor_query_param = "cursor"
+    page_size_query_param = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        # Calculado antes da leitura: o que mudar durante a consulta entra no próximo delta
+        self.since = None if request.query_params.get(self.cursor_query_param) else settled_sync_position()
+        return super().paginate_queryset(queryset, request, view)
+
+    def paginate_serialized(self, rows: list[dict], request, position) -> list[dict]:
+        """
+        Primeira página a partir de mensagens já serializadas (cache do histórico).
+
+        Args:
+            rows: Até `page_size + 1` mensagens em (created_at, id) decrescente
+            request: Requisição atual
+            position: Função que extrai (created_at, id) de uma mensagem serializada
+
+        Returns:
+            Mensagens da página
+        """
+        self.request = request
+        self.since = settled_sync_position()
+        self.has_next = len(rows) > self.page_size
+        rows = rows[: self.page_size]
+        self.next_position = position(rows[-1]) if self.has_next else None
+        return rows
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        if self.since is not None:
+            response.data["since"] = self.encode_position(self.since)
+        return response
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema["properties"]["since"] = {"type": "string"}
+        return response_schema
+
+
+class MessageSyncPagination(KeysetPagination):
+    """
+    Sincronização incremental: mensagens criadas ou alteradas (ex: veredicto de moderação)
+    depois do token `since`, da mais antiga para a mais recente em (updated_at, id).
+    """
+
+    page_size = 100
+    page_size_query_param = None
+    cursor_query_param = "since"
+    ordering = ("updated_at", "id")
+    invalid_cursor_message = "Token de sincronização inválido"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        cutoff, _ = settled_sync_position()
+        return super().paginate_queryset(queryset.filter(updated_at__lte=cutoff), request, view)
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "since": self.encode_position(self.last_position),
+                "results": data,
+            }
+        )
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema["properties"]["since"] = {"type": "string"}
+        return response_schema
@@ -35,7 +35,9 @@ class RoomSerializer(serializers.ModelSerializer):
         read_only_fields = fields
 
     def get_participants_count(self, obj: Room) -> int:
-        return obj.memberships.count()
+        # Anotado por `Room.objects.with_participants_count()`; salas avulsas fazem a contagem.
+        count = getattr(obj, "participants_count", None)
+        return count if count is not None else obj.memberships.count()
 
 
 class RoomDetailSerializer(RoomSerializer):
@@ -68,5 +70,5 @@ class MessageSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Message
-        fields = ["id", "content", "status", "created_at", "author"]
+        fields = ["id", "content", "status", "created_at", "updated_at", "author"]
         read_only_fields = fields
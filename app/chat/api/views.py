@@ -1,5 +1,6 @@
-from django.db.models import Q
-from drf_spectacular.utils import extend_schema, extend_schema_view
+from asgiref.sync import async_to_sync
+from django.db.models import Prefetch
+from drf_spectacular.utils import OpenApiParameter, extend_schema, extend_schema_view
 from rest_framework import status
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
@@ -8,7 +9,7 @@ from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
 
 from app.accounts.models import User
-from app.chat.api.pagination import MessageCursorPagination
+from app.chat.api.pagination import MessageCursorPagination, MessageSyncPagination
 from app.chat.api.permissions import IsRoomAdmin, IsRoomParticipant, IsRoomParticipantOrPublic
 from app.chat.api.serializers import (
     AddParticipantSerializer,
@@ -18,8 +19,10 @@ from app.chat.api.serializers import (
     RoomParticipantSerializer,
     RoomSerializer,
 )
-from app.chat.models import Message, Room
+from app.chat.models import Message, Room, RoomParticipant
+from app.chat.services.history_cache import recent_messages_cache
 from app.chat.services.room_service import RoomService
+from app.utils.pagination import KeysetPagination
 
 
 @extend_schema_view(
@@ -38,17 +41,29 @@ class RoomViewSet(ModelViewSet):
 
     permission_classes = [IsAuthenticated]
     serializer_class = RoomSerializer
+    pagination_class = KeysetPagination
     lookup_field = "pk"
 
     def get_queryset(self):
         if self.action == "messages":
-            return Room.objects.all().prefetch_related("memberships")
+            return Room.objects.all()
 
-        return (
-            Room.objects.filter(Q(participants=self.request.user) | Q(is_private=False))
-            .prefetch_related("memberships")
-            .order_by("-created_at")
-        )
+        queryset = Room.objects.visible_to(self.request.user).with_participants_count().order_by("-created_at")
+
+        if self.action == "retrieve":
+            queryset = queryset.prefetch_related(
+                Prefetch("memberships", queryset=RoomParticipant.objects.select_related("user"))
+            )
+
+        return queryset
+
+    def list(self, request: Request, *args, **kwargs) -> Response:
+        """Lista salas públicas e privadas do usuário, paginadas por keyset em (created_at, id)."""
+        branches = [branch.with_participants_count() for branch in Room.objects.visible_branches(request.user)]
+        page = self.paginate_queryset(branches)
+
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
     def get_serializer_class(self):
         if self.action == "create":
@@ -117,12 +132,19 @@ class RoomViewSet(ModelViewSet):
                 status=status.HTTP_404_NOT_FOUND,
             )
 
-        RoomService.remove_participant(room=room, user_to_remove=user_to_remove, requester=request.user)
+        async_to_sync(RoomService.remove_participant)(room=room, user_to_remove=user_to_remove, requester=request.user)
 
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @extend_schema(
         summary="Listar mensagens da sala",
+        parameters=[
+            OpenApiParameter(
+                "since",
+                str,
+                description="Token de sincronização: retorna só mensagens criadas ou alteradas depois dele",
+            )
+        ],
         responses={200: MessageSerializer(many=True)},
         tags=["Messages"],
     )
@@ -139,24 +161,32 @@ class RoomViewSet(ModelViewSet):
         - Todas as mensagens com status APPROVED.
         - Mensagens do próprio usuário (mesmo se PENDING ou REJECTED).
 
+        Com `since` (token devolvido pela primeira página ou pela sincronização anterior),
+        retorna apenas o delta: mensagens criadas ou com status alterado depois do token.
+
         Acesso:
         - Sala pública: Qualquer usuário autenticado
         - Sala privada: Apenas participantes
         """
         room = self.get_object()
 
-        queryset = (
-            Message.objects.filter(Q(room=room), Q(status=Message.Status.APPROVED) | Q(author=request.user))
-            .select_related("author")
-            .order_by("-created_at")
-        )
-
-        paginator = MessageCursorPagination()
-        page = paginator.paginate_queryset(queryset, request)
-
-        if page is not None:
-            serializer = MessageSerializer(page, many=True)
-            return paginator.get_paginated_response(serializer.data)
-
-        serializer = MessageSerializer(queryset, many=True)
-        return Response(serializer.data)
+        if MessageSyncPagination.cursor_query_param in request.query_params:
+            paginator = MessageSyncPagination()
+            page = paginator.paginate_queryset(
+                Message.objects.visible_in(room, request.user).select_related("author"), request
+            )
+        else:
+            paginator = MessageCursorPagination()
+            if recent_messages_cache.is_enabled() and not request.query_params.get(paginator.cursor_query_param):
+                rows = recent_messages_cache.first_page(room, request.user)
+                if rows is not None:
+                    page = paginator.paginate_serialized(rows, request, recent_messages_cache.position)
+                    return paginator.get_paginated_response(page)
+
+            branches = [
+                branch.select_related("author") for branch in Message.objects.history_branches(room, request.user)
+            ]
+            page = paginator.paginate_queryset(branches, request)
+
+        serializer = MessageSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
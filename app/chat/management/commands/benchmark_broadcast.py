@@ -0,0 +1,92 @@
+import json
+import time
+
+import msgpack
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from app.accounts.models import User
+from app.chat.models import Message, Room
+from app.chat.services.broadcast_service import BroadcastService
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede o custo de CPU por broadcast (serialização por destinatário vs frame pré-serializado) e compara "
+        "bytes e tempo por broadcast entre JSON e o subprotocolo MessagePack."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", default="10,100,1000,5000", help="Tamanhos de sala (CSV)")
+        parser.add_argument("--broadcasts", type=int, default=50, help="Broadcasts medidos por tamanho")
+        parser.add_argument("--content-length", type=int, default=280, help="Tamanho do conteúdo da mensagem")
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options["sizes"].split(",")]
+        broadcasts = options["broadcasts"]
+        message = Message(
+            room=Room(name="Benchmark"),
+            author=User(name="Autor Benchmark", email="autor@example.com"),
+            content="á" * options["content_length"],
+            status=Message.Status.APPROVED,
+            created_at=timezone.now(),
+        )
+
+        payload = BroadcastService._room_payload(message)
+
+        self.stdout.write(f"{'membros':>8} {'legado (ms)':>12} {'frame (ms)':>11} {'ganho':>7}")
+
+        for size in sizes:
+            legacy_ms = self._measure(broadcasts, lambda: self._legacy_fan_out(payload, size))
+            frame_ms = self._measure(broadcasts, lambda: self._frame_fan_out(message, size))
+            self.stdout.write(f"{size:>8} {legacy_ms:>12.3f} {frame_ms:>11.3f} {legacy_ms / frame_ms:>6.1f}x")
+
+        # Bytes no fio e CPU por broadcast: codificação uma vez no servidor + decodificação em cada cliente
+        event = BroadcastService._build_event("chat_message", payload, room_id=message.room_id, seq=1)
+        json_frame, packed_frame = event["frame"].encode(), event["packed"]
+        self.stdout.write("")
+        self.stdout.write(f"frame JSON: {len(json_frame)} bytes; MessagePack: {len(packed_frame)} bytes")
+        self.stdout.write(
+            f"{'membros':>8} {'JSON (KB)':>10} {'msgpack (KB)':>13} {'JSON (ms)':>10} {'msgpack (ms)':>13}"
+        )
+        for size in sizes:
+            json_ms = self._measure(broadcasts, lambda: self._json_wire(payload, size))
+            packed_ms = self._measure(broadcasts, lambda: self._msgpack_wire(payload, size))
+            self.stdout.write(
+                f"{size:>8} {len(json_frame) * size / 1024:>10.1f} {len(packed_frame) * size / 1024:>13.1f} "
+                f"{json_ms:>10.3f} {packed_ms:>13.3f}"
+            )
+
+    @staticmethod
+    def _measure(broadcasts: int, fan_out) -> float:
+        started = time.process_time()
+        for _ in range(broadcasts):
+            fan_out()
+        return (time.process_time() - started) * 1000 / broadcasts
+
+    @staticmethod
+    def _legacy_fan_out(payload: dict, size: int) -> None:
+        # Evento com dict; cada consumer faz json.dumps antes de enviar.
+        event = {"type": "chat_message", "message": payload}
+        for _ in range(size):
+            json.dumps({"type": "chat_message", "message": event["message"]})
+
+    @staticmethod
+    def _frame_fan_out(message: Message, size: int) -> None:
+        # Frame serializado uma vez; cada consumer apenas o repassa.
+        event = BroadcastService._build_event("chat_message", BroadcastService._room_payload(message))
+        for _ in range(size):
+            event.get("frame")
+
+    @staticmethod
+    def _json_wire(payload: dict, size: int) -> None:
+        frame = BroadcastService._build_event("chat_message", payload, seq=1)["frame"]
+        for _ in range(size):
+            json.loads(frame)
+
+    @staticmethod
+    def _msgpack_wire(payload: dict, size: int) -> None:
+        packed = BroadcastService._build_event("chat_message", payload, seq=1)["packed"]
+        for _ in range(size):
+            # O cliente usa os nomes curtos diretamente
+            msgpack.unpackb(packed)
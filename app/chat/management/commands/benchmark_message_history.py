@@ -0,0 +1,125 @@
+import random
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from app.accounts.models import User
+from app.chat.api.views import RoomViewSet
+from app.chat.models import Message, Room
+from app.chat.services.history_cache import recent_messages_cache
+
+SEED_SQL = """
+INSERT INTO accounts_user (id, created_at, updated_at, password, name, email, is_active, is_staff, is_superuser)
+SELECT gen_random_uuid(), now(), now(), '!', 'bench ' || i, 'bench-' || i || '@example.com', true, false, false
+FROM generate_series(0, %(users)s - 1) AS i;
+
+INSERT INTO chat_room (id, created_at, updated_at, name, is_private)
+VALUES (gen_random_uuid(), now(), now(), 'bench history', false);
+
+CREATE TEMP TABLE bench_users ON COMMIT DROP AS
+    SELECT row_number() OVER () - 1 AS n, id FROM accounts_user WHERE email LIKE 'bench-%%';
+CREATE INDEX ON bench_users (n);
+
+INSERT INTO chat_message (id, created_at, updated_at, room_id, author_id, content, status, moderation_lease_owner)
+SELECT gen_random_uuid(), now() - g.i * interval '10 milliseconds', now(),
+       (SELECT id FROM chat_room WHERE name = 'bench history'), u.id, 'mensagem ' || g.i,
+       CASE WHEN g.i %% 20 = 0 THEN 'PENDING' WHEN g.i %% 20 = 1 THEN 'REJECTED' ELSE 'APPROVED' END, ''
+FROM generate_series(0::bigint, %(messages)s - 1) AS g(i)
+JOIN bench_users u ON u.n = (g.i * 7919) %% %(users)s;
+
+ANALYZE accounts_user;
+ANALYZE chat_message;
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede a latência da primeira página do histórico (p50/p95) com e sem o cache de mensagens "
+        "recentes numa sala quente. Os dados são criados numa transação e descartados ao final."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--messages", type=int, default=1_000_000)
+        parser.add_argument("--users", type=int, default=200)
+        parser.add_argument("--requests", type=int, default=2_000, help="Leituras medidas por cenário")
+        parser.add_argument(
+            "--approve-every", type=int, default=20, help="Aprova uma mensagem pendente a cada N leituras (0 desliga)"
+        )
+        parser.add_argument(
+            "--local-cache", action="store_true", help="Usa LocMemCache em vez do cache configurado (sem Redis)"
+        )
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        cache_settings = {}
+        if options["local_cache"]:
+            cache_settings = {
+                "CACHES": {
+                    **settings.CACHES,
+                    "benchmark": {
+                        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                        "OPTIONS": {"MAX_ENTRIES": 100_000},
+                    },
+                },
+                "MESSAGE_HISTORY_CACHE_ALIAS": "benchmark",
+            }
+
+        with transaction.atomic(), override_settings(ALLOWED_HOSTS=["testserver"], **cache_settings):
+            started = time.perf_counter()
+            with connection.cursor() as cursor:
+                cursor.execute(SEED_SQL, options)
+            self.stdout.write(f"massa: {options['messages']} mensagens ({time.perf_counter() - started:.1f}s)")
+
+            room = Room.objects.get(name="bench history")
+            rng = random.Random(options["seed"])
+            users = list(User.objects.filter(email__startswith="bench-"))
+            sample = [rng.choice(users) for _ in range(options["requests"])]
+
+            with override_settings(MESSAGE_HISTORY_CACHE_ENABLED=False):
+                self._report("banco (UNION ALL + JOIN)", [self._time_first_page(room, user) for user in sample])
+
+            pending = list(Message.objects.filter(room=room, status=Message.Status.PENDING).order_by("-created_at"))
+            recent_messages_cache.reset_stats()
+            with override_settings(MESSAGE_HISTORY_CACHE_ENABLED=True):
+                samples = []
+                for i, user in enumerate(sample, start=1):
+                    samples.append(self._time_first_page(room, user))
+                    if options["approve_every"] and i % options["approve_every"] == 0 and pending:
+                        self._approve(pending.pop(0))
+                self._report("cache de mensagens recentes", samples)
+
+            stats = recent_messages_cache.stats()
+            self.stdout.write(
+                f"cache: {stats['hits']} acertos, {stats['misses']} faltas (taxa de acerto {stats['hit_rate']:.1%})"
+            )
+
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def _approve(message: Message) -> None:
+        message.status = Message.Status.APPROVED
+        message.save(update_fields=["status", "updated_at"])
+        # Dentro da transação do benchmark o on_commit não dispara; chama o mesmo ponto diretamente.
+        recent_messages_cache.on_verdicts([message])
+
+    @staticmethod
+    def _time_first_page(room: Room, user: User) -> float:
+        request = APIRequestFactory().get(f"/api/chat/rooms/{room.id}/messages/")
+        force_authenticate(request, user=user)
+        view = RoomViewSet.as_view({"get": "messages"})
+
+        started = time.perf_counter()
+        response = view(request, pk=str(room.id))
+        response.render()
+        return (time.perf_counter() - started) * 1000
+
+    def _report(self, label: str, samples: list[float]) -> None:
+        quantiles = statistics.quantiles(samples, n=100, method="inclusive")
+        self.stdout.write(
+            f"{label:<38} p50={quantiles[49]:7.2f}ms  p95={quantiles[94]:7.2f}ms  max={max(samples):7.2f}ms"
+        )
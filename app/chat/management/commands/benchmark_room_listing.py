@@ -0,0 +1,114 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+from django.test.utils import override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from app.accounts.models import User
+from app.chat.api.serializers import RoomSerializer
+from app.chat.api.views import RoomViewSet
+from app.chat.models import Room
+
+SEED_SQL = """
+INSERT INTO accounts_user (id, created_at, updated_at, password, name, email, is_active, is_staff, is_superuser)
+SELECT gen_random_uuid(), now(), now(), '!', 'bench ' || i, 'bench-' || i || '@example.com', true, false, false
+FROM generate_series(0, %(users)s - 1) AS i;
+
+INSERT INTO chat_room (id, created_at, updated_at, name, is_private)
+SELECT gen_random_uuid(), now() - i * interval '1 second', now(), 'bench ' || i, i %% 5 <> 0
+FROM generate_series(0, %(rooms)s - 1) AS i;
+
+CREATE TEMP TABLE bench_users ON COMMIT DROP AS
+    SELECT row_number() OVER () - 1 AS n, id FROM accounts_user WHERE email LIKE 'bench-%%';
+CREATE TEMP TABLE bench_rooms ON COMMIT DROP AS
+    SELECT row_number() OVER () - 1 AS n, id FROM chat_room WHERE name LIKE 'bench %%';
+CREATE INDEX ON bench_users (n);
+CREATE INDEX ON bench_rooms (n);
+
+INSERT INTO chat_roomparticipant (id, created_at, updated_at, room_id, user_id, role)
+SELECT gen_random_uuid(), now(), now(), r.id, u.id, 'MEMBER'
+FROM generate_series(0::bigint, %(memberships)s - 1) AS g(i)
+JOIN bench_users u ON u.n = g.i %% %(users)s
+JOIN bench_rooms r ON r.n = (g.i * 7919) %% %(rooms)s
+ON CONFLICT DO NOTHING;
+
+ANALYZE accounts_user;
+ANALYZE chat_room;
+ANALYZE chat_roomparticipant;
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede a latência da listagem de salas (p50/p95) com uma massa sintética. "
+        "Os dados são criados numa transação e descartados ao final."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rooms", type=int, default=100_000)
+        parser.add_argument("--memberships", type=int, default=1_000_000)
+        parser.add_argument("--users", type=int, default=20_000)
+        parser.add_argument("--requests", type=int, default=200, help="Listagens medidas por cenário")
+        parser.add_argument("--pages", type=int, default=5, help="Páginas percorridas por listagem (via cursor)")
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        with transaction.atomic(), override_settings(ALLOWED_HOSTS=["testserver"]):
+            started = time.perf_counter()
+            with connection.cursor() as cursor:
+                cursor.execute(SEED_SQL, options)
+            self.stdout.write(
+                f"massa: {options['rooms']} salas, ~{options['memberships']} participações "
+                f"({time.perf_counter() - started:.1f}s)"
+            )
+
+            rng = random.Random(options["seed"])
+            users = list(User.objects.filter(email__startswith="bench-").only("id"))
+            sample = [rng.choice(users) for _ in range(options["requests"])]
+
+            self._report("legado (OR + JOIN + COUNT, página 1)", [self._time_legacy(user) for user in sample])
+            self._report("keyset (UNION ALL, página 1)", [self._time_keyset(user, pages=1) for user in sample])
+            self._report(
+                f"keyset ({options['pages']} páginas, por página)",
+                [self._time_keyset(user, pages=options["pages"]) / options["pages"] for user in sample],
+            )
+
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def _time_legacy(user: User) -> float:
+        # Consulta anterior: OR através do JOIN com participantes + COUNT/OFFSET da paginação por número.
+        queryset = (
+            Room.objects.filter(Q(participants=user) | Q(is_private=False))
+            .with_participants_count()
+            .order_by("-created_at")
+        )
+        started = time.perf_counter()
+        queryset.count()
+        RoomSerializer(list(queryset[:25]), many=True).data
+        return (time.perf_counter() - started) * 1000
+
+    @staticmethod
+    def _time_keyset(user: User, pages: int) -> float:
+        factory = APIRequestFactory()
+        view = RoomViewSet.as_view({"get": "list"})
+        url = "/api/chat/rooms/"
+
+        started = time.perf_counter()
+        for _ in range(pages):
+            request = factory.get(url)
+            force_authenticate(request, user=user)
+            url = view(request).data["next"]
+            if not url:
+                break
+        return (time.perf_counter() - started) * 1000
+
+    def _report(self, label: str, samples: list[float]) -> None:
+        quantiles = statistics.quantiles(samples, n=100, method="inclusive")
+        self.stdout.write(
+            f"{label:<38} p50={quantiles[49]:7.2f}ms  p95={quantiles[94]:7.2f}ms  max={max(samples):7.2f}ms"
+        )
@@ -0,0 +1,115 @@
+import asyncio
+import json
+import logging
+import statistics
+import time
+
+import orjson
+import structlog
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from websockets.asyncio.client import connect
+from websockets.asyncio.server import serve
+
+from app.chat.websockets.outbound import OutboundQueue
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede frames/s, CPU e latência de entrega de uma sala movimentada com e sem o agrupamento "
+        "adaptativo (`chat_messages`). Servidor e clientes WebSocket reais, no mesmo processo, em loopback."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--connections", type=int, default=50, help="Clientes conectados à sala")
+        parser.add_argument("--rate", type=int, default=400, help="Mensagens aprovadas por segundo na sala")
+        parser.add_argument("--seconds", type=float, default=5.0, help="Duração medida de cada cenário")
+        parser.add_argument(
+            "--warmup", type=float, default=1.5, help="Segundos iniciais não medidos (a taxa leva 1s para ser medida)"
+        )
+        parser.add_argument("--content-length", type=int, default=200, help="Tamanho do conteúdo da mensagem")
+
+    def handle(self, *args, **options):
+        logging.getLogger("websockets").setLevel(logging.WARNING)
+        self.stdout.write(
+            f"{options['connections']} conexões, {options['rate']} msg/s, "
+            f"janela {settings.WS_COALESCE_WINDOW_MS} ms, limite {settings.WS_COALESCE_RATE_THRESHOLD:g} msg/s"
+        )
+        self.stdout.write(
+            f"{'modo':<12} {'eventos/s':>10} {'frames/s':>10} {'CPU (%)':>8} "
+            f"{'CPU/1k ev (ms)':>15} {'lat p50 (ms)':>13} {'lat p95 (ms)':>13}"
+        )
+        for label, coalesce_rate in (("imediato", 0), ("adaptativo", settings.WS_COALESCE_RATE_THRESHOLD)):
+            result = asyncio.run(self._run(coalesce_rate, options))
+            self.stdout.write(
+                f"{label:<12} {result['events'] / result['wall']:>10.0f} {result['frames'] / result['wall']:>10.0f} "
+                f"{result['cpu'] / result['wall'] * 100:>8.1f} {result['cpu'] * 1e6 / result['events']:>15.2f} "
+                f"{result['p50']:>13.2f} {result['p95']:>13.2f}"
+            )
+
+    async def _run(self, coalesce_rate: float, options: dict) -> dict:
+        queues: list[OutboundQueue] = []
+        connected = asyncio.Event()
+        stats = {"frames": 0, "events": 0, "latencies": []}
+
+        async def handler(websocket):
+            queue = OutboundQueue(
+                websocket.send, log=structlog.ReturnLogger(), coalesce_rate=coalesce_rate, capacity=100_000
+            )
+            queue.start()
+            queues.append(queue)
+            if len(queues) == options["connections"]:
+                connected.set()
+            try:
+                await websocket.wait_closed()
+            finally:
+                await queue.stop()
+
+        async def client(port: int):
+            async with connect(f"ws://127.0.0.1:{port}", compression=None, max_queue=None) as websocket:
+                async for frame in websocket:
+                    data = json.loads(frame)
+                    events = data["messages"] if data["type"] == "chat_messages" else [data]
+                    now = time.perf_counter()
+                    stats["frames"] += 1
+                    stats["events"] += len(events)
+                    stats["latencies"].extend((now - event["message"]["sent_at"]) * 1000 for event in events)
+
+        async with serve(handler, "127.0.0.1", 0, compression=None) as server:
+            port = server.sockets[0].getsockname()[1]
+            clients = [asyncio.create_task(client(port)) for _ in range(options["connections"])]
+            await connected.wait()
+
+            content = "á" * options["content_length"]
+            interval = 1 / options["rate"]
+            warmup = int(options["rate"] * options["warmup"])
+            started = time.perf_counter()
+            for seq in range(warmup + int(options["rate"] * options["seconds"])):
+                if seq == warmup:
+                    stats.update(frames=0, events=0, latencies=[])
+                    measured_cpu, measured = time.process_time(), time.perf_counter()
+                # Como o `BroadcastService`: o frame é serializado uma vez e repassado a cada conexão
+                event = {"type": "chat_message", "room_id": "bench", "seq": seq}
+                frame = orjson.dumps({**event, "message": {"content": content, "sent_at": time.perf_counter()}})
+                text = frame.decode()
+                for queue in queues:
+                    queue.put(text, "bench", seq, batchable=True)
+                await asyncio.sleep(max(0.0, started + (seq + 1) * interval - time.perf_counter()))
+
+            while any(queue.depth for queue in queues):
+                await asyncio.sleep(0.01)
+            await asyncio.sleep(settings.WS_COALESCE_WINDOW_MS / 1000 * 2)
+            wall, cpu = time.perf_counter() - measured, time.process_time() - measured_cpu
+
+            server.close()
+            await asyncio.gather(*clients, return_exceptions=True)
+
+        quantiles = statistics.quantiles(stats["latencies"], n=100, method="inclusive")
+        return {
+            "frames": stats["frames"],
+            "events": stats["events"],
+            "wall": wall,
+            "cpu": cpu,
+            "p50": quantiles[49],
+            "p95": quantiles[94],
+        }
@@ -0,0 +1,92 @@
+from django.db import models
+from django.db.models import Count, Exists, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+
+class RoomQuerySet(models.QuerySet):
+    """QuerySet de salas com os filtros e anotações usados pela API."""
+
+    def visible_to(self, user) -> "RoomQuerySet":
+        """
+        Salas públicas e salas privadas das quais o usuário participa.
+
+        Usa EXISTS em vez de JOIN com participantes, então cada sala aparece uma única vez.
+        """
+        from app.chat.models import RoomParticipant
+
+        is_member = RoomParticipant.objects.filter(room=OuterRef("pk"), user=user)
+        return self.filter(Q(is_private=False) | Exists(is_member))
+
+    def with_membership(self, user) -> "RoomQuerySet":
+        """
+        Anota `is_member` (participação do usuário), para checar sala e permissão numa
+        única consulta.
+        """
+        from app.chat.models import RoomParticipant
+
+        return self.annotate(is_member=Exists(RoomParticipant.objects.filter(room=OuterRef("pk"), user=user)))
+
+    def visible_branches(self, user) -> list["RoomQuerySet"]:
+        """
+        Mesmas salas de `visible_to`, como dois ramos disjuntos para UNION ALL:
+        salas públicas e salas privadas das quais o usuário participa.
+
+        Cada ramo usa o próprio índice (parcial de salas públicas e participações do
+        usuário), ao contrário do OR entre os dois critérios numa única consulta.
+        """
+        public = self.filter(is_private=False)
+        member_private = self.filter(is_private=True, memberships__user=user)
+        return [public, member_private]
+
+    def with_participants_count(self) -> "RoomQuerySet":
+        """
+        Anota `participants_count` na própria consulta da listagem (subquery COUNT por sala),
+        sem carregar as participações em memória.
+        """
+        from app.chat.models import RoomParticipant
+
+        counts = (
+            RoomParticipant.objects.filter(room=OuterRef("pk"))
+            .order_by()
+            .values("room")
+            .annotate(total=Count("pk"))
+            .values("total")
+        )
+        return self.annotate(participants_count=Coalesce(Subquery(counts), 0))
+
+
+class MessageQuerySet(models.QuerySet):
+    """QuerySet de mensagens com as consultas usadas pela API."""
+
+    def history_branches(self, room, user) -> list["MessageQuerySet"]:
+        """
+        Histórico visível ao usuário como dois ramos disjuntos para UNION ALL:
+        mensagens APPROVED da sala e mensagens do próprio usuário ainda não aprovadas.
+
+        Cada ramo é servido por um índice parcial ordenado por (created_at, id), ao
+        contrário do OR entre status e autor numa única consulta.
+        """
+        return [self.approved_in(room), self.own_unapproved_in(room, user)]
+
+    def approved_in(self, room) -> "MessageQuerySet":
+        """Mensagens APPROVED da sala (índice `chat_message_room_approved_idx`)."""
+        from app.chat.models import Message
+
+        return self.filter(room=room, status=Message.Status.APPROVED)
+
+    def own_unapproved_in(self, room, user) -> "MessageQuerySet":
+        """Mensagens do usuário na sala ainda não aprovadas (índice `chat_message_room_own_idx`)."""
+        from app.chat.models import Message
+
+        return self.filter(~Q(status=Message.Status.APPROVED), room=room, author=user)
+
+    def visible_in(self, room, user) -> "MessageQuerySet":
+        """
+        Mensagens da sala visíveis ao usuário numa única consulta (APPROVED ou de sua autoria).
+
+        Usado pela sincronização incremental, que percorre `(room, updated_at, id)` a partir
+        do token do cliente: o delta é pequeno, então o OR é avaliado sobre poucas linhas.
+        """
+        from app.chat.models import Message
+
+        return self.filter(Q(status=Message.Status.APPROVED) | Q(author=user), room=room)
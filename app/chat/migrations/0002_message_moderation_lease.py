@@ -0,0 +1,33 @@
+# Generated by Django 5.2 on 2026-10-16 23:21
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("chat", "0001_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="message",
+            name="moderation_lease_expires_at",
+            field=models.DateTimeField(blank=True, null=True, verbose_name="Expiração do Lease de Moderação"),
+        ),
+        migrations.AddField(
+            model_name="message",
+            name="moderation_lease_owner",
+            field=models.CharField(blank=True, default="", max_length=255, verbose_name="Responsável pela Moderação"),
+        ),
+        migrations.AddIndex(
+            model_name="message",
+            index=models.Index(
+                condition=models.Q(("status", "PENDING")),
+                fields=["moderation_lease_expires_at", "created_at"],
+                name="chat_message_pending_lease_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2 on 2026-10-16 23:35
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("chat", "0002_message_moderation_lease"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="room",
+            index=models.Index(
+                condition=models.Q(("is_private", False)),
+                fields=["-created_at", "-id"],
+                name="chat_room_public_keyset_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="roomparticipant",
+            index=models.Index(fields=["user", "room"], name="chat_participant_user_room_idx"),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2 on 2026-10-16 23:38
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("chat", "0003_room_listing_keyset_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="message",
+            index=models.Index(
+                condition=models.Q(("status", "APPROVED")),
+                fields=["room", "-created_at", "-id"],
+                name="chat_message_room_approved_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="message",
+            index=models.Index(
+                condition=models.Q(("status", "APPROVED"), _negated=True),
+                fields=["room", "author", "-created_at", "-id"],
+                name="chat_message_room_own_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2 on 2026-10-16 23:43
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("chat", "0004_message_history_partial_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="message",
+            index=models.Index(fields=["room", "updated_at", "id"], name="chat_message_room_sync_idx"),
+        ),
+    ]
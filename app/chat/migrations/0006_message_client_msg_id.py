@@ -0,0 +1,28 @@
+# Generated by Django 5.2 on 2026-10-17 00:13
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("chat", "0005_message_sync_index"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="message",
+            name="client_msg_id",
+            field=models.CharField(blank=True, default="", max_length=64, verbose_name="ID da Mensagem no Cliente"),
+        ),
+        migrations.AddConstraint(
+            model_name="message",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("client_msg_id", ""), _negated=True),
+                fields=("author", "room", "client_msg_id"),
+                name="chat_message_client_msg_id_uniq",
+            ),
+        ),
+    ]
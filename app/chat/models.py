@@ -1,6 +1,7 @@
 from django.conf import settings
 from django.db import models
 
+from app.chat.managers import MessageQuerySet, RoomQuerySet
 from app.utils.models import BaseModel
 
 
@@ -11,12 +12,19 @@ class Room(BaseModel):
         settings.AUTH_USER_MODEL, through="RoomParticipant", related_name="rooms", verbose_name="Participantes"
     )
 
+    objects = RoomQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Sala"
         verbose_name_plural = "Salas"
         indexes = [
             models.Index(fields=["name"]),
             models.Index(fields=["is_private", "created_at"]),
+            models.Index(
+                fields=["-created_at", "-id"],
+                condition=models.Q(is_private=False),
+                name="chat_room_public_keyset_idx",
+            ),
         ]
 
     def __str__(self):
@@ -41,6 +49,7 @@ class RoomParticipant(BaseModel):
         indexes = [
             models.Index(fields=["room", "role"]),
             models.Index(fields=["user", "role"]),
+            models.Index(fields=["user", "room"], name="chat_participant_user_room_idx"),
         ]
 
     def __str__(self):
@@ -53,12 +62,22 @@ class Message(BaseModel):
         APPROVED = "APPROVED", "Aprovada"
         REJECTED = "REJECTED", "Rejeitada"
 
+    CLIENT_MSG_ID_MAX_LENGTH = 64
+
     room = models.ForeignKey("chat.Room", on_delete=models.CASCADE, related_name="messages", verbose_name="Sala")
     author = models.ForeignKey(
         "accounts.User", on_delete=models.CASCADE, related_name="messages", verbose_name="Autor"
     )
     content = models.TextField("Conteúdo")
     status = models.CharField("Status", max_length=20, choices=Status.choices, default=Status.PENDING, db_index=True)
+    moderation_lease_owner = models.CharField("Responsável pela Moderação", max_length=255, blank=True, default="")
+    moderation_lease_expires_at = models.DateTimeField("Expiração do Lease de Moderação", null=True, blank=True)
+    # Chave de idempotência enviada pelo cliente: reenvios com a mesma chave não criam outra mensagem
+    client_msg_id = models.CharField(
+        "ID da Mensagem no Cliente", max_length=CLIENT_MSG_ID_MAX_LENGTH, blank=True, default=""
+    )
+
+    objects = MessageQuerySet.as_manager()
 
     class Meta:
         verbose_name = "Mensagem"
@@ -66,6 +85,29 @@ class Message(BaseModel):
         indexes = [
             models.Index(fields=["room", "status", "created_at"]),
             models.Index(fields=["author", "created_at"]),
+            models.Index(
+                fields=["moderation_lease_expires_at", "created_at"],
+                condition=models.Q(status="PENDING"),
+                name="chat_message_pending_lease_idx",
+            ),
+            models.Index(
+                fields=["room", "-created_at", "-id"],
+                condition=models.Q(status="APPROVED"),
+                name="chat_message_room_approved_idx",
+            ),
+            models.Index(
+                fields=["room", "author", "-created_at", "-id"],
+                condition=~models.Q(status="APPROVED"),
+                name="chat_message_room_own_idx",
+            ),
+            models.Index(fields=["room", "updated_at", "id"], name="chat_message_room_sync_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["author", "room", "client_msg_id"],
+                condition=~models.Q(client_msg_id=""),
+                name="chat_message_client_msg_id_uniq",
+            ),
         ]
         ordering = ["created_at"]
 
@@ -1,11 +1,32 @@
-from asgiref.sync import async_to_sync
+import orjson
+import structlog
+from asgiref.sync import sync_to_async
 from channels.layers import get_channel_layer
+from django.conf import settings
 
 from app.chat.models import Message
+from app.chat.services.broadcaster import broadcaster
+from app.chat.services.replay_buffer import room_replay_buffer
+from app.chat.websockets.protocol import msgpack_protocol
+
+logger = structlog.get_logger(__name__)
 
 
 class BroadcastService:
-    """Serviço responsável por comunicação via WebSocket (Channel Layer)."""
+    """
+    Serviço responsável por comunicação via WebSocket (Channel Layer).
+
+    Os eventos carregam o frame já serializado (`frame`), codificado uma única vez
+    com orjson. Os consumers apenas o repassam ao cliente, sem re-serializar JSON
+    por destinatário. Com `WS_MSGPACK_ENABLED`, o evento leva também o frame no
+    subprotocolo MessagePack (`packed`), para as conexões que o negociaram.
+
+    Os métodos síncronos (usados pelas tasks Celery) enviam pelo `broadcaster`, que
+    reaproveita um único event loop e o pool de conexões do channel layer.
+
+    Mensagens aprovadas recebem uma sequência crescente por sala (`seq`) e ficam no
+    `room_replay_buffer`, de onde o consumer reenvia o que o cliente perdeu ao reconectar.
+    """
 
     @staticmethod
     def broadcast_message_to_room(message: Message) -> None:
@@ -15,27 +36,13 @@ class BroadcastService:
         Args:
             message: Mensagem aprovada para broadcast
         """
+        broadcaster.send_many(BroadcastService._build_room_events([message]))
 
-        channel_layer = get_channel_layer()
-        room_group_name = f"chat_{message.room.id}"
-
-        async_to_sync(channel_layer.group_send)(
-            room_group_name,
-            {
-                "type": "chat_message",
-                "message": {
-                    "id": str(message.id),
-                    "content": message.content,
-                    "author": {
-                        "id": str(message.author.id),
-                        "name": message.author.name,
-                        "email": message.author.email,
-                    },
-                    "status": message.status,
-                    "created_at": message.created_at.isoformat(),
-                },
-            },
-        )
+    @staticmethod
+    async def abroadcast_message_to_room(message: Message) -> None:
+        """Versão assíncrona de `broadcast_message_to_room`, para quem já roda num event loop."""
+        [(group, event)] = await sync_to_async(BroadcastService._build_room_events)([message])
+        await get_channel_layer().group_send(group, event)
 
     @staticmethod
     def notify_author_rejection(message: Message, details: dict) -> None:
@@ -46,18 +53,127 @@ class BroadcastService:
             message: Mensagem rejeitada
             details: Detalhes da rejeição
         """
+        broadcaster.send(f"user_{message.author.id}", BroadcastService._build_rejection_event(message, details))
+
+    @staticmethod
+    async def anotify_author_rejection(message: Message, details: dict) -> None:
+        """Versão assíncrona de `notify_author_rejection`, para quem já roda num event loop."""
+        channel_layer = get_channel_layer()
+        await channel_layer.group_send(
+            f"user_{message.author.id}", BroadcastService._build_rejection_event(message, details)
+        )
+
+    @staticmethod
+    def broadcast_many(approved: list[Message], rejected: list[tuple[Message, dict]]) -> None:
+        """
+        Envia, numa única chamada ao `broadcaster`, os broadcasts de várias mensagens
+        aprovadas e as notificações de várias rejeições (ex: lote de moderação).
+
+        Args:
+            approved: Mensagens aprovadas para broadcast nas suas salas
+            rejected: Pares (mensagem rejeitada, detalhes da rejeição)
+        """
+        items = BroadcastService._build_room_events(approved)
+        items += [
+            (f"user_{message.author.id}", BroadcastService._build_rejection_event(message, details))
+            for message, details in rejected
+        ]
+        broadcaster.send_many(items)
+
+    @staticmethod
+    async def anotify_membership_revoked(room_id, user_id) -> None:
+        """
+        Avisa as conexões do usuário que ele deixou de participar da sala.
+
+        Os consumers conectados a essa sala encerram o WebSocket ao receber o evento.
+
+        Args:
+            room_id: ID da sala
+            user_id: ID do usuário removido
+        """
         channel_layer = get_channel_layer()
-        user_channel_name = f"user_{message.author.id}"
+        await channel_layer.group_send(f"user_{user_id}", {"type": "membership_revoked", "room_id": str(room_id)})
+
+    @staticmethod
+    def _build_room_events(messages: list[Message]) -> list[tuple[str, dict]]:
+        """
+        Monta os eventos de mensagens aprovadas, com sequências reservadas em bloco por
+        sala e frames gravados no buffer de replay.
+
+        Se o buffer estiver indisponível, os eventos saem sem `seq`: a entrega em tempo
+        real não depende dele.
+        """
+        by_room: dict = {}
+        for message in messages:
+            by_room.setdefault(message.room_id, []).append(message)
+
+        items = []
+        for room_id, room_messages in by_room.items():
+            try:
+                sequences = room_replay_buffer.allocate(room_id, len(room_messages))
+            except Exception as exc:
+                logger.warning("replay_buffer_unavailable", room_id=str(room_id), error=str(exc))
+                sequences = [None] * len(room_messages)
+
+            events = [
+                BroadcastService._build_event(
+                    "chat_message", BroadcastService._room_payload(message), room_id=room_id, seq=seq
+                )
+                for message, seq in zip(room_messages, sequences)
+            ]
+
+            if sequences[0] is not None:
+                try:
+                    room_replay_buffer.store(room_id, [(event["seq"], event["frame"]) for event in events])
+                except Exception as exc:
+                    logger.warning("replay_buffer_unavailable", room_id=str(room_id), error=str(exc))
 
-        async_to_sync(channel_layer.group_send)(
-            user_channel_name,
+            items += [(f"chat_{room_id}", event) for event in events]
+        return items
+
+    @staticmethod
+    def _room_payload(message: Message) -> dict:
+        return {
+            "id": str(message.id),
+            "content": message.content,
+            "author": {
+                "id": str(message.author.id),
+                "name": message.author.name,
+                "email": message.author.email,
+            },
+            "status": message.status,
+            "created_at": message.created_at.isoformat(),
+        }
+
+    @staticmethod
+    def _build_rejection_event(message: Message, details: dict) -> dict:
+        return BroadcastService._build_event(
+            "message_rejected",
             {
-                "type": "message_rejected",
-                "message": {
-                    "id": str(message.id),
-                    "content": message.content,
-                    "reason": details.get("reason", "content_violation"),
-                    "created_at": message.created_at.isoformat(),
-                },
+                "id": str(message.id),
+                "content": message.content,
+                "reason": details.get("reason", "content_violation"),
+                "created_at": message.created_at.isoformat(),
             },
+            room_id=message.room_id,
         )
+
+    @staticmethod
+    def _build_event(event_type: str, payload: dict, room_id=None, seq: int | None = None) -> dict:
+        """
+        Monta o evento do channel layer com o frame já serializado (JSON e, se habilitado, MessagePack).
+
+        `room_id` e `seq` vão no evento (usados pelos consumers para filtrar e deduplicar)
+        e no frame (para o cliente identificar a sala numa conexão multiplexada).
+        """
+        event = {"type": event_type}
+        if room_id is not None:
+            event["room_id"] = str(room_id)
+        if seq is not None:
+            event["seq"] = seq
+
+        frame = {**event, "message": payload}
+        event["frame"] = orjson.dumps(frame).decode()
+        if settings.WS_MSGPACK_ENABLED:
+            event["packed"] = msgpack_protocol.encode(frame)
+        return event
@@ -0,0 +1,95 @@
+import asyncio
+import os
+import threading
+
+import structlog
+from channels.layers import get_channel_layer
+from django.conf import settings
+
+logger = structlog.get_logger(__name__)
+
+
+class ChannelLayerBroadcaster:
+    """
+    Envia eventos ao channel layer a partir de código síncrono (ex: tasks Celery).
+
+    Mantém um único event loop numa thread dedicada durante toda a vida do processo.
+    O channels_redis mantém um pool de conexões por event loop; com `async_to_sync`
+    cada chamada rodava num loop novo e abria conexões novas com o Redis. Aqui todas
+    as chamadas reutilizam o mesmo loop e, portanto, o mesmo pool.
+
+    O loop é criado sob demanda e recriado após um fork (workers prefork do Celery).
+    """
+
+    def __init__(self):
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._pid: int | None = None
+        self._lock = threading.Lock()
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop is not None and self._pid == os.getpid():
+            return self._loop
+
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid():
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="channel-layer-broadcaster", daemon=True).start()
+                self._loop, self._pid = loop, os.getpid()
+                logger.info("broadcaster_loop_started", pid=self._pid)
+
+        return self._loop
+
+    def send(self, group: str, event: dict) -> None:
+        """
+        Envia um evento para um grupo, aguardando a conclusão.
+
+        Args:
+            group: Nome do grupo no channel layer
+            event: Evento (com `type` do handler no consumer)
+        """
+        self.send_many([(group, event)])
+
+    def send_many(self, items: list[tuple[str, dict]]) -> None:
+        """
+        Envia vários eventos de uma vez, compartilhando as conexões do pool.
+
+        Os eventos de um mesmo grupo são enviados em sequência, na ordem de `items`
+        (ex: `seq` crescente de uma sala); grupos diferentes são enviados concorrentemente.
+
+        Args:
+            items: Pares (grupo, evento)
+
+        Raises:
+            Exception: O primeiro erro de envio, após todos os envios terminarem
+        """
+        if not items:
+            return
+
+        future = asyncio.run_coroutine_threadsafe(self._send_many(items), self._get_loop())
+        future.result(timeout=settings.BROADCAST_TIMEOUT_SECONDS)
+
+    @staticmethod
+    async def _send_many(items: list[tuple[str, dict]]) -> None:
+        channel_layer = get_channel_layer()
+        by_group: dict[str, list[dict]] = {}
+        for group, event in items:
+            by_group.setdefault(group, []).append(event)
+
+        async def send_group(group: str, events: list[dict]) -> list[Exception]:
+            errors = []
+            for event in events:
+                try:
+                    await channel_layer.group_send(group, event)
+                except Exception as exc:
+                    errors.append(exc)
+            return errors
+
+        results = await asyncio.gather(*(send_group(group, events) for group, events in by_group.items()))
+
+        errors = [error for group_errors in results for error in group_errors]
+        if errors:
+            logger.error("broadcast_failed", failed=len(errors), total=len(items), error=str(errors[0]))
+            raise errors[0]
+
+
+broadcaster = ChannelLayerBroadcaster()
@@ -0,0 +1,170 @@
+import threading
+import time
+import uuid
+from datetime import datetime
+
+import structlog
+from django.conf import settings
+from django.core.cache import caches
+
+from app.chat.api.pagination import MessageCursorPagination
+from app.chat.api.serializers import MessageSerializer
+from app.chat.models import Message
+
+logger = structlog.get_logger(__name__)
+
+
+class RecentMessagesCache:
+    """
+    Cache da primeira página do histórico de mensagens, já no formato do `MessageSerializer`.
+
+    Duas listas no cache Django (`MESSAGE_HISTORY_CACHE_ALIAS`, Redis em produção):
+    - Sala: as mensagens APPROVED mais recentes, reescritas a cada aprovação.
+    - Overlay por usuário: as mensagens não aprovadas mais recentes do usuário na sala,
+      invalidadas quando ele envia uma mensagem ou recebe um veredicto.
+
+    Cada lista é gravada sob uma geração, incrementada depois do commit que a altera.
+    Um preenchimento concorrente que leu o banco antes desse commit grava numa geração
+    antiga, que ninguém mais lê, em vez de sobrescrever a lista nova.
+    """
+
+    KEY_PREFIX = "chat:history"
+    # Uma mensagem a mais que a página, para saber se há `next` sem consultar o banco
+    size = MessageCursorPagination.page_size + 1
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def is_enabled() -> bool:
+        return settings.MESSAGE_HISTORY_CACHE_ENABLED
+
+    @property
+    def cache(self):
+        return caches[settings.MESSAGE_HISTORY_CACHE_ALIAS]
+
+    def first_page(self, room, user) -> list[dict] | None:
+        """
+        Mensagens mais recentes visíveis ao usuário, em (created_at, id) decrescente.
+
+        Args:
+            room: Sala do histórico
+            user: Usuário que lê o histórico
+
+        Returns:
+            Até `size` mensagens serializadas, ou None se o cache estiver indisponível
+        """
+        started = time.perf_counter()
+        try:
+            room_key = self._room_key(room.id)
+            user_key = self._user_key(room.id, user.id)
+            generations = self._generations([room_key, user_key])
+            room_key = f"{room_key}:{generations[room_key]}"
+            user_key = f"{user_key}:{generations[user_key]}"
+            cached = self.cache.get_many([room_key, user_key])
+
+            approved = cached.get(room_key)
+            if approved is None:
+                approved = self._fill(room_key, Message.objects.approved_in(room))
+            own = cached.get(user_key)
+            if own is None:
+                own = self._fill(user_key, Message.objects.own_unapproved_in(room, user))
+        except Exception as exc:
+            logger.warning("message_history_cache_failed", room_id=str(room.id), error=str(exc))
+            return None
+
+        with self._lock:
+            self.hits += len(cached)
+            self.misses += 2 - len(cached)
+
+        logger.debug(
+            "message_history_cache_read",
+            room_id=str(room.id),
+            hits=len(cached),
+            duration_ms=round((time.perf_counter() - started) * 1000, 3),
+        )
+
+        merged = sorted(approved + own, key=self.position, reverse=True)
+        return merged[: self.size]
+
+    def on_verdicts(self, messages: list[Message]) -> None:
+        """
+        Atualiza o cache depois do commit dos veredictos de moderação.
+
+        Reescreve a lista de cada sala com mensagens aprovadas e invalida o overlay
+        dos autores. Falhas do cache são registradas e não interrompem a moderação.
+
+        Args:
+            messages: Mensagens com o veredicto já gravado
+        """
+        if not self.is_enabled():
+            return
+
+        try:
+            for room_id, author_id in {(message.room_id, message.author_id) for message in messages}:
+                self._bump(self._user_key(room_id, author_id))
+
+            for room_id in {message.room_id for message in messages if message.status == Message.Status.APPROVED}:
+                key = self._room_key(room_id)
+                self._fill(f"{key}:{self._bump(key)}", Message.objects.approved_in(room_id))
+        except Exception as exc:
+            logger.warning("message_history_cache_update_failed", error=str(exc))
+
+    def invalidate_user(self, room_id: uuid.UUID, user_id: uuid.UUID) -> None:
+        """Invalida o overlay do usuário na sala (ex: nova mensagem PENDING)."""
+        if not self.is_enabled():
+            return
+
+        try:
+            self._bump(self._user_key(room_id, user_id))
+        except Exception as exc:
+            logger.warning("message_history_cache_update_failed", error=str(exc))
+
+    def stats(self) -> dict:
+        """Acertos e faltas de listas desde o início do processo (duas listas por leitura)."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / total if total else 0.0}
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+    def _fill(self, key: str, queryset) -> list[dict]:
+        rows = list(queryset.select_related("author").order_by("-created_at", "-id")[: self.size])
+        items = list(MessageSerializer(rows, many=True).data)
+        self.cache.set(key, items, timeout=settings.MESSAGE_HISTORY_CACHE_TTL)
+        return items
+
+    def _generations(self, keys: list[str]) -> dict:
+        generations = self.cache.get_many(keys)
+        for key in keys:
+            if key not in generations:
+                # Valor inicial único: se a geração for despejada, não volta a apontar para listas antigas
+                self.cache.add(key, time.time_ns(), timeout=None)
+                generations[key] = self.cache.get(key)
+        return generations
+
+    def _bump(self, key: str) -> int:
+        try:
+            return self.cache.incr(key)
+        except ValueError:
+            self.cache.add(key, time.time_ns(), timeout=None)
+            return self.cache.incr(key)
+
+    @staticmethod
+    def position(item: dict) -> tuple[datetime, uuid.UUID]:
+        """Chave (created_at, id) de uma mensagem serializada."""
+        return datetime.fromisoformat(item["created_at"]), uuid.UUID(item["id"])
+
+    def _room_key(self, room_id) -> str:
+        return f"{self.KEY_PREFIX}:room:{room_id}"
+
+    def _user_key(self, room_id, user_id) -> str:
+        return f"{self.KEY_PREFIX}:room:{room_id}:user:{user_id}"
+
+
+recent_messages_cache = RecentMessagesCache()
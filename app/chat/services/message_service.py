@@ -1,5 +1,17 @@
+import asyncio
+
+import structlog
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError
+from django.db.models import Q
+
 from app.accounts.models import User
 from app.chat.models import Message, Room
+from app.chat.services.history_cache import recent_messages_cache
+from app.utils.task_publisher import task_publisher
+
+logger = structlog.get_logger(__name__)
 
 
 class MessageService:
@@ -9,24 +21,271 @@ class MessageService:
     """
 
     @staticmethod
-    async def create_message(room: Room, author: User, content: str) -> Message:
+    async def create_message(
+        room: Room, author: User, content: str, client_msg_id: str = "", lookup: bool = True
+    ) -> tuple[Message, bool]:
         """
         Cria uma mensagem em estado PENDING e dispara moderação assíncrona.
 
+        Com `client_msg_id`, a criação é idempotente por (autor, sala, `client_msg_id`):
+        um reenvio devolve a mensagem original, sem novo INSERT nem nova moderação. A
+        busca usa o índice único da chave; uma corrida entre reenvios simultâneos é
+        resolvida pela própria restrição única.
+
+        Com o buffer de escrita ligado (`CHAT_WRITE_BUFFER_WINDOW_MS`), a mensagem é
+        gravada junto com as demais da janela e o retorno só acontece após a gravação e o
+        enfileiramento da moderação do lote.
+
+        Args:
+            room: Sala onde a mensagem será enviada
+            author: Usuário autor da mensagem
+            content: Conteúdo da mensagem
+            client_msg_id: Chave de idempotência do cliente (opcional)
+            lookup: False se o chamador já buscou a chave (`find_by_client_msg_id`); uma
+                corrida é resolvida pela restrição única, sem nova leitura antes do INSERT
+
+        Returns:
+            (mensagem, criada): a mensagem PENDING criada, ou a original e False se a
+            chave já foi usada
+        """
+        if client_msg_id and lookup:
+            existing = await MessageService.find_by_client_msg_id(room, author, client_msg_id)
+            if existing is not None:
+                return existing, False
+
+        if message_write_buffer.is_enabled():
+            return await message_write_buffer.add(room, author, content, client_msg_id)
+
+        try:
+            message = await Message.objects.acreate(
+                room=room,
+                author=author,
+                content=content,
+                status=Message.Status.PENDING,
+                client_msg_id=client_msg_id,
+            )
+        except IntegrityError:
+            if not client_msg_id:
+                raise
+            # Reenvio concorrente gravou a mesma chave entre a busca e o INSERT
+            return await MessageService.find_by_client_msg_id(room, author, client_msg_id), False
+
+        await sync_to_async(recent_messages_cache.invalidate_user)(room.id, author.id)
+        await MessageService.enqueue_moderation([str(message.id)])
+        return message, True
+
+    @staticmethod
+    async def find_by_client_msg_id(room: Room, author: User, client_msg_id: str) -> Message | None:
+        """Mensagem já gravada com a chave de idempotência do autor na sala, se houver."""
+        return await Message.objects.filter(room=room, author=author, client_msg_id=client_msg_id).afirst()
+
+    @staticmethod
+    async def enqueue_moderation(message_ids: list[str]) -> None:
+        """
+        Enfileira a moderação de mensagens recém-criadas.
+
+        Várias mensagens vão numa única `moderate_messages_batch_task` (ou para o
+        `moderation_batcher`, se ligado). Falhas no broker são apenas registradas.
+
+        Args:
+            message_ids: IDs das mensagens em estado PENDING
+        """
+        if settings.MODERATION_WORKER_MODE == "asyncio":
+            # O worker asyncio busca mensagens PENDING direto no banco; nada a enfileirar.
+            return
+
+        from app.moderation.services.batcher import moderation_batcher
+        from app.moderation.tasks import moderate_message_task, moderate_messages_batch_task
+
+        if moderation_batcher.is_enabled():
+            for message_id in message_ids:
+                await moderation_batcher.add(message_id)
+            return
+
+        try:
+            if len(message_ids) == 1:
+                await task_publisher.publish(moderate_message_task, message_ids[0])
+            else:
+                await task_publisher.publish(moderate_messages_batch_task, message_ids)
+        except Exception as exc:
+            # As mensagens já estão PENDING no banco; a varredura de leases as re-enfileira.
+            logger.error("moderation_enqueue_failed", message_ids=message_ids, error=str(exc))
+
+
+class MessageWriteBuffer:
+    """
+    Buffer de escrita de mensagens do processo ASGI (opcional).
+
+    Em vez de um INSERT por `chat_message`, as mensagens recebidas esperam até
+    `CHAT_WRITE_BUFFER_WINDOW_MS` (ou até `CHAT_WRITE_BUFFER_MAX_SIZE` mensagens) e são
+    gravadas com um único `bulk_create`. Em seguida a moderação do lote inteiro é
+    enfileirada e só então cada remetente é liberado para enviar seu `message_queued`.
+
+    Ordem: os lotes são gravados um de cada vez, e dentro do lote `created_at` segue a
+    ordem de chegada ao buffer, então mensagens do mesmo processo mantêm a ordem de
+    recebimento. O `created_at` é o momento da gravação (até uma janela após o
+    recebimento). Entre processos vale o mesmo que sem o buffer.
+
+    Falhas: o ack só sai depois da gravação, então toda mensagem confirmada está no
+    banco. Se o processo morrer dentro da janela, as mensagens do buffer se perdem sem
+    ack, e o cliente as reenvia. Se o `bulk_create` falhar, nenhuma mensagem do lote é
+    gravada e todos os remetentes recebem o erro. Uma falha ao enfileirar a moderação
+    não desfaz a gravação: as mensagens ficam PENDING e a varredura de leases as
+    recupera. Um remetente que desconecta durante a espera não recebe ack, mas a
+    mensagem é gravada com o lote.
+
+    Chaves de idempotência (`client_msg_id`): um reenvio que chega com a original ainda
+    no buffer aguarda a mesma gravação, mesmo que o remetente original desconecte antes
+    dela. Conflitos com mensagens gravadas por outro processo são ignorados no
+    `bulk_create`, e o remetente recebe a mensagem já gravada.
+    """
+
+    def __init__(self):
+        self._pending: list[tuple[Message, asyncio.Future]] = []
+        # Gravação pendente de cada (autor, sala, client_msg_id) no buffer, aguardada pelos reenvios
+        self._keys: dict[tuple, asyncio.Future] = {}
+        self._timer: asyncio.TimerHandle | None = None
+        self._writing: asyncio.Task | None = None
+
+    @staticmethod
+    def is_enabled() -> bool:
+        return settings.CHAT_WRITE_BUFFER_WINDOW_MS > 0
+
+    def has_pending(self, room_id, author_id, client_msg_id: str) -> bool:
+        """Se a mensagem com a chave de idempotência do autor na sala ainda aguarda gravação no buffer."""
+        return bool(client_msg_id) and (author_id, room_id, client_msg_id) in self._keys
+
+    async def add(self, room: Room, author: User, content: str, client_msg_id: str = "") -> tuple[Message, bool]:
+        """
+        Adiciona uma mensagem ao lote corrente e aguarda sua gravação.
+
         Args:
             room: Sala onde a mensagem será enviada
             author: Usuário autor da mensagem
             content: Conteúdo da mensagem
+            client_msg_id: Chave de idempotência do cliente (opcional)
 
         Returns:
-            Message: Mensagem criada com status PENDING
+            (mensagem, criada), como `MessageService.create_message`
         """
-        message = await Message.objects.acreate(
-            room=room, author=author, content=content, status=Message.Status.PENDING
+        key = (author.id, room.id, client_msg_id)
+        if client_msg_id and key in self._keys:
+            # Reenvio da mesma mensagem ainda no buffer: aguarda a gravação da original
+            return await asyncio.shield(self._keys[key]), False
+
+        loop = asyncio.get_running_loop()
+        message = Message(
+            room=room, author=author, content=content, status=Message.Status.PENDING, client_msg_id=client_msg_id
         )
+        future = loop.create_future()
+        self._pending.append((message, future))
+        if client_msg_id:
+            # Future próprio da chave: o do remetente é cancelado se ele desconectar
+            key_future = loop.create_future()
+            key_future.add_done_callback(self._consume_outcome)
+            self._keys[key] = key_future
+
+        if len(self._pending) >= settings.CHAT_WRITE_BUFFER_MAX_SIZE:
+            self.flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(settings.CHAT_WRITE_BUFFER_WINDOW_MS / 1000, self.flush)
+
+        return await future
+
+    def flush(self) -> None:
+        """Inicia a gravação do lote corrente (se houver), depois da gravação em andamento."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        self._writing = asyncio.get_running_loop().create_task(self._write(batch, self._writing))
 
-        from app.moderation.tasks import moderate_message_task
+    async def _write(self, batch: list[tuple[Message, asyncio.Future]], previous: asyncio.Task | None) -> None:
+        if previous is not None and not previous.done():
+            await asyncio.wait({previous})
+
+        messages = [message for message, _ in batch]
+        try:
+            results = await sync_to_async(self._persist)(messages)
+        except Exception as exc:
+            logger.error("message_write_batch_failed", batch_size=len(messages), error=str(exc))
+            self._settle(batch, exc)
+            return
+
+        created = [message for message, was_created in results if was_created]
+        if created:
+            await MessageService.enqueue_moderation([str(message.id) for message in created])
+        logger.info("message_write_batch_flushed", batch_size=len(messages), duplicates=len(messages) - len(created))
+        self._settle(batch, results)
+
+    def _settle(self, batch: list[tuple[Message, asyncio.Future]], outcome: list | Exception) -> None:
+        """Entrega o resultado do lote aos remetentes e aos reenvios que aguardam cada chave."""
+        for index, (message, future) in enumerate(batch):
+            key_future = None
+            if message.client_msg_id:
+                key_future = self._keys.pop((message.author_id, message.room_id, message.client_msg_id), None)
+
+            if isinstance(outcome, Exception):
+                for waiter in (future, key_future):
+                    if waiter is not None and not waiter.done():
+                        waiter.set_exception(outcome)
+                continue
+
+            stored, was_created = outcome[index]
+            if not future.done():
+                future.set_result((stored, was_created))
+            if key_future is not None and not key_future.done():
+                key_future.set_result(stored)
+
+    @staticmethod
+    def _consume_outcome(future: asyncio.Future) -> None:
+        # Evita o aviso de exceção não lida quando nenhum reenvio aguardava a chave
+        if not future.cancelled():
+            future.exception()
+
+    @classmethod
+    def _persist(cls, messages: list[Message]) -> list[tuple[Message, bool]]:
+        """
+        Grava o lote e invalida o histórico dos autores.
+
+        Returns:
+            (mensagem gravada, criada) para cada mensagem, na mesma ordem
+        """
+        keyed = [message for message in messages if message.client_msg_id]
+        if not keyed:
+            Message.objects.bulk_create(messages)
+            cls._invalidate_history(messages)
+            return [(message, True) for message in messages]
+
+        # Com chaves de idempotência, linhas já gravadas por outro processo são puladas e
+        # cada mensagem é trocada pela linha que ficou no banco
+        Message.objects.bulk_create(messages, ignore_conflicts=True)
+        query = Q()
+        for message in keyed:
+            query |= Q(author_id=message.author_id, room_id=message.room_id, client_msg_id=message.client_msg_id)
+        stored = {
+            (message.author_id, message.room_id, message.client_msg_id): message
+            for message in Message.objects.filter(query)
+        }
+
+        results = []
+        for message in messages:
+            if not message.client_msg_id:
+                results.append((message, True))
+                continue
+            stored_message = stored[(message.author_id, message.room_id, message.client_msg_id)]
+            results.append((stored_message, stored_message.pk == message.pk))
+        cls._invalidate_history([message for message, was_created in results if was_created])
+        return results
+
+    @staticmethod
+    def _invalidate_history(messages: list[Message]) -> None:
+        for room_id, author_id in dict.fromkeys((message.room_id, message.author_id) for message in messages):
+            recent_messages_cache.invalidate_user(room_id, author_id)
 
-        moderate_message_task.delay(str(message.id))
 
-        return message
+message_write_buffer = MessageWriteBuffer()
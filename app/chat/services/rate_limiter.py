@@ -0,0 +1,213 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import redis
+import structlog
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from redis.commands.core import Script
+
+logger = structlog.get_logger(__name__)
+
+REDIS_CACHE_BACKEND = "django.core.cache.backends.redis.RedisCache"
+
+# Token bucket atômico sobre várias chaves: só consome se todos os buckets tiverem uma ficha.
+# KEYS: buckets; ARGV: (capacidade, fichas por segundo) de cada bucket, na mesma ordem.
+# Retorna a espera em segundos ("0" quando consumiu). O relógio é o do Redis, comum a todos os processos.
+ACQUIRE_SCRIPT = """
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local available = {}
+local wait = 0
+
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[2 * i - 1])
+    local rate = tonumber(ARGV[2 * i])
+    local state = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or capacity
+    local ts = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+    available[i] = tokens
+    if tokens < 1 then
+        wait = math.max(wait, (1 - tokens) / rate)
+    end
+end
+
+if wait == 0 then
+    for i, key in ipairs(KEYS) do
+        local capacity = tonumber(ARGV[2 * i - 1])
+        local rate = tonumber(ARGV[2 * i])
+        redis.call('HSET', key, 'tokens', tostring(available[i] - 1), 'ts', tostring(now))
+        redis.call('PEXPIRE', key, math.ceil(capacity / rate * 1000) + 1000)
+    end
+end
+
+return tostring(wait)
+"""
+
+
+class TokenBucket:
+    """
+    Token bucket em memória: até `capacity` fichas, repostas a `rate` fichas por segundo.
+
+    Não é thread-safe; quem compartilha um bucket entre threads deve sincronizar o acesso.
+    """
+
+    __slots__ = ("capacity", "rate", "tokens", "updated_at")
+
+    def __init__(self, capacity: int, rate: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+
+    def retry_after(self) -> float:
+        """Segundos até haver uma ficha (0.0 se já há)."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def consume(self) -> None:
+        self.tokens -= 1
+
+
+class MessageRateLimiter:
+    """
+    Limite de envio de `chat_message` por usuário, com dois orçamentos (token bucket):
+
+    - Por usuário em cada sala: `CHAT_RATE_LIMIT_ROOM_BURST` mensagens em rajada,
+      repostas a `CHAT_RATE_LIMIT_ROOM_PER_SECOND` por segundo.
+    - Por usuário em todas as salas: `CHAT_RATE_LIMIT_USER_BURST` e
+      `CHAT_RATE_LIMIT_USER_PER_SECOND`.
+
+    O estado compartilhado fica no Redis do cache `CHAT_RATE_LIMIT_CACHE_ALIAS`, num
+    cliente próprio criado a partir do `LOCATION` do cache e atualizado por um script
+    Lua atômico, então o limite vale entre processos e conexões. Antes do Redis,
+    cada conexão confere buckets locais com os mesmos orçamentos: eles só contam os envios
+    da própria conexão, então, se estão vazios, o compartilhado também está, e o frame é
+    recusado sem ida ao Redis.
+
+    Se o Redis falhar, o envio é liberado (os buckets locais continuam valendo). Com
+    outros backends de cache (`BACKEND` diferente de `RedisCache`, como o LocMemCache de
+    dev e testes), o estado compartilhado fica em memória do processo.
+    """
+
+    KEY_PREFIX = "chat:ratelimit"
+    LOCAL_STATE_SIZE = 10_000
+
+    def __init__(self):
+        # (LOCATION, script registrado no cliente Redis desse LOCATION)
+        self._script: tuple[str, Script] | None = None
+        self._buckets: OrderedDict[str, TokenBucket] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def is_enabled() -> bool:
+        return settings.CHAT_RATE_LIMIT_ENABLED
+
+    def budgets(self, room_id: uuid.UUID, user_id: uuid.UUID) -> list[tuple[str, int, float]]:
+        """
+        Buckets que um envio do usuário na sala consome.
+
+        As chaves compartilham a hash tag do usuário (`{<user_id>}`), então caem no
+        mesmo slot de um Redis Cluster e o script pode atualizá-las juntas.
+
+        Returns:
+            Lista de (chave, capacidade, fichas por segundo)
+        """
+        prefix = f"{self.KEY_PREFIX}:{{{user_id}}}"
+        return [
+            (
+                f"{prefix}:room:{room_id}",
+                settings.CHAT_RATE_LIMIT_ROOM_BURST,
+                settings.CHAT_RATE_LIMIT_ROOM_PER_SECOND,
+            ),
+            (f"{prefix}:all", settings.CHAT_RATE_LIMIT_USER_BURST, settings.CHAT_RATE_LIMIT_USER_PER_SECOND),
+        ]
+
+    async def acquire(self, local: dict[str, TokenBucket], room_id: uuid.UUID, user_id: uuid.UUID) -> float:
+        """
+        Consome uma ficha de cada orçamento do usuário na sala.
+
+        Args:
+            local: Buckets locais da conexão (preenchidos sob demanda)
+            room_id: ID da sala
+            user_id: ID do autor
+
+        Returns:
+            0.0 se o envio foi liberado; senão, segundos até a próxima ficha
+        """
+        if not self.is_enabled():
+            return 0.0
+
+        budgets = self.budgets(room_id, user_id)
+        buckets = [local.setdefault(key, TokenBucket(capacity, rate)) for key, capacity, rate in budgets]
+
+        wait = max(bucket.retry_after() for bucket in buckets)
+        if wait:
+            return wait
+
+        try:
+            wait = await sync_to_async(self.acquire_shared)(budgets)
+        except Exception as exc:
+            logger.warning("chat_rate_limit_unavailable", user_id=str(user_id), error=str(exc))
+            wait = 0.0
+
+        if not wait:
+            for bucket in buckets:
+                bucket.consume()
+        return wait
+
+    def acquire_shared(self, budgets: list[tuple[str, int, float]]) -> float:
+        """Consome as fichas no estado compartilhado, atomicamente. Retorna a espera (0.0 se liberado)."""
+        alias = settings.CHAT_RATE_LIMIT_CACHE_ALIAS
+        config = settings.CACHES[alias]
+        if config["BACKEND"] != REDIS_CACHE_BACKEND:
+            return self._acquire_in_process(budgets)
+
+        # Mesmo prefixo/versão das chaves do cache; o script roda no servidor de escrita
+        keys = [caches[alias].make_and_validate_key(key) for key, _, _ in budgets]
+        args = [value for _, capacity, rate in budgets for value in (capacity, rate)]
+        return float(self._get_script(config["LOCATION"])(keys=keys, args=args))
+
+    def _get_script(self, location: str | list[str]) -> Script:
+        """Script de token bucket registrado num cliente Redis do primeiro servidor de `location`."""
+        if isinstance(location, str):
+            location = location.split(",")
+        url = location[0]
+
+        with self._lock:
+            if self._script is None or self._script[0] != url:
+                client = redis.Redis.from_url(url)
+                self._script = (url, client.register_script(ACQUIRE_SCRIPT))
+            return self._script[1]
+
+    def reset(self) -> None:
+        """Esvazia o estado em memória do processo (backends sem Redis)."""
+        with self._lock:
+            self._buckets.clear()
+
+    def _acquire_in_process(self, budgets: list[tuple[str, int, float]]) -> float:
+        with self._lock:
+            buckets = []
+            for key, capacity, rate in budgets:
+                bucket = self._buckets.get(key)
+                if bucket is None:
+                    bucket = self._buckets[key] = TokenBucket(capacity, rate)
+                self._buckets.move_to_end(key)
+                buckets.append(bucket)
+            while len(self._buckets) > self.LOCAL_STATE_SIZE:
+                self._buckets.popitem(last=False)
+
+            wait = max(bucket.retry_after() for bucket in buckets)
+            if not wait:
+                for bucket in buckets:
+                    bucket.consume()
+            return wait
+
+
+message_rate_limiter = MessageRateLimiter()
@@ -0,0 +1,124 @@
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+class RoomReplayBuffer:
+    """
+    Sequência por sala e buffer circular dos últimos frames aprovados, no cache Django
+    (`ROOM_REPLAY_CACHE_ALIAS`, Redis em produção).
+
+    - A sequência é um contador atômico (`incr`) por sala, que expira junto com os slots
+      (`ROOM_REPLAY_TTL` após a última reserva). Quando o contador é criado (ou recriado
+      após expirar ou ser despejado), começa num valor derivado do relógio, então uma
+      sequência nunca volta a valores já entregues.
+    - O frame de sequência `seq` ocupa o slot `seq % ROOM_REPLAY_BUFFER_SIZE`, junto com
+      a própria sequência. Um slot sobrescrito por uma volta mais nova do buffer, ou
+      ausente antes de um frame gravado, indica que o intervalo pedido já não está
+      disponível.
+    - Reserva e gravação são operações separadas. Slots ainda não gravados no fim do
+      intervalo (até a sequência atual) são frames em trânsito: o replay para antes
+      deles, e o consumer, que já está no grupo da sala, os recebe ao vivo.
+    """
+
+    KEY_PREFIX = "chat:replay"
+
+    @property
+    def cache(self):
+        return caches[settings.ROOM_REPLAY_CACHE_ALIAS]
+
+    @property
+    def size(self) -> int:
+        return settings.ROOM_REPLAY_BUFFER_SIZE
+
+    def allocate(self, room_id: uuid.UUID, count: int = 1) -> list[int]:
+        """
+        Reserva `count` sequências consecutivas da sala.
+
+        Args:
+            room_id: ID da sala
+            count: Quantidade de sequências
+
+        Returns:
+            Sequências reservadas, em ordem crescente
+        """
+        key = self._seq_key(room_id)
+        try:
+            end = self.cache.incr(key, count)
+        except ValueError:
+            # Microssegundos: único entre recriações e ainda representável como inteiro em JavaScript
+            self.cache.add(key, time.time_ns() // 1000, timeout=settings.ROOM_REPLAY_TTL)
+            end = self.cache.incr(key, count)
+        else:
+            # Enquanto o contador existe, os slots da última reserva também existem
+            self.cache.touch(key, settings.ROOM_REPLAY_TTL)
+        return list(range(end - count + 1, end + 1))
+
+    def store(self, room_id: uuid.UUID, frames: list[tuple[int, str]]) -> None:
+        """
+        Grava frames já serializados nos slots das suas sequências.
+
+        Args:
+            room_id: ID da sala
+            frames: Pares (sequência, frame)
+        """
+        self.cache.set_many(
+            {self._slot_key(room_id, seq): (seq, frame) for seq, frame in frames},
+            timeout=settings.ROOM_REPLAY_TTL,
+        )
+
+    def current(self, room_id: uuid.UUID) -> int | None:
+        """Última sequência reservada na sala, ou None se a sala ainda não tem sequência."""
+        return self.cache.get(self._seq_key(room_id))
+
+    def replay(self, room_id: uuid.UUID, last_seq: int | None) -> tuple[list[str] | None, int | None]:
+        """
+        Frames posteriores a `last_seq`, em ordem.
+
+        Args:
+            room_id: ID da sala
+            last_seq: Última sequência recebida pelo cliente (None numa primeira conexão)
+
+        Returns:
+            (frames, sequência atual). `frames` é None quando o intervalo não está mais
+            no buffer (cliente muito atrasado, buffer sobrescrito ou sequência desconhecida).
+            Se os últimos slots do intervalo ainda não foram gravados, `frames` traz só
+            os anteriores a eles.
+        """
+        current = self.current(room_id)
+        if last_seq is None:
+            return [], current
+        if current is None or last_seq > current or current - last_seq > self.size:
+            return None, current
+        if last_seq == current:
+            return [], current
+
+        wanted = range(last_seq + 1, current + 1)
+        slots = self.cache.get_many([self._slot_key(room_id, seq) for seq in wanted])
+
+        frames = []
+        in_flight = False
+        for seq in wanted:
+            stored_seq, frame = slots.get(self._slot_key(room_id, seq), (None, None))
+            if stored_seq is not None and stored_seq > seq:
+                return None, current
+            if stored_seq != seq:
+                # Reservado e ainda não gravado (slot vazio ou da volta anterior)
+                in_flight = True
+            elif in_flight:
+                # Lacuna antes de um frame gravado: o slot expirou ou a gravação falhou
+                return None, current
+            else:
+                frames.append(frame)
+        return frames, current
+
+    def _seq_key(self, room_id) -> str:
+        return f"{self.KEY_PREFIX}:{room_id}:seq"
+
+    def _slot_key(self, room_id, seq: int) -> str:
+        return f"{self.KEY_PREFIX}:{room_id}:slot:{seq % self.size}"
+
+
+room_replay_buffer = RoomReplayBuffer()
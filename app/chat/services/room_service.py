@@ -4,6 +4,7 @@ from django.core.exceptions import PermissionDenied
 
 from app.accounts.models import User
 from app.chat.models import Room, RoomParticipant
+from app.chat.services.broadcast_service import BroadcastService
 
 
 class RoomService:
@@ -65,7 +66,8 @@ class RoomService:
         """
         Remove um participante da sala com validação de permissões.
 
-        Em salas privadas, apenas ADMINs podem remover membros.
+        Em salas privadas, apenas ADMINs podem remover membros. As conexões WebSocket
+        do usuário removido recebem `membership_revoked` e são encerradas.
 
         Args:
             room: Sala para remover participante
@@ -86,4 +88,7 @@ class RoomService:
             if not is_admin:
                 raise PermissionDenied("Apenas administradores podem remover membros em salas privadas.")
 
-        await RoomParticipant.objects.filter(room=room, user=user_to_remove).adelete()
+        deleted, _ = await RoomParticipant.objects.filter(room=room, user=user_to_remove).adelete()
+
+        if deleted:
+            await BroadcastService.anotify_membership_revoked(room.id, user_to_remove.id)
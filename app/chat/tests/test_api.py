@@ -1,3 +1,5 @@
+from unittest.mock import AsyncMock, patch
+
 import pytest
 from model_bakery import baker
 from rest_framework import status
@@ -5,7 +7,7 @@ from rest_framework.test import APIClient
 from rest_framework_simplejwt.tokens import RefreshToken
 
 from app.accounts.models import User
-from app.chat.api.pagination import MessageCursorPagination
+from app.chat.api.pagination import MessageCursorPagination, MessageSyncPagination
 from app.chat.models import Message, Room, RoomParticipant
 
 
@@ -57,6 +59,54 @@ class TestRoomViewSet:
         assert str(room_with_admin.id) in room_ids
         assert "participants" not in response.data["results"][0]
 
+    def test_list_rooms_counts_participants_in_constant_queries(
+        self, authenticated_client: APIClient, user: User, django_assert_num_queries
+    ) -> None:
+        private_room = baker.make(Room, is_private=True)
+        baker.make(RoomParticipant, room=private_room, user=user)
+        public_rooms = baker.make(Room, is_private=False, _quantity=3)
+        for room in public_rooms:
+            baker.make(RoomParticipant, room=room, _quantity=4)
+        baker.make(RoomParticipant, room=public_rooms[0], user=user)
+        hidden_room = baker.make(Room, is_private=True)
+
+        # autenticação + listagem (UNION ALL anotada, sem COUNT)
+        with django_assert_num_queries(2):
+            response = authenticated_client.get("/api/chat/rooms/")
+
+        counts = {room["id"]: room["participants_count"] for room in response.data["results"]}
+        assert len(response.data["results"]) == len(counts) == 4
+        assert str(hidden_room.id) not in counts
+        assert counts[str(private_room.id)] == 1
+        assert counts[str(public_rooms[0].id)] == 5
+        assert counts[str(public_rooms[1].id)] == 4
+
+    def test_list_rooms_keyset_pagination_walks_all_pages(self, authenticated_client: APIClient, user: User) -> None:
+        public_rooms = baker.make(Room, is_private=False, _quantity=4)
+        private_rooms = baker.make(Room, is_private=True, _quantity=3)
+        for room in private_rooms[:2]:
+            baker.make(RoomParticipant, room=room, user=user)
+        # Empates em created_at são desempatados pelo id
+        Room.objects.filter(id__in=[public_rooms[0].id, private_rooms[0].id]).update(
+            created_at=public_rooms[1].created_at
+        )
+
+        seen = []
+        url = "/api/chat/rooms/?page_size=2"
+        while url:
+            response = authenticated_client.get(url)
+            assert response.status_code == status.HTTP_200_OK
+            seen += [room["id"] for room in response.data["results"]]
+            url = response.data["next"]
+
+        expected = Room.objects.visible_to(user).order_by("-created_at", "-id").values_list("id", flat=True)
+        assert seen == [str(room_id) for room_id in expected]
+        assert len(seen) == 6
+
+    def test_list_rooms_invalid_cursor(self, authenticated_client: APIClient) -> None:
+        response = authenticated_client.get("/api/chat/rooms/?cursor=invalido")
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
     def test_retrieve_room_with_participants(
         self, authenticated_client: APIClient, room_with_admin: Room, user: User
     ) -> None:
@@ -100,6 +150,22 @@ class TestRoomViewSet:
 
         assert response.status_code == status.HTTP_403_FORBIDDEN
 
+    def test_remove_participant_as_admin(
+        self, authenticated_client: APIClient, member_user: User, private_room_with_admin: Room
+    ) -> None:
+        baker.make(RoomParticipant, room=private_room_with_admin, user=member_user, role=RoomParticipant.Role.MEMBER)
+
+        with patch(
+            "app.chat.services.broadcast_service.BroadcastService.anotify_membership_revoked", new=AsyncMock()
+        ) as mock_notify:
+            response = authenticated_client.delete(
+                f"/api/chat/rooms/{private_room_with_admin.id}/participants/{member_user.id}/"
+            )
+
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        assert not RoomParticipant.objects.filter(room=private_room_with_admin, user=member_user).exists()
+        mock_notify.assert_awaited_once_with(private_room_with_admin.id, member_user.id)
+
 
 @pytest.mark.integration
 @pytest.mark.django_db
@@ -163,6 +229,141 @@ class TestMessageViewSet:
         assert response.status_code == status.HTTP_200_OK
         assert len(response.data["results"]) == MessageCursorPagination.page_size
         assert response.data["next"] is not None
+        assert response.data["previous"] is None
+
+    def test_list_messages_keyset_pagination_merges_branches(
+        self, authenticated_client: APIClient, room_with_admin: Room, user: User, django_assert_num_queries, settings
+    ) -> None:
+        settings.MESSAGE_HISTORY_CACHE_ENABLED = False
+        other_user = baker.make(User, email="other@example.com")
+        for i in range(25):
+            author, status_ = [
+                (other_user, Message.Status.APPROVED),
+                (user, Message.Status.PENDING),
+                (other_user, Message.Status.REJECTED),
+                (user, Message.Status.APPROVED),
+            ][i % 4]
+            baker.make(Message, room=room_with_admin, author=author, status=status_)
+
+        seen = []
+        url = f"/api/chat/rooms/{room_with_admin.id}/messages/"
+        while url:
+            # Sessão/permissão + uma única consulta UNION ALL (autor via JOIN), seja qual for a página
+            with django_assert_num_queries(3):
+                response = authenticated_client.get(url)
+            assert response.status_code == status.HTTP_200_OK
+            seen += [message["id"] for message in response.data["results"]]
+            url = response.data["next"]
+
+        expected = (
+            Message.objects.filter(room=room_with_admin)
+            .exclude(author=other_user, status=Message.Status.REJECTED)
+            .order_by("-created_at", "-id")
+            .values_list("id", flat=True)
+        )
+        assert seen == [str(message_id) for message_id in expected]
+        assert len(seen) == 19
+
+    def test_list_messages_first_page_from_cache_continues_with_cursor(
+        self, authenticated_client: APIClient, room_with_admin: Room, user: User
+    ) -> None:
+        other_user = baker.make(User, email="other@example.com")
+        for i in range(25):
+            status_ = Message.Status.PENDING if i % 3 == 0 else Message.Status.APPROVED
+            baker.make(Message, room=room_with_admin, author=[user, other_user][i % 2], status=status_)
+
+        seen = []
+        url = f"/api/chat/rooms/{room_with_admin.id}/messages/"
+        while url:
+            response = authenticated_client.get(url)
+            assert response.status_code == status.HTTP_200_OK
+            seen += [message["id"] for message in response.data["results"]]
+            url = response.data["next"]
+
+        expected = (
+            Message.objects.visible_in(room_with_admin, user)
+            .order_by("-created_at", "-id")
+            .values_list("id", flat=True)
+        )
+        assert seen == [str(message_id) for message_id in expected]
+
+    def test_list_messages_falls_back_to_database_when_cache_fails(
+        self, authenticated_client: APIClient, room_with_admin: Room, user: User
+    ) -> None:
+        message = baker.make(Message, room=room_with_admin, author=user, status=Message.Status.APPROVED)
+
+        with patch("app.chat.api.views.recent_messages_cache.first_page", return_value=None):
+            response = authenticated_client.get(f"/api/chat/rooms/{room_with_admin.id}/messages/")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [m["id"] for m in response.data["results"]] == [str(message.id)]
+        assert "since" in response.data
+
+    def test_sync_since_returns_only_delta(
+        self, authenticated_client: APIClient, room_with_admin: Room, user: User, settings
+    ) -> None:
+        settings.MESSAGE_SYNC_SETTLE_SECONDS = 0
+        other_user = baker.make(User, email="other@example.com")
+        pending = baker.make(Message, room=room_with_admin, author=user, status=Message.Status.PENDING)
+        baker.make(Message, room=room_with_admin, author=other_user, status=Message.Status.APPROVED)
+
+        url = f"/api/chat/rooms/{room_with_admin.id}/messages/"
+        since = authenticated_client.get(url).data["since"]
+
+        pending.status = Message.Status.REJECTED
+        pending.save()
+        new = baker.make(Message, room=room_with_admin, author=other_user, status=Message.Status.APPROVED)
+        baker.make(Message, room=room_with_admin, author=other_user, status=Message.Status.PENDING)
+
+        response = authenticated_client.get(url, {"since": since})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [(m["id"], m["status"]) for m in response.data["results"]] == [
+            (str(pending.id), Message.Status.REJECTED),
+            (str(new.id), Message.Status.APPROVED),
+        ]
+        assert response.data["next"] is None
+        assert response.data["previous"] is None
+
+        response = authenticated_client.get(url, {"since": response.data["since"]})
+        assert response.data["results"] == []
+
+    def test_sync_since_paginates_by_updated_at(
+        self, authenticated_client: APIClient, room_with_admin: Room, user: User, settings, monkeypatch
+    ) -> None:
+        settings.MESSAGE_SYNC_SETTLE_SECONDS = 0
+        monkeypatch.setattr(MessageSyncPagination, "page_size", 2)
+        url = f"/api/chat/rooms/{room_with_admin.id}/messages/"
+        since = authenticated_client.get(url).data["since"]
+        messages = baker.make(Message, room=room_with_admin, author=user, _quantity=5)
+
+        seen = []
+        next_url = f"{url}?since={since}"
+        while next_url:
+            response = authenticated_client.get(next_url)
+            seen += [m["id"] for m in response.data["results"]]
+            next_url = response.data["next"]
+
+        expected = sorted(messages, key=lambda message: (message.updated_at, message.id))
+        assert seen == [str(message.id) for message in expected]
+
+    def test_sync_since_waits_for_settle_window(
+        self, authenticated_client: APIClient, room_with_admin: Room, user: User, settings
+    ) -> None:
+        settings.MESSAGE_SYNC_SETTLE_SECONDS = 0
+        url = f"/api/chat/rooms/{room_with_admin.id}/messages/"
+        since = authenticated_client.get(url).data["since"]
+        baker.make(Message, room=room_with_admin, author=user)
+
+        settings.MESSAGE_SYNC_SETTLE_SECONDS = 60
+        response = authenticated_client.get(url, {"since": since})
+
+        assert response.data["results"] == []
+        assert response.data["since"] == since
+
+    def test_sync_invalid_since(self, authenticated_client: APIClient, room_with_admin: Room) -> None:
+        response = authenticated_client.get(f"/api/chat/rooms/{room_with_admin.id}/messages/", {"since": "invalido"})
+        assert response.status_code == status.HTTP_404_NOT_FOUND
 
     def test_list_messages_private_room_not_participant_fails(self, authenticated_client: APIClient, db) -> None:
         """Testa que sala PRIVADA sem participação retorna 403."""
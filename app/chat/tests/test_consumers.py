@@ -1,13 +1,23 @@
+import asyncio
+import json
 import uuid
 from unittest.mock import patch
 
+import msgpack
 import pytest
+from asgiref.sync import sync_to_async
 from channels.db import database_sync_to_async
 from channels.testing import WebsocketCommunicator
 from rest_framework_simplejwt.tokens import AccessToken
 
 from app.asgi import application
-from app.chat.models import Message
+from app.chat.models import Message, Room, RoomParticipant
+from app.chat.services.broadcast_service import BroadcastService
+from app.chat.services.message_service import message_write_buffer
+from app.chat.services.replay_buffer import room_replay_buffer
+from app.chat.websockets.compression import CompressedWebSocketProtocol
+from app.chat.websockets.outbound import OutboundQueue
+from app.chat.websockets.protocol import json_protocol, msgpack_protocol
 
 
 @pytest.fixture
@@ -109,6 +119,106 @@ class TestChatConsumer:
 
         await communicator.disconnect()
 
+    @patch("app.moderation.tasks.moderate_message_task.delay")
+    async def test_consumer_acks_retried_client_msg_id_with_original(self, mock_task, user, room, user_token):
+        """Verifica que um reenvio com o mesmo client_msg_id recebe o ack original sem nova mensagem."""
+        communicator = WebsocketCommunicator(application, f"ws/chat/{room.id}/?token={user_token}")
+        await communicator.connect()
+        await communicator.receive_json_from()
+
+        frame = {"type": "chat_message", "message": "Olá", "client_msg_id": "c-1"}
+        await communicator.send_json_to(frame)
+        first = await communicator.receive_json_from()
+        await communicator.send_json_to(frame)
+        retried = await communicator.receive_json_from()
+
+        assert retried == first
+        assert first["message"]["client_msg_id"] == "c-1"
+        mock_task.assert_called_once()
+        assert await database_sync_to_async(Message.objects.filter(room=room).count)() == 1
+
+        await communicator.send_json_to({"type": "chat_message", "message": "Olá", "client_msg_id": ["c-1"]})
+        assert (await communicator.receive_json_from())["message"] == "client_msg_id inválido"
+
+        await communicator.disconnect()
+
+    @patch("app.moderation.tasks.moderate_message_task.delay")
+    async def test_consumer_acks_duplicate_without_spending_rate_limit(
+        self, mock_task, user, room, user_token, settings
+    ):
+        """Verifica que um reenvio com o bucket vazio recebe o ack original, não rate_limited."""
+        settings.CHAT_RATE_LIMIT_ROOM_BURST = 1
+        communicator = WebsocketCommunicator(application, f"ws/chat/{room.id}/?token={user_token}")
+        await communicator.connect()
+        await communicator.receive_json_from()
+
+        frame = {"type": "chat_message", "message": "Olá", "client_msg_id": "c-1"}
+        await communicator.send_json_to(frame)
+        first = await communicator.receive_json_from()
+        await communicator.send_json_to(frame)
+        retried = await communicator.receive_json_from()
+        await communicator.send_json_to({"type": "chat_message", "message": "Outra"})
+        throttled = await communicator.receive_json_from()
+
+        assert first["type"] == "message_queued"
+        assert retried == first
+        assert throttled["code"] == "rate_limited"
+        mock_task.assert_called_once()
+
+        await communicator.disconnect()
+
+    @patch("app.moderation.tasks.moderate_message_task.delay")
+    async def test_consumer_acks_buffered_duplicate_without_spending_rate_limit(
+        self, mock_task, user, room, user_token, settings
+    ):
+        """Verifica que um reenvio (nova conexão) com a original ainda no buffer de escrita não gasta ficha."""
+        settings.CHAT_RATE_LIMIT_ROOM_BURST = 1
+        settings.CHAT_WRITE_BUFFER_WINDOW_MS = 300
+        frame = {"type": "chat_message", "message": "Olá", "client_msg_id": "c-1"}
+
+        original = WebsocketCommunicator(application, f"ws/chat/{room.id}/?token={user_token}")
+        await original.connect()
+        await original.receive_json_from()
+        await original.send_json_to(frame)
+        while not message_write_buffer.has_pending(room.id, user.id, "c-1"):
+            await asyncio.sleep(0.005)
+
+        # O socket caiu: o cliente reconecta e reenvia com a original ainda no buffer
+        retry = WebsocketCommunicator(application, f"ws/chat/{room.id}/?token={user_token}")
+        await retry.connect()
+        await retry.receive_json_from()
+        await retry.send_json_to(frame)
+
+        first = await original.receive_json_from(timeout=2)
+        retried = await retry.receive_json_from(timeout=2)
+
+        assert first["type"] == retried["type"] == "message_queued"
+        assert retried["message"]["id"] == first["message"]["id"]
+        mock_task.assert_called_once()
+
+        await original.disconnect()
+        await retry.disconnect()
+
+    @patch("app.moderation.tasks.moderate_message_task.delay")
+    async def test_consumer_throttles_message_flood(self, mock_task, user, room, user_token, settings):
+        """Verifica que frames acima do orçamento recebem rate_limited e não criam mensagens."""
+        settings.CHAT_RATE_LIMIT_ROOM_BURST = 2
+        communicator = WebsocketCommunicator(application, f"ws/chat/{room.id}/?token={user_token}")
+        await communicator.connect()
+        await communicator.receive_json_from()
+
+        for i in range(3):
+            await communicator.send_json_to({"type": "chat_message", "message": f"flood {i}"})
+        responses = [await communicator.receive_json_from() for _ in range(3)]
+
+        assert [response["type"] for response in responses] == ["message_queued", "message_queued", "error"]
+        assert responses[2]["code"] == "rate_limited"
+        assert responses[2]["retry_after"] > 0
+        assert mock_task.call_count == 2
+        assert await database_sync_to_async(Message.objects.filter(room=room).count)() == 2
+
+        await communicator.disconnect()
+
     async def test_consumer_receives_broadcast_on_approval(self, user, room, user_token):
         """Verifica recebimento de chat_message via channel layer."""
         communicator = WebsocketCommunicator(application, f"ws/chat/{room.id}/?token={user_token}")
@@ -139,6 +249,22 @@ class TestChatConsumer:
 
         await communicator.disconnect()
 
+    async def test_consumer_forwards_pre_serialized_frame_unchanged(self, user, room, user_token):
+        """Verifica que o frame pré-serializado do evento é repassado sem re-serialização."""
+        communicator = WebsocketCommunicator(application, f"ws/chat/{room.id}/?token={user_token}")
+
+        await communicator.connect()
+        await communicator.receive_json_from()
+
+        from channels.layers import get_channel_layer
+
+        frame = '{"type":"chat_message","message":{"id":"test-id","content":"Olá","status":"APPROVED"}}'
+        await get_channel_layer().group_send(f"chat_{room.id}", {"type": "chat_message", "frame": frame})
+
+        assert await communicator.receive_from() == frame
+
+        await communicator.disconnect()
+
     async def test_consumer_receives_rejection_notification(self, user, room, user_token):
         """Verifica recebimento de message_rejected no canal do usuário."""
         communicator = WebsocketCommunicator(application, f"ws/chat/{room.id}/?token={user_token}")
@@ -167,3 +293,470 @@ class TestChatConsumer:
         assert response["message"]["reason"] == "content_violation"
 
         await communicator.disconnect()
+
+    async def test_consumer_closes_on_membership_revoked(self, user, user_token):
+        """Verifica que a remoção da sala privada encerra o socket do usuário."""
+        room = await database_sync_to_async(Room.objects.create)(name="Privada", is_private=True)
+        await database_sync_to_async(RoomParticipant.objects.create)(room=room, user=user)
+        communicator = WebsocketCommunicator(application, f"ws/chat/{room.id}/?token={user_token}")
+
+        connected, _ = await communicator.connect()
+        assert connected
+        await communicator.receive_json_from()
+
+        from channels.layers import get_channel_layer
+
+        await get_channel_layer().group_send(
+            f"user_{user.id}", {"type": "membership_revoked", "room_id": str(room.id)}
+        )
+
+        response = await communicator.receive_json_from()
+        assert response["type"] == "error"
+        assert (await communicator.receive_output())["type"] == "websocket.close"
+
+    async def test_consumer_ignores_membership_revoked_for_other_room(self, user, room, user_token):
+        """Verifica que a remoção de outra sala não afeta a conexão."""
+        communicator = WebsocketCommunicator(application, f"ws/chat/{room.id}/?token={user_token}")
+
+        await communicator.connect()
+        await communicator.receive_json_from()
+
+        from channels.layers import get_channel_layer
+
+        await get_channel_layer().group_send(
+            f"user_{user.id}", {"type": "membership_revoked", "room_id": str(uuid.uuid4())}
+        )
+
+        assert await communicator.receive_nothing()
+
+        await communicator.disconnect()
+
+    async def test_consumer_disconnects_slow_client_with_resync_hint(self, user, room, user_token, settings):
+        """Verifica a política disconnect: fila cheia encerra a conexão com a última seq entregue."""
+        settings.WS_OUTBOUND_QUEUE_SIZE = 1
+        settings.WS_OUTBOUND_OVERFLOW_POLICY = "disconnect"
+        communicator = WebsocketCommunicator(application, f"ws/chat/{room.id}/?token={user_token}")
+
+        # Sem a task de envio, a fila nunca esvazia (cliente que não lê)
+        with patch.object(OutboundQueue, "start"):
+            await communicator.connect()
+            await communicator.receive_json_from()
+
+            from channels.layers import get_channel_layer
+
+            for seq in (41, 42):
+                event = BroadcastService._build_event("chat_message", {"content": "Olá"}, room_id=room.id, seq=seq)
+                await get_channel_layer().group_send(f"chat_{room.id}", event)
+
+            response = await communicator.receive_json_from()
+            assert response == {"type": "resync", "reason": "slow_consumer", "last_seq": {str(room.id): 40}}
+            assert (await communicator.receive_output())["code"] == 4008
+
+        await communicator.disconnect()
+
+    @patch("app.moderation.tasks.moderate_message_task.delay")
+    async def test_consumer_speaks_negotiated_msgpack(self, mock_task, user, room, user_token):
+        """Verifica o subprotocolo MessagePack: frames binários com campos curtos e epoch em ms."""
+        communicator = WebsocketCommunicator(
+            application, f"ws/chat/{room.id}/?token={user_token}", subprotocols=["chat.msgpack.v1"]
+        )
+        connected, subprotocol = await communicator.connect()
+        assert (connected, subprotocol) == (True, "chat.msgpack.v1")
+        assert msgpack.unpackb(await communicator.receive_from())["t"] == "connection_established"
+
+        await communicator.send_to(bytes_data=msgpack.packb({"t": "chat_message", "m": "Olá"}))
+        queued = msgpack.unpackb(await communicator.receive_from())
+        assert queued["t"] == "message_queued"
+        assert queued["m"]["c"] == "Olá"
+        assert isinstance(queued["m"]["ts"], int)
+
+        from channels.layers import get_channel_layer
+
+        payload = {"id": "1", "content": "Aprovada", "created_at": "2026-01-01T00:00:00+00:00"}
+        event = BroadcastService._build_event("chat_message", payload, room_id=room.id, seq=7)
+        await get_channel_layer().group_send(f"chat_{room.id}", event)
+
+        frame = msgpack.unpackb(await communicator.receive_from())
+        assert frame == {
+            "t": "chat_message",
+            "r": str(room.id),
+            "s": 7,
+            "m": {"i": "1", "c": "Aprovada", "ts": 1767225600000},
+        }
+
+        await communicator.send_to(text_data='{"type": "chat_message"}')
+        assert msgpack.unpackb(await communicator.receive_from())["m"] == "MessagePack inválido"
+
+        await communicator.disconnect()
+
+    async def test_consumer_replays_missed_frames_on_reconnect(self, user, room, user_token):
+        """Verifica que `last_seq` reenvia os frames perdidos e descarta a cópia ao vivo."""
+        [first_seq, *missed] = await sync_to_async(room_replay_buffer.allocate)(room.id, 3)
+        frames = [f'{{"type":"chat_message","seq":{seq},"message":{{}}}}' for seq in missed]
+        await sync_to_async(room_replay_buffer.store)(room.id, list(zip(missed, frames)))
+
+        communicator = WebsocketCommunicator(
+            application, f"ws/chat/{room.id}/?token={user_token}&last_seq={first_seq}"
+        )
+        connected, _ = await communicator.connect()
+        assert connected
+
+        established = await communicator.receive_json_from()
+        assert established["type"] == "connection_established"
+        assert established["seq"] == missed[-1]
+        assert [await communicator.receive_from() for _ in missed] == frames
+
+        from channels.layers import get_channel_layer
+
+        # Evento já reenviado pelo replay chegando ao vivo, seguido de um novo
+        await get_channel_layer().group_send(
+            f"chat_{room.id}", {"type": "chat_message", "seq": missed[-1], "frame": frames[-1]}
+        )
+        await get_channel_layer().group_send(
+            f"chat_{room.id}", {"type": "chat_message", "seq": missed[-1] + 1, "frame": "novo"}
+        )
+        assert await communicator.receive_from() == "novo"
+
+        await communicator.disconnect()
+
+    async def test_consumer_reports_replay_gap(self, user, room, user_token, settings):
+        """Verifica que um intervalo fora do buffer gera `replay_gap`."""
+        settings.ROOM_REPLAY_BUFFER_SIZE = 2
+        sequences = await sync_to_async(room_replay_buffer.allocate)(room.id, 5)
+
+        communicator = WebsocketCommunicator(
+            application, f"ws/chat/{room.id}/?token={user_token}&last_seq={sequences[0]}"
+        )
+        await communicator.connect()
+        await communicator.receive_json_from()
+
+        response = await communicator.receive_json_from()
+        assert response == {"type": "replay_gap", "last_seq": sequences[0], "seq": sequences[-1]}
+
+        await communicator.disconnect()
+
+
+@pytest.mark.unit
+class TestOutboundQueue:
+    """Testes da fila de saída limitada por conexão."""
+
+    @staticmethod
+    def chat_frame(room_id: str, seq: int) -> tuple[str, str, int]:
+        return json.dumps({"type": "chat_message", "room_id": room_id, "seq": seq}), room_id, seq
+
+    async def test_writer_sends_frames_in_order(self):
+        sent = []
+
+        async def send(frame):
+            sent.append(frame)
+
+        queue = OutboundQueue(send, capacity=4, policy=OutboundQueue.DROP_OLDEST)
+        queue.start()
+        for seq in (1, 2, 3):
+            queue.put(*self.chat_frame("sala", seq))
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        await queue.stop()
+
+        assert [json.loads(frame)["seq"] for frame in sent] == [1, 2, 3]
+        assert queue.delivered_seq == {"sala": 3}
+
+    async def test_send_failure_closes_queue_and_connection(self):
+        closed = asyncio.Event()
+
+        async def send(frame):
+            raise ConnectionResetError("socket closed")
+
+        async def on_send_failed():
+            closed.set()
+
+        queue = OutboundQueue(send, capacity=4, policy=OutboundQueue.DISCONNECT, on_send_failed=on_send_failed)
+        queue.start()
+        queue.put(*self.chat_frame("sala", 1))
+        queue.put(*self.chat_frame("sala", 2))
+        await asyncio.wait_for(closed.wait(), timeout=1)
+
+        assert queue.closing is True
+        for seq in range(3, 10):
+            assert queue.put(*self.chat_frame("sala", seq)) is True
+        assert queue.depth == 0
+        await queue.stop()
+
+    async def test_drop_oldest_keeps_queue_bounded(self):
+        queue = OutboundQueue(None, capacity=2, policy=OutboundQueue.DROP_OLDEST)
+
+        for seq in (1, 2, 3):
+            assert queue.put(*self.chat_frame("sala", seq)) is True
+
+        assert [item.seq for item in queue._items] == [2, 3]
+        assert (queue.depth, queue.max_depth, queue.dropped) == (2, 2, 1)
+
+    async def test_coalesce_collapses_room_frames_into_replay_gap(self):
+        queue = OutboundQueue(None, capacity=4, policy=OutboundQueue.COALESCE)
+        queue.put(*self.chat_frame("a", 10))
+        queue.put('{"type":"message_rejected"}')
+        queue.put(*self.chat_frame("b", 5))
+        queue.put(*self.chat_frame("a", 11))
+
+        queue.put(*self.chat_frame("b", 6))
+
+        frames = [json.loads(item.data) for item in queue._items]
+        assert frames == [
+            {"type": "replay_gap", "room_id": "a", "last_seq": 9, "seq": 11},
+            {"type": "message_rejected"},
+            {"type": "chat_message", "room_id": "b", "seq": 5},
+            {"type": "chat_message", "room_id": "b", "seq": 6},
+        ]
+        assert queue.dropped == 1
+
+    async def test_disconnect_policy_refuses_and_builds_resync_hint(self):
+        queue = OutboundQueue(None, capacity=2, policy=OutboundQueue.DISCONNECT)
+        queue.delivered_seq["a"] = 9
+        queue.put(*self.chat_frame("a", 10))
+        queue.put(*self.chat_frame("b", 5))
+
+        assert queue.put(*self.chat_frame("b", 6)) is False
+        assert queue.resync_hint() == {"type": "resync", "reason": "slow_consumer", "last_seq": {"a": 9, "b": 4}}
+
+    async def test_batches_chat_messages_while_coalescing(self, settings):
+        settings.WS_COALESCE_WINDOW_MS = 20
+        sent = []
+
+        async def send(frame):
+            sent.append(json.loads(frame))
+
+        queue = OutboundQueue(send, capacity=10, policy=OutboundQueue.DROP_OLDEST)
+        queue.coalescing = True
+        queue.start()
+        for seq in (1, 2, 3):
+            queue.put(*self.chat_frame("sala", seq), batchable=True)
+        queue.put('{"type":"message_rejected"}')
+        await asyncio.sleep(0.05)
+        await queue.stop()
+
+        assert sent[0]["type"] == "chat_messages"
+        assert [event["seq"] for event in sent[0]["messages"]] == [1, 2, 3]
+        assert sent[1] == {"type": "message_rejected"}
+        assert queue.delivered_seq == {"sala": 3}
+
+    async def test_coalescing_follows_event_rate(self):
+        queue = OutboundQueue(None, capacity=100, policy=OutboundQueue.DROP_OLDEST, coalesce_rate=10)
+
+        for seq in range(19):
+            queue.put(*self.chat_frame("sala", seq), batchable=True)
+        queue._rate_started -= OutboundQueue.RATE_WINDOW
+        queue.put(*self.chat_frame("sala", 19), batchable=True)
+        assert queue.coalescing is True
+
+        # Sala calma: uma mensagem na janela seguinte volta à entrega imediata
+        queue._rate_started -= OutboundQueue.RATE_WINDOW
+        queue.put(*self.chat_frame("sala", 20), batchable=True)
+        assert queue.coalescing is False
+
+    async def test_rejects_unknown_policy(self):
+        with pytest.raises(ValueError):
+            OutboundQueue(None, capacity=2, policy="ignore")
+
+
+@pytest.mark.unit
+class TestWireProtocols:
+    """Testes dos protocolos de fio (JSON e MessagePack)."""
+
+    def test_msgpack_batch_matches_packed_structure(self):
+        frames = [msgpack_protocol.encode({"type": "chat_message", "seq": seq}) for seq in (1, 2)]
+
+        assert msgpack.unpackb(msgpack_protocol.batch(frames)) == {
+            "t": "chat_messages",
+            "ms": [{"t": "chat_message", "s": 1}, {"t": "chat_message", "s": 2}],
+        }
+
+    def test_msgpack_transcodes_stored_json_frames(self):
+        stored = json_protocol.encode(
+            {"type": "chat_message", "seq": 3, "message": {"updated_at": "1970-01-01T00:00:01+00:00"}}
+        )
+
+        assert msgpack.unpackb(msgpack_protocol.stored_frame(stored)) == {
+            "t": "chat_message",
+            "s": 3,
+            "m": {"ut": 1000},
+        }
+
+    def test_json_batch_is_valid_json(self):
+        frames = [json_protocol.encode({"type": "chat_message", "seq": seq}) for seq in (1, 2)]
+
+        assert json.loads(json_protocol.batch(frames))["messages"][1]["seq"] == 2
+
+    def test_protocols_reject_frames_of_the_other_kind(self):
+        with pytest.raises(ValueError):
+            json_protocol.decode(None, b"\x80")
+        with pytest.raises(ValueError):
+            msgpack_protocol.decode("{}", None)
+        with pytest.raises(ValueError):
+            msgpack_protocol.decode(None, b"\xc1")
+
+
+@pytest.mark.integration
+class TestPerMessageDeflate:
+    """Testes do permessage-deflate no uvicorn (servidor e cliente WebSocket reais)."""
+
+    def test_relies_on_legacy_uvicorn_protocol_api(self):
+        import inspect
+
+        from websockets.legacy.server import WebSocketServerProtocol
+
+        assert issubclass(CompressedWebSocketProtocol, WebSocketServerProtocol)
+        assert "extensions" in inspect.signature(WebSocketServerProtocol.__init__).parameters
+        assert "available_extensions" in inspect.getsource(WebSocketServerProtocol)
+        assert inspect.iscoroutinefunction(CompressedWebSocketProtocol.run_asgi)
+
+    async def test_compresses_only_frames_above_min_size(self, settings):
+        import uvicorn
+        from websockets.asyncio.client import connect
+
+        settings.WS_DEFLATE_MIN_SIZE = 100
+        frames = ["curto", json.dumps({"type": "chat_messages", "messages": [{"content": "olá " * 50}] * 20})]
+        scopes = []
+
+        async def app(scope, receive, send):
+            scopes.append(scope)
+            await receive()
+            await send({"type": "websocket.accept"})
+            for frame in frames:
+                await send({"type": "websocket.send", "text": frame})
+            await receive()
+
+        server = uvicorn.Server(
+            uvicorn.Config(
+                app, host="127.0.0.1", port=0, ws=CompressedWebSocketProtocol, lifespan="off", log_level="warning"
+            )
+        )
+        serving = asyncio.create_task(server.serve())
+        while not server.started:
+            await asyncio.sleep(0.01)
+        port = server.servers[0].sockets[0].getsockname()[1]
+
+        try:
+            async with connect(f"ws://127.0.0.1:{port}") as websocket:
+                assert "permessage-deflate" in websocket.response.headers["Sec-WebSocket-Extensions"]
+                assert [await websocket.recv() for _ in frames] == frames
+        finally:
+            server.should_exit = True
+            await serving
+
+        stats = scopes[0]["extensions"]["chat.compression"]
+        assert stats["skipped_frames"] == 1
+        assert stats["compressed_frames"] == 1
+        assert stats["raw_bytes"] == len(frames[1].encode())
+        assert stats["compressed_bytes"] < stats["raw_bytes"] / 10
+
+
+@pytest.mark.integration
+@pytest.mark.django_db(transaction=True)
+class TestMultiplexChatConsumer:
+    """Testes de integração para o MultiplexChatConsumer (uma conexão, várias salas)."""
+
+    @pytest.fixture
+    async def communicator(self, user_token):
+        communicator = WebsocketCommunicator(application, f"ws/chat/?token={user_token}")
+        connected, _ = await communicator.connect()
+        assert connected
+        assert (await communicator.receive_json_from())["type"] == "connection_established"
+        yield communicator
+        await communicator.disconnect()
+
+    async def test_rejects_unauthenticated_user(self):
+        communicator = WebsocketCommunicator(application, "ws/chat/")
+
+        connected, close_code = await communicator.connect()
+
+        assert connected is False
+        assert close_code == 4001
+
+    async def test_subscribes_to_many_rooms_on_one_connection(self, communicator, user):
+        rooms = [await database_sync_to_async(Room.objects.create)(name=f"Sala {i}") for i in range(3)]
+        for room in rooms:
+            await communicator.send_json_to({"type": "subscribe", "room_id": str(room.id)})
+            response = await communicator.receive_json_from()
+            assert response == {"type": "subscribed", "room_id": str(room.id), "seq": None}
+
+        from channels.layers import get_channel_layer
+
+        for room in rooms:
+            frame = BroadcastService._build_event("chat_message", {"content": "Olá"}, room_id=room.id)
+            await get_channel_layer().group_send(f"chat_{room.id}", frame)
+
+        received = [await communicator.receive_json_from() for _ in rooms]
+        assert [event["room_id"] for event in received] == [str(room.id) for room in rooms]
+
+    async def test_unsubscribe_stops_room_events(self, communicator, room):
+        await communicator.send_json_to({"type": "subscribe", "room_id": str(room.id)})
+        await communicator.receive_json_from()
+        await communicator.send_json_to({"type": "unsubscribe", "room_id": str(room.id)})
+        assert await communicator.receive_json_from() == {"type": "unsubscribed", "room_id": str(room.id)}
+
+        from channels.layers import get_channel_layer
+
+        event = BroadcastService._build_event("chat_message", {"content": "Olá"}, room_id=room.id)
+        await get_channel_layer().group_send(f"chat_{room.id}", event)
+
+        assert await communicator.receive_nothing()
+
+    async def test_subscribe_checks_permission_per_room(self, communicator):
+        private_room = await database_sync_to_async(Room.objects.create)(name="Privada", is_private=True)
+
+        await communicator.send_json_to({"type": "subscribe", "room_id": str(private_room.id)})
+        response = await communicator.receive_json_from()
+        assert response["type"] == "error"
+        assert response["room_id"] == str(private_room.id)
+
+        await communicator.send_json_to({"type": "subscribe", "room_id": str(uuid.uuid4())})
+        assert (await communicator.receive_json_from())["type"] == "error"
+
+        await communicator.send_json_to({"type": "subscribe", "room_id": "invalido"})
+        assert (await communicator.receive_json_from())["message"] == "room_id inválido"
+
+    @patch("app.moderation.tasks.moderate_message_task.delay")
+    async def test_chat_message_requires_subscription(self, mock_task, communicator, room):
+        await communicator.send_json_to({"type": "chat_message", "room_id": str(room.id), "message": "Olá"})
+        assert (await communicator.receive_json_from())["type"] == "error"
+
+        await communicator.send_json_to({"type": "subscribe", "room_id": str(room.id)})
+        await communicator.receive_json_from()
+        await communicator.send_json_to({"type": "chat_message", "room_id": str(room.id), "message": "Olá"})
+
+        response = await communicator.receive_json_from()
+        assert response["type"] == "message_queued"
+        assert response["room_id"] == str(room.id)
+        mock_task.assert_called_once()
+
+    async def test_subscribe_replays_missed_frames(self, communicator, room):
+        [first_seq, *missed] = await sync_to_async(room_replay_buffer.allocate)(room.id, 3)
+        frames = [f'{{"type":"chat_message","seq":{seq}}}' for seq in missed]
+        await sync_to_async(room_replay_buffer.store)(room.id, list(zip(missed, frames)))
+
+        await communicator.send_json_to({"type": "subscribe", "room_id": str(room.id), "last_seq": first_seq})
+
+        assert (await communicator.receive_json_from())["seq"] == missed[-1]
+        assert [await communicator.receive_from() for _ in missed] == frames
+
+    async def test_membership_revoked_cancels_only_that_subscription(self, communicator, user, room):
+        private_room = await database_sync_to_async(Room.objects.create)(name="Privada", is_private=True)
+        await database_sync_to_async(RoomParticipant.objects.create)(room=private_room, user=user)
+        for subscribed in (room, private_room):
+            await communicator.send_json_to({"type": "subscribe", "room_id": str(subscribed.id)})
+            await communicator.receive_json_from()
+
+        from channels.layers import get_channel_layer
+
+        await get_channel_layer().group_send(
+            f"user_{user.id}", {"type": "membership_revoked", "room_id": str(private_room.id)}
+        )
+        assert await communicator.receive_json_from() == {
+            "type": "unsubscribed",
+            "room_id": str(private_room.id),
+            "reason": "membership_revoked",
+        }
+
+        event = BroadcastService._build_event("chat_message", {"content": "Olá"}, room_id=room.id)
+        await get_channel_layer().group_send(f"chat_{room.id}", event)
+        assert (await communicator.receive_json_from())["room_id"] == str(room.id)
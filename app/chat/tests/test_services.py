@@ -1,11 +1,25 @@
+import asyncio
+import json
+import threading
+import time
+import uuid
 from unittest.mock import MagicMock, patch
 
 import pytest
+from asgiref.sync import sync_to_async
+from django.db import connections
 from model_bakery import baker
 
 from app.accounts.models import User
 from app.chat.models import Message, Room
 from app.chat.services.broadcast_service import BroadcastService
+from app.chat.services.broadcaster import ChannelLayerBroadcaster
+from app.chat.services.history_cache import recent_messages_cache
+from app.chat.services.message_service import MessageService, message_write_buffer
+from app.chat.services.rate_limiter import MessageRateLimiter, TokenBucket, message_rate_limiter
+from app.chat.services.replay_buffer import room_replay_buffer
+from app.moderation.domain.strategies import ModerationResult
+from app.moderation.services.lease_service import ModerationLeaseService
 
 
 @pytest.mark.unit
@@ -15,13 +29,7 @@ class TestBroadcastService:
 
     def test_broadcast_message_to_room_calls_channel_layer(self):
         """Verifica que broadcast_message_to_room chama o channel_layer corretamente."""
-        mock_channel_layer = MagicMock()
-        mock_group_send = MagicMock()
-
-        with (
-            patch("app.chat.services.broadcast_service.get_channel_layer", return_value=mock_channel_layer),
-            patch("app.chat.services.broadcast_service.async_to_sync", return_value=mock_group_send),
-        ):
+        with patch("app.chat.services.broadcast_service.broadcaster.send_many") as mock_send_many:
             user = baker.make(User, name="Test User", email="test@example.com")
             room = baker.make(Room, name="Test Room")
             message = baker.make(
@@ -30,25 +38,20 @@ class TestBroadcastService:
 
             BroadcastService.broadcast_message_to_room(message)
 
-            mock_group_send.assert_called_once()
-            call_args = mock_group_send.call_args
-            group_name, payload = call_args[0]
+            mock_send_many.assert_called_once()
+            [(group_name, event)] = mock_send_many.call_args[0][0]
+            payload = json.loads(event["frame"])
 
             assert group_name == f"chat_{room.id}"
-            assert payload["type"] == "chat_message"
+            assert event["type"] == payload["type"] == "chat_message"
+            assert event["seq"] == payload["seq"] == room_replay_buffer.current(room.id)
             assert payload["message"]["content"] == "Test message"
             assert payload["message"]["status"] == Message.Status.APPROVED
             assert payload["message"]["author"]["id"] == str(user.id)
 
     def test_notify_author_rejection_calls_channel_layer(self):
         """Verifica que notify_author_rejection envia para o canal do usuário."""
-        mock_channel_layer = MagicMock()
-        mock_group_send = MagicMock()
-
-        with (
-            patch("app.chat.services.broadcast_service.get_channel_layer", return_value=mock_channel_layer),
-            patch("app.chat.services.broadcast_service.async_to_sync", return_value=mock_group_send),
-        ):
+        with patch("app.chat.services.broadcast_service.broadcaster.send") as mock_group_send:
             user = baker.make(User, name="Test User", email="test@example.com")
             room = baker.make(Room, name="Test Room")
             message = baker.make(
@@ -60,22 +63,17 @@ class TestBroadcastService:
 
             mock_group_send.assert_called_once()
             call_args = mock_group_send.call_args
-            group_name, payload = call_args[0]
+            group_name, event = call_args[0]
+            payload = json.loads(event["frame"])
 
             assert group_name == f"user_{user.id}"
-            assert payload["type"] == "message_rejected"
+            assert event["type"] == payload["type"] == "message_rejected"
             assert payload["message"]["content"] == "Bad message"
             assert payload["message"]["reason"] == "offensive_content"
 
     def test_notify_author_rejection_uses_default_reason(self):
         """Verifica que notify_author_rejection usa reason padrão quando não fornecido."""
-        mock_channel_layer = MagicMock()
-        mock_group_send = MagicMock()
-
-        with (
-            patch("app.chat.services.broadcast_service.get_channel_layer", return_value=mock_channel_layer),
-            patch("app.chat.services.broadcast_service.async_to_sync", return_value=mock_group_send),
-        ):
+        with patch("app.chat.services.broadcast_service.broadcaster.send") as mock_group_send:
             user = baker.make(User, name="Test User", email="test@example.com")
             room = baker.make(Room, name="Test Room")
             message = baker.make(
@@ -85,6 +83,546 @@ class TestBroadcastService:
             BroadcastService.notify_author_rejection(message, {})
 
             call_args = mock_group_send.call_args
-            _, payload = call_args[0]
+            _, event = call_args[0]
+
+            assert json.loads(event["frame"])["message"]["reason"] == "content_violation"
+
+    def test_broadcast_many_sends_all_events_in_one_call(self):
+        """Verifica que broadcast_many envia aprovações e rejeições numa única chamada."""
+        user = baker.make(User)
+        room = baker.make(Room)
+        approved = baker.make(Message, room=room, author=user, status=Message.Status.APPROVED, _quantity=2)
+        rejected = baker.make(Message, room=room, author=user, status=Message.Status.REJECTED)
+
+        with patch("app.chat.services.broadcast_service.broadcaster.send_many") as mock_send_many:
+            BroadcastService.broadcast_many(approved=approved, rejected=[(rejected, {"reason": "ofensivo"})])
+
+        mock_send_many.assert_called_once()
+        items = mock_send_many.call_args[0][0]
+        assert [group for group, _ in items] == [f"chat_{room.id}", f"chat_{room.id}", f"user_{user.id}"]
+        assert [event["type"] for _, event in items] == ["chat_message", "chat_message", "message_rejected"]
+        first_seq, second_seq = items[0][1]["seq"], items[1][1]["seq"]
+        assert second_seq == first_seq + 1
+        assert room_replay_buffer.replay(room.id, first_seq - 1) == (
+            [items[0][1]["frame"], items[1][1]["frame"]],
+            second_seq,
+        )
+
+    def test_broadcast_many_keeps_room_seq_order_on_the_wire(self):
+        """Verifica que aprovações da mesma sala chegam ao channel layer em ordem de seq."""
+        room = baker.make(Room)
+        approved = baker.make(Message, room=room, status=Message.Status.APPROVED, _quantity=2)
+        rejected = baker.make(Message, room=room, status=Message.Status.REJECTED)
+        channel_layer = MagicMock()
+        started, sent = [], []
+
+        async def group_send(group, event):
+            # O primeiro envio da sala é o mais lento: enviados em paralelo, chegariam invertidos
+            started.append(group)
+            if started.count(group) == 1 and group == f"chat_{room.id}":
+                await asyncio.sleep(0.02)
+            sent.append((group, event.get("seq")))
+
+        channel_layer.group_send = group_send
+        with patch("app.chat.services.broadcaster.get_channel_layer", return_value=channel_layer):
+            BroadcastService.broadcast_many(approved=approved, rejected=[(rejected, {})])
+
+        room_seqs = [seq for group, seq in sent if group == f"chat_{room.id}"]
+        assert room_seqs == sorted(room_seqs) and len(room_seqs) == 2
+        assert sent[0][0] == f"user_{rejected.author.id}"
+
+    def test_broadcast_without_replay_buffer_still_sends(self):
+        """Verifica que falhas do buffer de replay não impedem o broadcast."""
+        message = baker.make(Message, status=Message.Status.APPROVED)
+
+        with (
+            patch("app.chat.services.broadcast_service.room_replay_buffer.allocate", side_effect=ConnectionError),
+            patch("app.chat.services.broadcast_service.broadcaster.send_many") as mock_send_many,
+        ):
+            BroadcastService.broadcast_message_to_room(message)
+
+        [(_, event)] = mock_send_many.call_args[0][0]
+        assert "seq" not in event
+        assert "seq" not in json.loads(event["frame"])
+
+
+@pytest.mark.unit
+class TestRoomReplayBuffer:
+    """Testes do buffer de replay por sala."""
+
+    @pytest.fixture(autouse=True)
+    def small_buffer(self, settings):
+        settings.ROOM_REPLAY_BUFFER_SIZE = 4
+
+    def test_allocate_returns_consecutive_sequences(self):
+        room_id = uuid.uuid4()
+
+        first = room_replay_buffer.allocate(room_id, 3)
+        second = room_replay_buffer.allocate(room_id)
+
+        assert first == [first[0], first[0] + 1, first[0] + 2]
+        assert second == [first[-1] + 1]
+        assert room_replay_buffer.current(room_id) == second[0]
+
+    def test_replay_returns_frames_after_last_seq(self):
+        room_id = uuid.uuid4()
+        sequences = room_replay_buffer.allocate(room_id, 3)
+        room_replay_buffer.store(room_id, [(seq, f"frame-{seq}") for seq in sequences])
+
+        assert room_replay_buffer.replay(room_id, sequences[0]) == (
+            [f"frame-{sequences[1]}", f"frame-{sequences[2]}"],
+            sequences[2],
+        )
+        assert room_replay_buffer.replay(room_id, sequences[2]) == ([], sequences[2])
+        assert room_replay_buffer.replay(room_id, None) == ([], sequences[2])
+
+    def test_replay_reports_gap_when_buffer_was_overwritten(self):
+        room_id = uuid.uuid4()
+        sequences = room_replay_buffer.allocate(room_id, 6)
+        room_replay_buffer.store(room_id, [(seq, f"frame-{seq}") for seq in sequences])
+
+        assert room_replay_buffer.replay(room_id, sequences[0])[0] is None
+        assert room_replay_buffer.replay(room_id, sequences[1])[0] == [f"frame-{seq}" for seq in sequences[2:]]
+
+    def test_replay_reports_gap_for_missing_slot_or_unknown_sequence(self):
+        room_id = uuid.uuid4()
+        sequences = room_replay_buffer.allocate(room_id, 2)
+        room_replay_buffer.store(room_id, [(sequences[1], "frame")])
+
+        assert room_replay_buffer.replay(room_id, sequences[0] - 1)[0] is None
+        assert room_replay_buffer.replay(room_id, sequences[1] + 10)[0] is None
+        assert room_replay_buffer.replay(uuid.uuid4(), 1) == (None, None)
+
+    def test_replay_stops_before_frames_still_in_flight(self):
+        room_id = uuid.uuid4()
+        first = room_replay_buffer.allocate(room_id, 2)
+        room_replay_buffer.store(room_id, [(seq, f"frame-{seq}") for seq in first])
+        # Volta seguinte do buffer: sequências reservadas, slots ainda com a volta anterior
+        sequences = room_replay_buffer.allocate(room_id, 4)
+        room_replay_buffer.store(room_id, [(sequences[0], f"frame-{sequences[0]}")])
+
+        assert room_replay_buffer.replay(room_id, first[-1]) == ([f"frame-{sequences[0]}"], sequences[-1])
+        assert room_replay_buffer.replay(room_id, sequences[0]) == ([], sequences[-1])
+
+    def test_replay_reports_gap_once_sequence_expires(self, settings):
+        room_id = uuid.uuid4()
+        sequences = room_replay_buffer.allocate(room_id, 2)
+        room_replay_buffer.store(room_id, [(seq, f"frame-{seq}") for seq in sequences])
+
+        expired = time.time() + settings.ROOM_REPLAY_TTL + 1
+        with patch("django.core.cache.backends.locmem.time.time", return_value=expired):
+            assert room_replay_buffer.replay(room_id, sequences[0]) == (None, None)
+
+
+@pytest.mark.unit
+class TestMessageRateLimiter:
+    """Testes do rate limit de chat_message (token bucket)."""
+
+    @pytest.fixture(autouse=True)
+    def budgets(self, settings):
+        settings.CHAT_RATE_LIMIT_ROOM_BURST = 2
+        settings.CHAT_RATE_LIMIT_ROOM_PER_SECOND = 1.0
+        settings.CHAT_RATE_LIMIT_USER_BURST = 3
+        settings.CHAT_RATE_LIMIT_USER_PER_SECOND = 1.0
+
+    async def test_room_budget_allows_burst_then_throttles(self):
+        room_id, user_id = uuid.uuid4(), uuid.uuid4()
+        local = {}
+
+        results = [await message_rate_limiter.acquire(local, room_id, user_id) for _ in range(3)]
+
+        assert results[:2] == [0.0, 0.0]
+        assert 0 < results[2] <= 1.0
+
+    async def test_user_budget_spans_rooms_and_connections(self):
+        user_id = uuid.uuid4()
+
+        # Conexões diferentes (buckets locais separados) do mesmo usuário
+        results = [await message_rate_limiter.acquire({}, uuid.uuid4(), user_id) for _ in range(4)]
+
+        assert results[:3] == [0.0, 0.0, 0.0]
+        assert results[3] > 0
+
+    async def test_local_precheck_skips_shared_state(self):
+        room_id, user_id = uuid.uuid4(), uuid.uuid4()
+        local = {}
+        for _ in range(2):
+            await message_rate_limiter.acquire(local, room_id, user_id)
+
+        with patch.object(message_rate_limiter, "acquire_shared") as mock_shared:
+            assert await message_rate_limiter.acquire(local, room_id, user_id) > 0
+
+        mock_shared.assert_not_called()
+
+    async def test_shared_failure_falls_back_to_local_budget(self):
+        room_id, user_id = uuid.uuid4(), uuid.uuid4()
+        local = {}
+
+        with patch.object(message_rate_limiter, "acquire_shared", side_effect=ConnectionError("redis fora")):
+            results = [await message_rate_limiter.acquire(local, room_id, user_id) for _ in range(3)]
+
+        assert results[:2] == [0.0, 0.0]
+        assert results[2] > 0
+
+    def test_shared_state_uses_redis_client_from_cache_location(self, settings):
+        settings.CACHES = {
+            **settings.CACHES,
+            "ratelimit": {
+                "BACKEND": "django.core.cache.backends.redis.RedisCache",
+                "LOCATION": "redis://redis-a:6379/1,redis://redis-b:6379/1",
+                "KEY_PREFIX": "app",
+            },
+        }
+        settings.CHAT_RATE_LIMIT_CACHE_ALIAS = "ratelimit"
+        limiter = MessageRateLimiter()
+        budgets = limiter.budgets(uuid.uuid4(), uuid.uuid4())
+
+        with patch("app.chat.services.rate_limiter.redis.Redis.from_url") as mock_from_url:
+            script = mock_from_url.return_value.register_script.return_value
+            script.return_value = b"0.5"
+            assert limiter.acquire_shared(budgets) == 0.5
+            assert limiter.acquire_shared(budgets) == 0.5
+
+        # Um cliente por processo, do servidor de escrita (primeiro do LOCATION)
+        mock_from_url.assert_called_once_with("redis://redis-a:6379/1")
+        keys = script.call_args.kwargs["keys"]
+        assert keys == [f"app:1:{key}" for key, _, _ in budgets]
+
+    def test_shared_state_stays_in_process_without_redis_backend(self):
+        limiter = MessageRateLimiter()
+        budgets = limiter.budgets(uuid.uuid4(), uuid.uuid4())
+
+        with patch("app.chat.services.rate_limiter.redis.Redis.from_url") as mock_from_url:
+            results = [limiter.acquire_shared(budgets) for _ in range(3)]
+
+        mock_from_url.assert_not_called()
+        assert results[:2] == [0.0, 0.0]
+        assert results[2] > 0
+
+    def test_token_bucket_refills_over_time(self):
+        bucket = TokenBucket(capacity=1, rate=10.0)
+        bucket.consume()
+        assert bucket.retry_after() > 0
+
+        with patch("app.chat.services.rate_limiter.time.monotonic", return_value=bucket.updated_at + 0.1):
+            assert bucket.retry_after() == 0.0
+
+
+@pytest.mark.unit
+class TestChannelLayerBroadcaster:
+    """Testes para o ChannelLayerBroadcaster."""
+
+    @pytest.fixture
+    def channel_layer(self):
+        channel_layer = MagicMock()
+        channel_layer.loops = []
+
+        async def group_send(group, event):
+            channel_layer.loops.append(asyncio.get_running_loop())
+            if group == "broken":
+                raise ConnectionError("redis down")
+
+        channel_layer.group_send = group_send
+        with patch("app.chat.services.broadcaster.get_channel_layer", return_value=channel_layer):
+            yield channel_layer
+
+    def test_reuses_the_same_event_loop_between_calls(self, channel_layer):
+        broadcaster = ChannelLayerBroadcaster()
+
+        broadcaster.send("chat_1", {"type": "chat_message"})
+        broadcaster.send_many([("chat_2", {"type": "chat_message"}), ("user_1", {"type": "message_rejected"})])
+
+        assert len(channel_layer.loops) == 3
+        assert len(set(channel_layer.loops)) == 1
+
+    def test_send_many_raises_after_sending_everything(self, channel_layer):
+        broadcaster = ChannelLayerBroadcaster()
+
+        with pytest.raises(ConnectionError):
+            broadcaster.send_many([("broken", {"type": "chat_message"}), ("chat_1", {"type": "chat_message"})])
+
+        assert len(channel_layer.loops) == 2
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+class TestRecentMessagesCache:
+    """Testes do cache da primeira página do histórico."""
+
+    @pytest.fixture(autouse=True)
+    def reset_stats(self):
+        recent_messages_cache.reset_stats()
+
+    def test_first_page_served_from_cache_after_miss(self, room, user, django_assert_num_queries):
+        baker.make(Message, room=room, status=Message.Status.APPROVED, _quantity=3)
+
+        first = recent_messages_cache.first_page(room, user)
+        with django_assert_num_queries(0):
+            second = recent_messages_cache.first_page(room, user)
+
+        assert second == first
+        assert len(first) == 3
+        assert recent_messages_cache.stats() == {"hits": 2, "misses": 2, "hit_rate": 0.5}
+
+    def test_first_page_merges_own_overlay(self, room, user):
+        other_user = baker.make(User, email="other@example.com")
+        approved = baker.make(Message, room=room, author=other_user, status=Message.Status.APPROVED)
+        own_pending = baker.make(Message, room=room, author=user, status=Message.Status.PENDING)
+        baker.make(Message, room=room, author=other_user, status=Message.Status.PENDING)
+
+        rows = recent_messages_cache.first_page(room, user)
+
+        assert [row["id"] for row in rows] == [str(own_pending.id), str(approved.id)]
+
+    def test_verdict_commit_refreshes_room_and_overlay(self, room, user, django_capture_on_commit_callbacks):
+        pending = baker.make(Message, room=room, author=user, status=Message.Status.PENDING)
+        assert [row["status"] for row in recent_messages_cache.first_page(room, user)] == [Message.Status.PENDING]
+
+        claimed = ModerationLeaseService.claim([pending.id], "owner")
+        result = ModerationResult(verdict="APPROVED", provider="local_dictionary", score=1.0, details={})
+        with django_capture_on_commit_callbacks(execute=True):
+            ModerationLeaseService.commit([(claimed[0], result)], "owner")
+
+        rows = recent_messages_cache.first_page(room, user)
+        assert [(row["id"], row["status"]) for row in rows] == [(str(pending.id), Message.Status.APPROVED)]
+
+    def test_stale_fill_does_not_overwrite_newer_generation(self, room, user):
+        message = baker.make(Message, room=room, status=Message.Status.PENDING)
+        room_key = recent_messages_cache._room_key(room.id)
+        stale_generation = recent_messages_cache._generations([room_key])[room_key]
+
+        Message.objects.filter(id=message.id).update(status=Message.Status.APPROVED)
+        message.refresh_from_db()
+        recent_messages_cache.on_verdicts([message])
+        # Preenchimento concorrente que leu o banco antes do commit
+        recent_messages_cache.cache.set(f"{room_key}:{stale_generation}", [])
+
+        assert [row["id"] for row in recent_messages_cache.first_page(room, user)] == [str(message.id)]
+
+    def test_cache_failure_returns_none(self, room, user):
+        with patch.object(recent_messages_cache.cache, "get_many", side_effect=ConnectionError("redis down")):
+            assert recent_messages_cache.first_page(room, user) is None
+
+
+@pytest.mark.integration
+@pytest.mark.django_db(transaction=True)
+class TestMessageService:
+    """Testes para o enfileiramento da moderação no MessageService."""
+
+    @pytest.fixture(autouse=True)
+    async def close_executor_connections(self):
+        """Fecha a conexão aberta pelo ORM assíncrono na thread do executor."""
+        yield
+        await sync_to_async(connections.close_all)()
+
+    async def test_create_message_publishes_off_the_event_loop_thread(self, room, user):
+        publish_threads = []
+
+        with patch(
+            "app.moderation.tasks.moderate_message_task.delay",
+            side_effect=lambda message_id: publish_threads.append(threading.get_ident()),
+        ):
+            message, _ = await MessageService.create_message(room=room, author=user, content="Olá")
+
+        assert message.status == Message.Status.PENDING
+        assert len(publish_threads) == 1
+        assert publish_threads[0] != threading.get_ident()
+
+    async def test_create_message_survives_broker_failure(self, room, user):
+        with patch("app.moderation.tasks.moderate_message_task.delay", side_effect=ConnectionError("broker down")):
+            message, _ = await MessageService.create_message(room=room, author=user, content="Olá")
+
+        assert message.status == Message.Status.PENDING
+
+    async def test_create_message_invalidates_author_overlay(self, room, user):
+        await sync_to_async(recent_messages_cache.first_page)(room, user)
+
+        with patch("app.moderation.tasks.moderate_message_task.delay"):
+            message, _ = await MessageService.create_message(room=room, author=user, content="Olá")
+
+        rows = await sync_to_async(recent_messages_cache.first_page)(room, user)
+        assert [row["id"] for row in rows] == [str(message.id)]
+
+    async def test_retry_with_client_msg_id_returns_original_without_second_moderation(self, room, user):
+        with patch("app.moderation.tasks.moderate_message_task.delay") as publish:
+            message, created = await MessageService.create_message(
+                room=room, author=user, content="Olá", client_msg_id="c-1"
+            )
+            retried, retried_created = await MessageService.create_message(
+                room=room, author=user, content="Olá", client_msg_id="c-1"
+            )
+
+        assert (created, retried_created) == (True, False)
+        assert retried.id == message.id
+        publish.assert_called_once_with(str(message.id))
+        assert await Message.objects.filter(room=room).acount() == 1
+
+    async def test_create_without_lookup_resolves_duplicate_by_constraint(self, room, user):
+        with patch("app.moderation.tasks.moderate_message_task.delay") as publish:
+            message, _ = await MessageService.create_message(
+                room=room, author=user, content="Olá", client_msg_id="c-1"
+            )
+            with patch.object(
+                MessageService, "find_by_client_msg_id", wraps=MessageService.find_by_client_msg_id
+            ) as find:
+                retried, created = await MessageService.create_message(
+                    room=room, author=user, content="Olá", client_msg_id="c-1", lookup=False
+                )
+
+        # Só a busca de recuperação após o IntegrityError
+        find.assert_awaited_once()
+        assert (retried.id, created) == (message.id, False)
+        publish.assert_called_once()
+
+    async def test_client_msg_id_is_scoped_to_author(self, room, user):
+        other = await sync_to_async(baker.make)(User)
+
+        with patch("app.moderation.tasks.moderate_message_task.delay"):
+            _, created = await MessageService.create_message(room=room, author=user, content="a", client_msg_id="c-1")
+            _, other_created = await MessageService.create_message(
+                room=room, author=other, content="b", client_msg_id="c-1"
+            )
+
+        assert created and other_created
+
+    async def test_concurrent_insert_with_same_key_resolves_to_stored_message(self, room, user):
+        with patch("app.moderation.tasks.moderate_message_task.delay") as publish:
+            message, _ = await MessageService.create_message(
+                room=room, author=user, content="Olá", client_msg_id="c-1"
+            )
+            # Simula a corrida: a busca não vê a linha gravada pelo outro reenvio
+            with patch.object(MessageService, "find_by_client_msg_id", side_effect=[None, message]):
+                retried, created = await MessageService.create_message(
+                    room=room, author=user, content="Olá", client_msg_id="c-1"
+                )
+
+        assert retried.id == message.id
+        assert created is False
+        publish.assert_called_once()
+
+
+@pytest.mark.integration
+@pytest.mark.django_db(transaction=True)
+class TestMessageWriteBuffer:
+    """Testes para o buffer de escrita de mensagens (bulk_create por janela)."""
+
+    @pytest.fixture(autouse=True)
+    async def close_executor_connections(self):
+        yield
+        await sync_to_async(connections.close_all)()
+
+    @pytest.fixture(autouse=True)
+    def enable_buffer(self, settings):
+        settings.CHAT_WRITE_BUFFER_WINDOW_MS = 50
+        settings.CHAT_WRITE_BUFFER_MAX_SIZE = 100
+
+    async def test_batch_is_written_once_and_moderated_before_acks(self, room, user):
+        contents = ["primeira", "segunda", "terceira"]
+        senders = []
+        acked_before_moderation = []
+
+        def record_publish(message_ids):
+            acked_before_moderation.append(any(sender.done() for sender in senders))
+
+        with (
+            patch.object(Message.objects, "bulk_create", wraps=Message.objects.bulk_create) as bulk_create,
+            patch("app.moderation.tasks.moderate_messages_batch_task.delay", side_effect=record_publish) as publish,
+        ):
+            senders.extend(
+                asyncio.create_task(MessageService.create_message(room=room, author=user, content=content))
+                for content in contents
+            )
+            messages = [message for message, _ in await asyncio.gather(*senders)]
+
+        assert bulk_create.call_count == 1
+        publish.assert_called_once_with([str(message.id) for message in messages])
+        assert acked_before_moderation == [False]
+
+        stored = await sync_to_async(list)(Message.objects.filter(room=room).order_by("created_at"))
+        assert [message.content for message in stored] == contents
+        assert all(message.status == Message.Status.PENDING for message in stored)
+
+    async def test_full_batch_is_written_without_waiting_for_window(self, room, user, settings):
+        settings.CHAT_WRITE_BUFFER_WINDOW_MS = 60_000
+        settings.CHAT_WRITE_BUFFER_MAX_SIZE = 2
+
+        with patch("app.moderation.tasks.moderate_messages_batch_task.delay"):
+            messages = await asyncio.wait_for(
+                asyncio.gather(
+                    MessageService.create_message(room=room, author=user, content="a"),
+                    MessageService.create_message(room=room, author=user, content="b"),
+                ),
+                timeout=5,
+            )
+
+        assert len(messages) == 2
+        assert message_write_buffer._timer is None
+
+    async def test_failed_write_rejects_every_sender_without_moderation(self, room, user):
+        with (
+            patch.object(Message.objects, "bulk_create", side_effect=ConnectionError("db down")),
+            patch("app.moderation.tasks.moderate_messages_batch_task.delay") as publish,
+        ):
+            results = await asyncio.gather(
+                MessageService.create_message(room=room, author=user, content="a"),
+                MessageService.create_message(room=room, author=user, content="b"),
+                return_exceptions=True,
+            )
+
+        assert all(isinstance(result, ConnectionError) for result in results)
+        publish.assert_not_called()
+        assert not await Message.objects.filter(room=room).aexists()
+
+    async def test_retry_while_original_is_buffered_shares_its_write(self, room, user):
+        with patch("app.moderation.tasks.moderate_message_task.delay") as publish:
+            (message, created), (retried, retried_created) = await asyncio.gather(
+                MessageService.create_message(room=room, author=user, content="Olá", client_msg_id="c-1"),
+                MessageService.create_message(room=room, author=user, content="Olá", client_msg_id="c-1"),
+            )
+
+        assert (created, retried_created) == (True, False)
+        assert retried.id == message.id
+        publish.assert_called_once_with(str(message.id))
+        assert await Message.objects.filter(room=room).acount() == 1
+
+    async def test_key_written_by_another_process_is_not_moderated_again(self, room, user):
+        stored = await Message.objects.acreate(room=room, author=user, content="Olá", client_msg_id="c-1")
+
+        with (
+            patch.object(MessageService, "find_by_client_msg_id", return_value=None),
+            patch("app.moderation.tasks.moderate_message_task.delay") as publish,
+        ):
+            (message, created), (fresh, fresh_created) = await asyncio.gather(
+                MessageService.create_message(room=room, author=user, content="Olá", client_msg_id="c-1"),
+                MessageService.create_message(room=room, author=user, content="Outra", client_msg_id="c-2"),
+            )
+
+        assert (message.id, created) == (stored.id, False)
+        assert fresh_created is True
+        publish.assert_called_once_with(str(fresh.id))
+        assert await Message.objects.filter(room=room).acount() == 2
+
+    async def test_retry_survives_cancelled_original_sender(self, room, user):
+        with (
+            # Sem a busca no banco, os dois envios chegam ao buffer na primeira iteração do loop
+            patch.object(MessageService, "find_by_client_msg_id", return_value=None),
+            patch("app.moderation.tasks.moderate_message_task.delay") as publish,
+        ):
+            original = asyncio.create_task(
+                MessageService.create_message(room=room, author=user, content="Olá", client_msg_id="c-1")
+            )
+            await asyncio.sleep(0)
+            retry = asyncio.create_task(
+                MessageService.create_message(room=room, author=user, content="Olá", client_msg_id="c-1")
+            )
+            await asyncio.sleep(0)
+            # O remetente original desconecta antes da gravação
+            original.cancel()
+
+            message, created = await retry
 
-            assert payload["message"]["reason"] == "content_violation"
+        assert original.cancelled()
+        assert created is False
+        stored = await Message.objects.aget(room=room, client_msg_id="c-1")
+        assert message.id == stored.id
+        publish.assert_called_once_with(str(stored.id))
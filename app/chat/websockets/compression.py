@@ -0,0 +1,110 @@
+from django.conf import settings
+from uvicorn.protocols.websockets.websockets_impl import WebSocketProtocol
+from uvicorn.workers import UvicornWorker
+from websockets.extensions.permessage_deflate import PerMessageDeflate, ServerPerMessageDeflateFactory
+from websockets.frames import OP_BINARY, OP_TEXT, Frame
+
+# Depende da implementação `websockets` (legada) do uvicorn: `WebSocketProtocol` herda de
+# `websockets.legacy.server.WebSocketServerProtocol`, que guarda as extensões negociáveis em
+# `available_extensions`, e monta `scope` antes de `run_asgi`. A faixa de versões do
+# `websockets` em pyproject.toml (>=14,<16) é a testada com essa API; o teste
+# `test_relies_on_legacy_uvicorn_protocol_api` falha se ela mudar.
+
+# Chave do scope ASGI com os contadores de compressão da conexão
+SCOPE_KEY = "chat.compression"
+
+
+def new_compression_stats() -> dict:
+    return {"raw_bytes": 0, "compressed_bytes": 0, "compressed_frames": 0, "skipped_frames": 0}
+
+
+class ThresholdPerMessageDeflate(PerMessageDeflate):
+    """
+    permessage-deflate que só comprime mensagens a partir de `min_size` bytes.
+
+    A RFC 7692 permite enviar qualquer mensagem sem compressão (RSV1 desligado); como a
+    mensagem pulada não passa pelo compressor, o contexto compartilhado com o cliente
+    continua consistente. Os bytes antes e depois da compressão vão para `stats`.
+    """
+
+    def __init__(self, *args, min_size: int, stats: dict, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.min_size = min_size
+        self.stats = stats
+
+    def encode(self, frame: Frame) -> Frame:
+        if frame.opcode not in (OP_TEXT, OP_BINARY) or not frame.fin:
+            return super().encode(frame)
+
+        if len(frame.data) < self.min_size:
+            self.stats["skipped_frames"] += 1
+            return frame
+
+        encoded = super().encode(frame)
+        self.stats["raw_bytes"] += len(frame.data)
+        self.stats["compressed_bytes"] += len(encoded.data)
+        self.stats["compressed_frames"] += 1
+        return encoded
+
+
+class ThresholdPerMessageDeflateFactory(ServerPerMessageDeflateFactory):
+    """Negocia o permessage-deflate e cria um `ThresholdPerMessageDeflate` por conexão."""
+
+    def __init__(self, min_size: int, stats: dict, **kwargs):
+        super().__init__(**kwargs)
+        self.min_size = min_size
+        self.stats = stats
+
+    def process_request_params(self, params, accepted_extensions):
+        response_params, extension = super().process_request_params(params, accepted_extensions)
+        return response_params, ThresholdPerMessageDeflate(
+            extension.remote_no_context_takeover,
+            extension.local_no_context_takeover,
+            extension.remote_max_window_bits,
+            extension.local_max_window_bits,
+            extension.compress_settings,
+            min_size=self.min_size,
+            stats=self.stats,
+        )
+
+
+class CompressedWebSocketProtocol(WebSocketProtocol):
+    """
+    Protocolo WebSocket do uvicorn com permessage-deflate configurável:
+
+    - `WS_DEFLATE_MIN_SIZE`: mensagens menores saem sem compressão.
+    - `WS_DEFLATE_LEVEL`: nível do zlib (1 = mais rápido).
+    - `WS_DEFLATE_WINDOW_BITS` e `WS_DEFLATE_MEM_LEVEL`: janela e memória do compressor,
+      que fica vivo durante toda a conexão.
+
+    Os contadores da conexão ficam no scope ASGI (`extensions["chat.compression"]`) e
+    são registrados pelos consumers ao desconectar.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.compression_stats = new_compression_stats()
+
+        self.available_extensions = []
+        if self.config.ws_per_message_deflate and settings.WS_DEFLATE_ENABLED:
+            self.available_extensions = [
+                ThresholdPerMessageDeflateFactory(
+                    min_size=settings.WS_DEFLATE_MIN_SIZE,
+                    stats=self.compression_stats,
+                    server_max_window_bits=settings.WS_DEFLATE_WINDOW_BITS,
+                    compress_settings={"level": settings.WS_DEFLATE_LEVEL, "memLevel": settings.WS_DEFLATE_MEM_LEVEL},
+                )
+            ]
+
+    async def run_asgi(self) -> None:
+        self.scope["extensions"][SCOPE_KEY] = self.compression_stats
+        await super().run_asgi()
+
+
+class ChatUvicornWorker(UvicornWorker):
+    """Worker do Gunicorn que serve WebSockets com `CompressedWebSocketProtocol`."""
+
+    CONFIG_KWARGS = {
+        **UvicornWorker.CONFIG_KWARGS,
+        "ws": "app.chat.websockets.compression.CompressedWebSocketProtocol",
+    }
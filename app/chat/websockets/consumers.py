@@ -1,17 +1,165 @@
-import json
+import uuid
 from typing import Any, Dict
+from urllib.parse import parse_qs
 
 import structlog
+from asgiref.sync import sync_to_async
 from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
+from django.conf import settings
 
-from app.chat.models import Room
-from app.chat.services.message_service import MessageService
+from app.chat.models import Message, Room
+from app.chat.services.message_service import MessageService, message_write_buffer
+from app.chat.services.rate_limiter import message_rate_limiter
+from app.chat.services.replay_buffer import room_replay_buffer
+from app.chat.websockets.outbound import OutboundQueue
+from app.chat.websockets.protocol import negotiate
 
 logger = structlog.get_logger(__name__)
 
 
-class ChatConsumer(AsyncWebsocketConsumer):
+async def load_replay(room_id, last_seq: int | None, log) -> tuple[list[str] | None, int | None]:
+    """Lê o buffer de replay da sala; se o cache estiver indisponível, trata como intervalo perdido."""
+    try:
+        return await sync_to_async(room_replay_buffer.replay)(room_id, last_seq)
+    except Exception as exc:
+        log.warning("replay_buffer_unavailable", room_id=str(room_id), error=str(exc))
+        return None, None
+
+
+class WireProtocolMixin:
+    """
+    Protocolo de fio negociado no handshake: JSON (padrão) ou MessagePack compacto, se o
+    cliente oferecer o subprotocolo `chat.msgpack.v1`. Todo frame enviado passa por aqui.
+    """
+
+    async def accept_negotiated(self) -> None:
+        """Aceita a conexão no protocolo escolhido por `negotiate`."""
+        await self.accept(subprotocol=self.protocol.subprotocol)
+
+    async def send_frame(self, frame: Dict[str, Any]) -> None:
+        await self.send_data(self.protocol.encode(frame))
+
+    async def send_data(self, data: str | bytes) -> None:
+        """Envia um frame já codificado no protocolo da conexão."""
+        if isinstance(data, bytes):
+            await self.send(bytes_data=data)
+        else:
+            await self.send(text_data=data)
+
+
+def start_outbound_queue(consumer: WireProtocolMixin, log) -> OutboundQueue:
+    """Cria e inicia a fila de saída da conexão (chamado após o `accept`)."""
+    outbound = OutboundQueue(
+        consumer.send_data,
+        log=log,
+        protocol=consumer.protocol,
+        # Envio falhou: encerra a conexão, como na política `disconnect`
+        on_send_failed=lambda: consumer.close(code=1011),
+    )
+    outbound.start()
+    return outbound
+
+
+async def enqueue_event(consumer: WireProtocolMixin, frame: str | bytes, event: Dict[str, Any]) -> None:
+    """
+    Enfileira um evento de fan-out na fila de saída da conexão. Se a fila está cheia e a
+    política é `disconnect`, envia a dica de ressincronização e encerra a conexão.
+    """
+    outbound = getattr(consumer, "outbound", None)
+    if outbound is None or outbound.closing:
+        # Conexão recusada no connect ou já em encerramento
+        return
+    if not outbound.put(frame, event.get("room_id"), event.get("seq"), batchable=event["type"] == "chat_message"):
+        outbound.closing = True
+        await consumer.send_frame(outbound.resync_hint())
+        await consumer.close(code=4008)
+
+
+def outbound_stats(outbound: OutboundQueue | None) -> dict:
+    if outbound is None:
+        return {}
+    return {"outbound_max_depth": outbound.max_depth, "outbound_dropped": outbound.dropped}
+
+
+def compression_stats(scope: Dict[str, Any]) -> dict:
+    """Contadores do permessage-deflate da conexão, se o servidor os expõe (`CompressedWebSocketProtocol`)."""
+    stats = scope.get("extensions", {}).get("chat.compression")
+    if not stats or not stats["raw_bytes"]:
+        return {}
+    return {
+        "deflate_raw_bytes": stats["raw_bytes"],
+        "deflate_compressed_bytes": stats["compressed_bytes"],
+        "deflate_ratio": round(stats["compressed_bytes"] / stats["raw_bytes"], 3),
+        "deflate_skipped_frames": stats["skipped_frames"],
+    }
+
+
+def rate_limited_frame(retry_after: float, room_id: str | None = None) -> dict:
+    """Frame de erro para um `chat_message` recusado pelo rate limit."""
+    frame = {
+        "type": "error",
+        "code": "rate_limited",
+        "message": "Limite de mensagens excedido, aguarde antes de enviar novamente",
+        "retry_after": round(retry_after, 3),
+    }
+    if room_id is not None:
+        frame["room_id"] = room_id
+    return frame
+
+
+def parse_client_msg_id(data: Dict[str, Any]) -> str | None:
+    """Chave de idempotência do frame `chat_message` ("" se ausente, None se inválida)."""
+    value = data.get("client_msg_id")
+    if value is None:
+        return ""
+    if not isinstance(value, str) or not 0 < len(value) <= Message.CLIENT_MSG_ID_MAX_LENGTH:
+        return None
+    return value
+
+
+async def find_duplicate(room: Room, user, client_msg_id: str) -> tuple[Message | None, bool]:
+    """
+    Procura um envio anterior com a mesma chave de idempotência, antes do rate limit.
+
+    Returns:
+        (mensagem já gravada, original ainda no buffer de escrita): reenvios não gastam
+        ficha; os que aguardam o buffer seguem para `create_message`, que espera a gravação
+        da original
+    """
+    if not client_msg_id:
+        return None, False
+    if message_write_buffer.has_pending(room.id, user.id, client_msg_id):
+        return None, True
+    return await MessageService.find_by_client_msg_id(room, user, client_msg_id), False
+
+
+def message_queued_frame(message: Message, room_id: str | None = None) -> dict:
+    """Ack de um `chat_message` gravado; reenvios com o mesmo `client_msg_id` recebem o mesmo frame."""
+    frame = {
+        "type": "message_queued",
+        "message": {
+            "id": str(message.id),
+            "content": message.content,
+            "status": message.status,
+            "created_at": message.created_at.isoformat(),
+        },
+    }
+    if message.client_msg_id:
+        frame["message"]["client_msg_id"] = message.client_msg_id
+    if room_id is not None:
+        frame["room_id"] = room_id
+    return frame
+
+
+def parse_last_seq(value) -> int | None:
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class ChatConsumer(WireProtocolMixin, AsyncWebsocketConsumer):
     """
     Consumer WebSocket para chat em tempo real.
 
@@ -20,6 +168,22 @@ class ChatConsumer(AsyncWebsocketConsumer):
     - Receber mensagens e disparar moderação
     - Broadcast de mensagens aprovadas
     - Notificações de rejeição
+
+    Sala e participação são verificadas uma única vez no `connect` e mantidas na
+    conexão. Remoções chegam pelo evento `membership_revoked`, que encerra o socket;
+    enviar uma mensagem não faz leituras extras no banco.
+
+    Cada `chat_message` passa pelo rate limit do usuário (`MessageRateLimiter`) antes de
+    ser gravado; frames acima do orçamento recebem um erro `rate_limited`.
+
+    O frame pode trazer `client_msg_id` (até 64 caracteres): um reenvio com a mesma chave
+    recebe o `message_queued` da mensagem original, sem nova gravação nem moderação, e
+    sem consumir o rate limit.
+
+    Eventos de fan-out passam pela fila de saída limitada da conexão (`OutboundQueue`).
+
+    Ao reconectar, o cliente informa `?last_seq=<n>` (a `seq` do último `chat_message`
+    recebido) e o consumer reenvia os frames perdidos a partir do buffer de replay da sala.
     """
 
     async def connect(self) -> None:
@@ -30,6 +194,9 @@ class ChatConsumer(AsyncWebsocketConsumer):
         self.room_id = self.scope["url_route"]["kwargs"]["room_id"]
         self.room_group_name = f"chat_{self.room_id}"
         self.user = self.scope["user"]
+        self.protocol = negotiate(self.scope.get("subprotocols", []))
+        self.replayed_seq = None
+        self.rate_buckets = {}
 
         log = logger.bind(user_id=str(getattr(self.user, "id", "anon")), room_id=self.room_id)
 
@@ -45,6 +212,11 @@ class ChatConsumer(AsyncWebsocketConsumer):
             await self.close(code=4004)
             return
 
+        # Entra no grupo do usuário antes de checar a permissão para não perder
+        # um `membership_revoked` emitido entre a checagem e o accept.
+        user_channel_name = f"user_{self.user.id}"
+        await self.channel_layer.group_add(user_channel_name, self.channel_name)
+
         is_allowed = await self._check_permission()
         if not is_allowed:
             log.warning("ws_connection_forbidden", reason="not_participant")
@@ -53,16 +225,46 @@ class ChatConsumer(AsyncWebsocketConsumer):
 
         await self.channel_layer.group_add(self.room_group_name, self.channel_name)
 
-        user_channel_name = f"user_{self.user.id}"
-        await self.channel_layer.group_add(user_channel_name, self.channel_name)
-
-        await self.accept()
+        await self.accept_negotiated()
         log.info("ws_connected")
+        self.outbound = start_outbound_queue(self, log)
+
+        await self._send_backlog(log)
 
-        await self.send(
-            text_data=json.dumps({"type": "connection_established", "message": f"Conectado à sala {self.room_id}"})
+    async def _send_backlog(self, log) -> None:
+        """
+        Envia `connection_established` com a sequência atual da sala e, se o cliente
+        informou `last_seq`, os frames perdidos desde então.
+
+        O consumer já está no grupo da sala, então eventos ao vivo não se perdem durante
+        o replay; os que já foram reenviados são descartados em `chat_message`. Se o
+        intervalo saiu do buffer, envia `replay_gap` e o cliente recupera o histórico pela
+        API (`?since=`): só nesse caso a reconexão chega ao banco.
+        """
+        last_seq = parse_last_seq(parse_qs(self.scope.get("query_string", b"").decode()).get("last_seq", [None])[0])
+        frames, current_seq = await load_replay(self.room.id, last_seq, log)
+
+        await self.send_frame(
+            {
+                "type": "connection_established",
+                "message": f"Conectado à sala {self.room_id}",
+                "seq": current_seq,
+            }
         )
 
+        if last_seq is None:
+            return
+
+        if frames is None:
+            log.info("ws_replay_gap", last_seq=last_seq, current_seq=current_seq)
+            await self.send_frame({"type": "replay_gap", "last_seq": last_seq, "seq": current_seq})
+            return
+
+        for frame in frames:
+            await self.send_data(self.protocol.stored_frame(frame))
+        self.replayed_seq = last_seq + len(frames)
+        log.info("ws_replayed", last_seq=last_seq, count=len(frames))
+
     async def disconnect(self, close_code: int) -> None:
         """
         Desconecta usuário do WebSocket e remove do grupo.
@@ -77,47 +279,46 @@ class ChatConsumer(AsyncWebsocketConsumer):
             user_channel_name = f"user_{self.user.id}"
             await self.channel_layer.group_discard(user_channel_name, self.channel_name)
 
-        logger.info("ws_disconnected", user_id=str(getattr(self.user, "id", "anon")), close_code=close_code)
+        outbound = getattr(self, "outbound", None)
+        if outbound is not None:
+            await outbound.stop()
 
-    async def receive(self, text_data: str) -> None:
+        logger.info(
+            "ws_disconnected",
+            user_id=str(getattr(self.user, "id", "anon")),
+            close_code=close_code,
+            **outbound_stats(outbound),
+            **compression_stats(self.scope),
+        )
+
+    async def receive(self, text_data: str | None = None, bytes_data: bytes | None = None) -> None:
         """
         Recebe mensagem do cliente, valida e envia para moderação.
 
         Args:
             text_data: Mensagem JSON do cliente
+            bytes_data: Mensagem MessagePack do cliente (subprotocolo `chat.msgpack.v1`)
         """
         log = logger.bind(user_id=str(self.user.id), room_id=self.room_id)
         try:
-            data = json.loads(text_data)
+            data = self.protocol.decode(text_data, bytes_data)
+        except ValueError:
+            log.warning("ws_invalid_frame", subprotocol=self.protocol.subprotocol)
+            await self.send_frame({"type": "error", "message": self.protocol.invalid_frame_message})
+            return
+
+        try:
             message_type = data.get("type")
 
             if message_type == "chat_message":
-                is_participant = await self._is_user_participant()
-                if not is_participant:
-                    log.warning("ws_message_denied", reason="no_longer_participant")
-                    await self.send(
-                        text_data=json.dumps({"type": "error", "message": "Você não é mais participante desta sala"})
-                    )
-                    await self.close(code=4003)
-                    return
-
                 await self._handle_chat_message(data)
             else:
                 log.warning("ws_unknown_message_type", type=message_type)
-                await self.send(
-                    text_data=json.dumps(
-                        {"type": "error", "message": f"Tipo de mensagem desconhecido: {message_type}"}
-                    )
-                )
-
-        except json.JSONDecodeError:
-            log.warning("ws_invalid_json")
-            await self.send(text_data=json.dumps({"type": "error", "message": "JSON inválido"}))
+                await self.send_frame({"type": "error", "message": f"Tipo de mensagem desconhecido: {message_type}"})
+
         except Exception as e:
             log.exception("ws_receive_error")
-            await self.send(
-                text_data=json.dumps({"type": "error", "message": f"Erro ao processar mensagem: {str(e)}"})
-            )
+            await self.send_frame({"type": "error", "message": f"Erro ao processar mensagem: {str(e)}"})
 
     async def _handle_chat_message(self, data: Dict[str, Any]) -> None:
         """
@@ -129,37 +330,51 @@ class ChatConsumer(AsyncWebsocketConsumer):
         content = data.get("message", "").strip()
 
         if not content:
-            await self.send(text_data=json.dumps({"type": "error", "message": "Mensagem vazia"}))
-            return
-
-        room = await self._get_room()
-        message = await MessageService.create_message(room=room, author=self.user, content=content)
-
-        logger.info("ws_message_queued", message_id=str(message.id), user_id=str(self.user.id))
-
-        await self.send(
-            text_data=json.dumps(
-                {
-                    "type": "message_queued",
-                    "message": {
-                        "id": str(message.id),
-                        "content": message.content,
-                        "status": message.status,
-                        "created_at": message.created_at.isoformat(),
-                    },
-                }
-            )
+            await self.send_frame({"type": "error", "message": "Mensagem vazia"})
+            return
+
+        client_msg_id = parse_client_msg_id(data)
+        if client_msg_id is None:
+            await self.send_frame({"type": "error", "message": "client_msg_id inválido"})
+            return
+
+        # Reenvio de uma mensagem já recebida: responde com o ack original sem gastar ficha do rate limit
+        existing, buffered = await find_duplicate(self.room, self.user, client_msg_id)
+        if existing is not None:
+            logger.info("ws_message_duplicate", message_id=str(existing.id), user_id=str(self.user.id))
+            await self.send_frame(message_queued_frame(existing))
+            return
+
+        retry_after = 0.0
+        if not buffered:
+            retry_after = await message_rate_limiter.acquire(self.rate_buckets, self.room.id, self.user.id)
+        if retry_after:
+            logger.info("ws_message_rate_limited", user_id=str(self.user.id), room_id=self.room_id)
+            await self.send_frame(rate_limited_frame(retry_after))
+            return
+
+        # A chave já foi buscada acima
+        message, created = await MessageService.create_message(
+            room=self.room, author=self.user, content=content, client_msg_id=client_msg_id, lookup=False
         )
 
+        logger.info("ws_message_queued", message_id=str(message.id), user_id=str(self.user.id), duplicate=not created)
+
+        await self.send_frame(message_queued_frame(message))
+
     async def chat_message(self, event: Dict[str, Any]) -> None:
         """
         Handler para broadcast de mensagens aprovadas.
         Chamado pelo Celery via channel layer.
 
         Args:
-            event: Evento com dados da mensagem
+            event: Evento com o frame pré-serializado (ou, em eventos legados, os dados da mensagem)
         """
-        await self.send(text_data=json.dumps({"type": "chat_message", "message": event["message"]}))
+        seq = event.get("seq")
+        if seq is not None and self.replayed_seq is not None and seq <= self.replayed_seq:
+            # Já entregue pelo replay do connect
+            return
+        await self._send_event_frame("chat_message", event)
 
     async def message_rejected(self, event: Dict[str, Any]) -> None:
         """
@@ -167,9 +382,27 @@ class ChatConsumer(AsyncWebsocketConsumer):
         Chamado pelo Celery via channel layer.
 
         Args:
-            event: Evento com dados da rejeição
+            event: Evento com o frame pré-serializado (ou, em eventos legados, os dados da rejeição)
+        """
+        await self._send_event_frame("message_rejected", event)
+
+    async def _send_event_frame(self, event_type: str, event: Dict[str, Any]) -> None:
+        await enqueue_event(self, self.protocol.event_frame(event_type, event), event)
+
+    async def membership_revoked(self, event: Dict[str, Any]) -> None:
+        """
+        Handler para remoção do usuário de uma sala.
+        Enviado por `RoomService.remove_participant` para o grupo do usuário.
+
+        Args:
+            event: Evento com o ID da sala
         """
-        await self.send(text_data=json.dumps({"type": "message_rejected", "message": event["message"]}))
+        if event["room_id"] != str(self.room.id) or not self.room.is_private:
+            return
+
+        logger.info("ws_membership_revoked", user_id=str(self.user.id), room_id=self.room_id)
+        await self.send_frame({"type": "error", "message": "Você não é mais participante desta sala"})
+        await self.close(code=4003)
 
     @database_sync_to_async
     def _get_room(self) -> Room:
@@ -195,18 +428,241 @@ class ChatConsumer(AsyncWebsocketConsumer):
 
         return RoomParticipant.objects.filter(room=self.room, user=self.user).exists()
 
-    @database_sync_to_async
-    def _is_user_participant(self) -> bool:
+
+class MultiplexChatConsumer(WireProtocolMixin, AsyncWebsocketConsumer):
+    """
+    Consumer WebSocket multiplexado: uma conexão autenticada acompanha várias salas.
+
+    Em vez de um socket por sala (`ws/chat/<room_id>/`), o cliente abre `ws/chat/` uma
+    vez, o JWT é validado uma vez, o grupo `user_<id>` recebe um único canal, e as salas
+    entram e saem com frames de controle:
+
+    - `{"type": "subscribe", "room_id": ..., "last_seq": n?}`: checa sala e permissão,
+      entra no grupo da sala e reenvia o que o cliente perdeu (como `ChatConsumer`).
+    - `{"type": "unsubscribe", "room_id": ...}`: sai do grupo da sala.
+    - `{"type": "chat_message", "room_id": ..., "message": ..., "client_msg_id": ...?}`:
+      envia numa sala assinada (`client_msg_id` como em `ChatConsumer`).
+
+    Todos os eventos carregam `room_id`. Remover o usuário de uma sala privada cancela
+    apenas aquela assinatura, sem encerrar a conexão.
+    """
+
+    async def connect(self) -> None:
+        self.user = self.scope["user"]
+        self.protocol = negotiate(self.scope.get("subprotocols", []))
+        self.rooms: dict[str, Room] = {}
+        self.replayed_seq: dict[str, int] = {}
+        self.rate_buckets = {}
+
+        if not self.user.is_authenticated:
+            logger.warning("ws_connection_unauthenticated")
+            await self.close(code=4001)
+            return
+
+        await self.channel_layer.group_add(f"user_{self.user.id}", self.channel_name)
+        await self.accept_negotiated()
+        log = logger.bind(user_id=str(self.user.id))
+        log.info("ws_connected", multiplexed=True)
+        self.outbound = start_outbound_queue(self, log)
+
+        await self.send_frame({"type": "connection_established", "message": "Conectado"})
+
+    async def disconnect(self, close_code: int) -> None:
+        for room_id in getattr(self, "rooms", {}):
+            await self.channel_layer.group_discard(f"chat_{room_id}", self.channel_name)
+
+        if hasattr(self, "user") and self.user.is_authenticated:
+            await self.channel_layer.group_discard(f"user_{self.user.id}", self.channel_name)
+
+        outbound = getattr(self, "outbound", None)
+        if outbound is not None:
+            await outbound.stop()
+
+        logger.info(
+            "ws_disconnected",
+            user_id=str(getattr(self.user, "id", "anon")),
+            close_code=close_code,
+            rooms=len(getattr(self, "rooms", {})),
+            **outbound_stats(outbound),
+            **compression_stats(self.scope),
+        )
+
+    async def receive(self, text_data: str | None = None, bytes_data: bytes | None = None) -> None:
         """
-        Verifica se o usuário ainda é participante da sala.
-        Usado no receive para detectar se foi removido durante a conexão.
+        Recebe frames de controle e mensagens do cliente.
 
-        Returns:
-            bool: True se ainda é participante, False caso contrário
+        Args:
+            text_data: Frame JSON do cliente
+            bytes_data: Frame MessagePack do cliente (subprotocolo `chat.msgpack.v1`)
         """
-        from app.chat.models import RoomParticipant
+        log = logger.bind(user_id=str(self.user.id))
+        try:
+            data = self.protocol.decode(text_data, bytes_data)
+        except ValueError:
+            log.warning("ws_invalid_frame", subprotocol=self.protocol.subprotocol)
+            await self._send_error(self.protocol.invalid_frame_message)
+            return
 
-        if not self.room.is_private:
-            return True
+        try:
+            message_type = data.get("type")
+            handler = {
+                "subscribe": self._handle_subscribe,
+                "unsubscribe": self._handle_unsubscribe,
+                "chat_message": self._handle_chat_message,
+            }.get(message_type)
 
-        return RoomParticipant.objects.filter(room=self.room, user=self.user).exists()
+            if handler is None:
+                log.warning("ws_unknown_message_type", type=message_type)
+                await self._send_error(f"Tipo de mensagem desconhecido: {message_type}")
+                return
+
+            await handler(data, log)
+
+        except Exception as e:
+            log.exception("ws_receive_error")
+            await self._send_error(f"Erro ao processar mensagem: {str(e)}")
+
+    async def _handle_subscribe(self, data: Dict[str, Any], log) -> None:
+        room_id = self._parse_room_id(data)
+        if room_id is None:
+            await self._send_error("room_id inválido")
+            return
+        log = log.bind(room_id=room_id)
+
+        if room_id not in self.rooms and len(self.rooms) >= settings.WS_MAX_SUBSCRIPTIONS:
+            await self._send_error("Limite de salas por conexão atingido", room_id)
+            return
+
+        room = await self._get_accessible_room(room_id)
+        if room is None:
+            log.warning("ws_subscribe_forbidden")
+            await self._send_error("Sala não encontrada ou acesso negado", room_id)
+            return
+
+        # Entra no grupo antes do replay: eventos ao vivo ficam na fila e os já
+        # reenviados são descartados em `chat_message`.
+        await self.channel_layer.group_add(f"chat_{room_id}", self.channel_name)
+        self.rooms[room_id] = room
+        self.replayed_seq.pop(room_id, None)
+
+        last_seq = parse_last_seq(data.get("last_seq"))
+        frames, current_seq = await load_replay(room.id, last_seq, log)
+        await self.send_frame({"type": "subscribed", "room_id": room_id, "seq": current_seq})
+        log.info("ws_subscribed", rooms=len(self.rooms))
+
+        if last_seq is None:
+            return
+
+        if frames is None:
+            log.info("ws_replay_gap", last_seq=last_seq, current_seq=current_seq)
+            await self.send_frame({"type": "replay_gap", "room_id": room_id, "last_seq": last_seq, "seq": current_seq})
+            return
+
+        for frame in frames:
+            await self.send_data(self.protocol.stored_frame(frame))
+        self.replayed_seq[room_id] = last_seq + len(frames)
+
+    async def _handle_unsubscribe(self, data: Dict[str, Any], log) -> None:
+        room_id = self._parse_room_id(data)
+        if room_id is None:
+            await self._send_error("room_id inválido")
+            return
+
+        await self._leave_room(room_id)
+        await self.send_frame({"type": "unsubscribed", "room_id": room_id})
+        log.info("ws_unsubscribed", room_id=room_id, rooms=len(self.rooms))
+
+    async def _handle_chat_message(self, data: Dict[str, Any], log) -> None:
+        room_id = self._parse_room_id(data)
+        room = self.rooms.get(room_id)
+        if room is None:
+            await self._send_error("Assine a sala antes de enviar mensagens", room_id)
+            return
+
+        content = data.get("message", "").strip()
+        if not content:
+            await self._send_error("Mensagem vazia", room_id)
+            return
+
+        client_msg_id = parse_client_msg_id(data)
+        if client_msg_id is None:
+            await self._send_error("client_msg_id inválido", room_id)
+            return
+
+        # Reenvio de uma mensagem já recebida: responde com o ack original sem gastar ficha do rate limit
+        existing, buffered = await find_duplicate(room, self.user, client_msg_id)
+        if existing is not None:
+            log.info("ws_message_duplicate", message_id=str(existing.id), room_id=room_id)
+            await self.send_frame(message_queued_frame(existing, room_id))
+            return
+
+        retry_after = 0.0
+        if not buffered:
+            retry_after = await message_rate_limiter.acquire(self.rate_buckets, room.id, self.user.id)
+        if retry_after:
+            log.info("ws_message_rate_limited", room_id=room_id)
+            await self.send_frame(rate_limited_frame(retry_after, room_id))
+            return
+
+        # A chave já foi buscada acima
+        message, created = await MessageService.create_message(
+            room=room, author=self.user, content=content, client_msg_id=client_msg_id, lookup=False
+        )
+        log.info("ws_message_queued", message_id=str(message.id), room_id=room_id, duplicate=not created)
+
+        await self.send_frame(message_queued_frame(message, room_id))
+
+    async def chat_message(self, event: Dict[str, Any]) -> None:
+        """Handler para broadcast de mensagens aprovadas das salas assinadas."""
+        room_id = event.get("room_id")
+        if room_id not in self.rooms:
+            # Evento já enfileirado quando a sala foi desassinada
+            return
+
+        seq = event.get("seq")
+        replayed_seq = self.replayed_seq.get(room_id)
+        if seq is not None and replayed_seq is not None and seq <= replayed_seq:
+            return
+        await enqueue_event(self, self.protocol.event_frame(event["type"], event), event)
+
+    async def message_rejected(self, event: Dict[str, Any]) -> None:
+        """Handler para notificação de mensagem rejeitada (grupo do usuário)."""
+        await enqueue_event(self, self.protocol.event_frame(event["type"], event), event)
+
+    async def membership_revoked(self, event: Dict[str, Any]) -> None:
+        """Cancela a assinatura da sala privada da qual o usuário foi removido."""
+        room_id = event["room_id"]
+        room = self.rooms.get(room_id)
+        if room is None or not room.is_private:
+            return
+
+        await self._leave_room(room_id)
+        logger.info("ws_membership_revoked", user_id=str(self.user.id), room_id=room_id)
+        await self.send_frame({"type": "unsubscribed", "room_id": room_id, "reason": "membership_revoked"})
+
+    async def _leave_room(self, room_id: str) -> None:
+        if self.rooms.pop(room_id, None) is not None:
+            await self.channel_layer.group_discard(f"chat_{room_id}", self.channel_name)
+        self.replayed_seq.pop(room_id, None)
+        self.outbound.discard_room(room_id)
+
+    async def _send_error(self, message: str, room_id: str | None = None) -> None:
+        frame = {"type": "error", "message": message}
+        if room_id is not None:
+            frame["room_id"] = room_id
+        await self.send_frame(frame)
+
+    @staticmethod
+    def _parse_room_id(data: Dict[str, Any]) -> str | None:
+        try:
+            return str(uuid.UUID(str(data.get("room_id"))))
+        except ValueError:
+            return None
+
+    @database_sync_to_async
+    def _get_accessible_room(self, room_id: str) -> Room | None:
+        """Sala, se existir e o usuário puder acessá-la (pública ou participante), numa única consulta."""
+        room = Room.objects.with_membership(self.user).filter(id=room_id).first()
+        if room is None or (room.is_private and not room.is_member):
+            return None
+        return room
@@ -0,0 +1,272 @@
+import asyncio
+import contextlib
+import time
+from collections import Counter, deque
+from typing import Awaitable, Callable, NamedTuple
+
+import structlog
+from django.conf import settings
+
+from app.chat.websockets.protocol import JsonWireProtocol, MsgpackWireProtocol, json_protocol
+
+logger = structlog.get_logger(__name__)
+
+
+class OutboundFrame(NamedTuple):
+    # Frame já codificado no protocolo da conexão (texto JSON ou bytes MessagePack)
+    data: str | bytes
+    room_id: str | None = None
+    # Intervalo de sequências da sala coberto pelo frame: igual a `seq` num `chat_message`,
+    # maior num `replay_gap` que resume frames descartados. None para eventos sem sequência.
+    first_seq: int | None = None
+    seq: int | None = None
+    # `chat_message` ao vivo: pode ser agrupado num frame `chat_messages`
+    batchable: bool = False
+
+
+class OutboundQueue:
+    """
+    Fila de saída limitada de uma conexão WebSocket.
+
+    Os handlers de fan-out (`chat_message`, `message_rejected`) só enfileiram o frame e
+    retornam; uma task por conexão envia os frames em ordem. Um cliente lento passa a
+    atrasar apenas a própria fila, e não o consumo do channel layer nem os buffers do
+    servidor ASGI. A fila guarda até `WS_OUTBOUND_QUEUE_SIZE` frames; ao encher, aplica
+    `WS_OUTBOUND_OVERFLOW_POLICY`:
+
+    - `drop_oldest`: descarta o frame mais antigo (o cliente percebe o salto em `seq`).
+    - `coalesce`: resume os `chat_message` enfileirados de cada sala num único
+      `replay_gap` (`last_seq`..`seq`), que o cliente recupera pelo replay ou por `?since=`.
+      Sem frames com sequência para resumir, descarta o mais antigo.
+    - `disconnect`: a conexão é encerrada com uma dica de ressincronização (`resync_hint`).
+
+    A profundidade é acompanhada por conexão: `max_depth`, `dropped` e um aviso
+    `ws_outbound_lagging` quando a fila passa da metade da capacidade.
+
+    Agrupamento adaptativo: quando a conexão recebe ao menos `WS_COALESCE_RATE_THRESHOLD`
+    `chat_message` por segundo, o envio espera até `WS_COALESCE_WINDOW_MS` pelos
+    seguintes e os manda num único frame `{"type": "chat_messages", "messages": [...]}`
+    (até `WS_COALESCE_MAX_BATCH` por frame). Volta à entrega imediata quando a taxa cai
+    abaixo da metade do limite. Cada item de `messages` é o frame `chat_message` original.
+
+    Os frames chegam já codificados no protocolo da conexão (`protocol`), usado também
+    para montar `replay_gap` e `chat_messages`.
+
+    Se um envio falhar, a fila é marcada como encerrada (`put` passa a descartar os
+    frames) e `on_send_failed` é chamado para fechar a conexão.
+    """
+
+    DROP_OLDEST = "drop_oldest"
+    COALESCE = "coalesce"
+    DISCONNECT = "disconnect"
+    POLICIES = (DROP_OLDEST, COALESCE, DISCONNECT)
+    # Intervalo de medição da taxa de eventos, em segundos
+    RATE_WINDOW = 1.0
+
+    def __init__(
+        self,
+        send: Callable[[str | bytes], Awaitable[None]],
+        log=logger,
+        protocol: JsonWireProtocol | MsgpackWireProtocol = json_protocol,
+        capacity: int | None = None,
+        policy: str | None = None,
+        coalesce_rate: float | None = None,
+        on_send_failed: Callable[[], Awaitable[None]] | None = None,
+    ):
+        self.capacity = capacity or settings.WS_OUTBOUND_QUEUE_SIZE
+        self.policy = policy or settings.WS_OUTBOUND_OVERFLOW_POLICY
+        if self.policy not in self.POLICIES:
+            raise ValueError(f"WS_OUTBOUND_OVERFLOW_POLICY inválida: {self.policy}")
+        self.coalesce_rate = settings.WS_COALESCE_RATE_THRESHOLD if coalesce_rate is None else coalesce_rate
+        self.coalesce_window = settings.WS_COALESCE_WINDOW_MS / 1000
+        self.max_batch = settings.WS_COALESCE_MAX_BATCH
+        self.coalescing = False
+
+        self.delivered_seq: dict[str, int] = {}
+        self.max_depth = 0
+        self.dropped = 0
+        # Marcado quando a conexão está sendo encerrada por overflow (política `disconnect`)
+        self.closing = False
+        self._send = send
+        self._on_send_failed = on_send_failed
+        self._log = log
+        self._protocol = protocol
+        self._items: deque[OutboundFrame] = deque()
+        self._ready = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._lagging = False
+        self._rate_started = time.monotonic()
+        self._rate_count = 0
+
+    @property
+    def depth(self) -> int:
+        return len(self._items)
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Encerra a task de envio; frames ainda enfileirados são descartados."""
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    def put(
+        self, data: str | bytes, room_id: str | None = None, seq: int | None = None, batchable: bool = False
+    ) -> bool:
+        """
+        Enfileira um frame já codificado.
+
+        Args:
+            data: Frame no protocolo da conexão
+            room_id: Sala do evento, se houver
+            seq: Sequência do evento na sala, se houver
+            batchable: Se o frame é um `chat_message` que pode ir num `chat_messages`
+
+        Returns:
+            False se a fila está cheia e a política é `disconnect` (o frame não foi enfileirado)
+        """
+        if self.closing:
+            # Conexão em encerramento: ninguém mais esvazia a fila
+            return True
+
+        if len(self._items) >= self.capacity:
+            if self.policy == self.DISCONNECT:
+                self._log.warning("ws_outbound_overflow", policy=self.policy, depth=len(self._items))
+                return False
+            self._make_room()
+
+        self._items.append(OutboundFrame(data, room_id, seq, seq, batchable))
+        self._ready.set()
+        if batchable and self.coalesce_rate:
+            self._track_rate()
+
+        depth = len(self._items)
+        self.max_depth = max(self.max_depth, depth)
+        if not self._lagging and depth * 2 >= self.capacity:
+            self._lagging = True
+            self._log.warning("ws_outbound_lagging", depth=depth, capacity=self.capacity)
+        return True
+
+    def discard_room(self, room_id: str) -> None:
+        """Remove os frames enfileirados de uma sala (ex: sala desassinada)."""
+        self._items = deque(item for item in self._items if item.room_id != room_id)
+        self.delivered_seq.pop(room_id, None)
+
+    def resync_hint(self) -> dict:
+        """
+        Frame enviado antes de encerrar uma conexão lenta: para cada sala, a última
+        sequência entregue, a ser informada como `last_seq` ao reconectar ou reassinar.
+        """
+        rooms = dict(self.delivered_seq)
+        for item in self._items:
+            if item.first_seq is not None and item.room_id not in rooms:
+                rooms[item.room_id] = item.first_seq - 1
+        return {"type": "resync", "reason": "slow_consumer", "last_seq": rooms}
+
+    def _track_rate(self) -> None:
+        """Mede a taxa de `chat_message` por janela e liga/desliga o agrupamento (com histerese)."""
+        self._rate_count += 1
+        now = time.monotonic()
+        elapsed = now - self._rate_started
+        if elapsed < self.RATE_WINDOW:
+            return
+
+        rate = self._rate_count / elapsed
+        self._rate_started, self._rate_count = now, 0
+        coalescing = rate >= (self.coalesce_rate / 2 if self.coalescing else self.coalesce_rate)
+        if coalescing != self.coalescing:
+            self.coalescing = coalescing
+            self._log.info("ws_coalescing_changed", coalescing=coalescing, rate=round(rate, 1))
+
+    def _make_room(self) -> None:
+        if self.policy == self.COALESCE and self._coalesce():
+            return
+        self._items.popleft()
+        self.dropped += 1
+
+    def _coalesce(self) -> bool:
+        """Troca os frames com sequência de cada sala por um `replay_gap`. Retorna False se não havia o que resumir."""
+        ranges: dict[str, tuple[int, int]] = {}
+        counts: Counter[str] = Counter()
+        for item in self._items:
+            if item.seq is not None:
+                counts[item.room_id] += 1
+                first, last = ranges.get(item.room_id, (item.first_seq, item.seq))
+                ranges[item.room_id] = (min(first, item.first_seq), max(last, item.seq))
+
+        # Salas com um único frame não ganham nada ao virar `replay_gap`
+        ranges = {room_id: bounds for room_id, bounds in ranges.items() if counts[room_id] > 1}
+        if not ranges:
+            return False
+
+        collapsed = set(ranges)
+        before = len(self._items)
+        items: deque[OutboundFrame] = deque()
+        for item in self._items:
+            if item.seq is None or item.room_id not in collapsed:
+                items.append(item)
+            elif item.room_id in ranges:
+                first, last = ranges.pop(item.room_id)
+                gap = {"type": "replay_gap", "room_id": item.room_id, "last_seq": first - 1, "seq": last}
+                items.append(OutboundFrame(self._protocol.encode(gap), item.room_id, first, last))
+
+        self._items = items
+        self.dropped += before - len(items)
+        return True
+
+    async def _run(self) -> None:
+        while True:
+            while not self._items:
+                if self._lagging:
+                    self._lagging = False
+                    self._log.info("ws_outbound_recovered", max_depth=self.max_depth, dropped=self.dropped)
+                self._ready.clear()
+                await self._ready.wait()
+
+            item = self._items.popleft()
+            batch = [item]
+            if item.batchable and self.coalescing:
+                await self._collect_batch(batch)
+
+            if len(batch) == 1:
+                data = item.data
+            else:
+                data = self._protocol.batch([item.data for item in batch])
+
+            try:
+                await self._send(data)
+            except Exception as exc:
+                self._log.warning("ws_outbound_send_failed", error=str(exc), depth=len(self._items))
+                self.closing = True
+                self._items.clear()
+                if self._on_send_failed is not None:
+                    try:
+                        await self._on_send_failed()
+                    except Exception as close_exc:
+                        self._log.warning("ws_outbound_close_failed", error=str(close_exc))
+                return
+            for item in batch:
+                if item.seq is not None:
+                    self.delivered_seq[item.room_id] = item.seq
+
+    async def _collect_batch(self, batch: list[OutboundFrame]) -> None:
+        """Junta ao lote os `chat_message` seguintes, esperando até a janela de agrupamento."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.coalesce_window
+        while len(batch) < self.max_batch:
+            if not self._items:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    return
+                self._ready.clear()
+                try:
+                    await asyncio.wait_for(self._ready.wait(), remaining)
+                except asyncio.TimeoutError:
+                    return
+                continue
+            if not self._items[0].batchable:
+                return
+            batch.append(self._items.popleft())
@@ -0,0 +1,134 @@
+import json
+from datetime import datetime
+
+import msgpack
+import orjson
+from django.conf import settings
+
+# Nomes curtos dos campos no protocolo MessagePack; campos fora do mapa mantêm o nome
+COMPACT_FIELDS = {
+    "type": "t",
+    "message": "m",
+    "messages": "ms",
+    "room_id": "r",
+    "seq": "s",
+    "last_seq": "ls",
+    "id": "i",
+    "content": "c",
+    "author": "a",
+    "name": "n",
+    "email": "e",
+    "status": "st",
+    "created_at": "ts",
+    "updated_at": "ut",
+    "reason": "rs",
+    "code": "cd",
+    "retry_after": "ra",
+    "client_msg_id": "k",
+}
+EXPANDED_FIELDS = {short: name for name, short in COMPACT_FIELDS.items()}
+# Enviados como milissegundos desde a época em vez de ISO 8601
+TIMESTAMP_FIELDS = {"created_at", "updated_at"}
+
+
+def compact(value):
+    """Troca os nomes dos campos pelos curtos e os timestamps ISO por epoch em milissegundos."""
+    if isinstance(value, dict):
+        result = {}
+        for name, item in value.items():
+            if name in TIMESTAMP_FIELDS and isinstance(item, str):
+                item = round(datetime.fromisoformat(item).timestamp() * 1000)
+            result[COMPACT_FIELDS.get(name, name)] = compact(item)
+        return result
+    if isinstance(value, list):
+        return [compact(item) for item in value]
+    return value
+
+
+def expand(value):
+    """Inverso de `compact` para os nomes dos campos (frames recebidos do cliente)."""
+    if isinstance(value, dict):
+        return {EXPANDED_FIELDS.get(name, name): expand(item) for name, item in value.items()}
+    if isinstance(value, list):
+        return [expand(item) for item in value]
+    return value
+
+
+class JsonWireProtocol:
+    """Protocolo padrão: frames de texto JSON, nos formatos documentados."""
+
+    subprotocol = None
+    invalid_frame_message = "JSON inválido"
+
+    def encode(self, frame: dict) -> str:
+        return json.dumps(frame)
+
+    def decode(self, text_data: str | None, bytes_data: bytes | None) -> dict:
+        if text_data is None:
+            raise ValueError("frame binário no protocolo JSON")
+        return json.loads(text_data)
+
+    def event_frame(self, event_type: str, event: dict) -> str:
+        """Frame de um evento do channel layer (pré-serializado pelo `BroadcastService`)."""
+        frame = event.get("frame")
+        if frame is None:
+            frame = self.encode({"type": event_type, "message": event["message"]})
+        return frame
+
+    def stored_frame(self, frame: str) -> str:
+        """Frame do buffer de replay (gravado em JSON)."""
+        return frame
+
+    def batch(self, frames: list[str]) -> str:
+        """Frame `chat_messages` com frames `chat_message` já codificados, sem reserializá-los."""
+        return '{"type":"chat_messages","messages":[' + ",".join(frames) + "]}"
+
+
+class MsgpackWireProtocol:
+    """
+    Subprotocolo `chat.msgpack.v1`: frames binários MessagePack com os nomes curtos de
+    `COMPACT_FIELDS` e timestamps em epoch (ms). O conteúdo é o mesmo dos frames JSON.
+
+    O `BroadcastService` codifica os eventos de fan-out uma vez (`packed`); frames
+    pré-serializados só em JSON (buffer de replay) são convertidos por destinatário.
+    """
+
+    subprotocol = "chat.msgpack.v1"
+    invalid_frame_message = "MessagePack inválido"
+
+    def encode(self, frame: dict) -> bytes:
+        return msgpack.packb(compact(frame))
+
+    def decode(self, text_data: str | None, bytes_data: bytes | None) -> dict:
+        if bytes_data is None:
+            raise ValueError("frame de texto no protocolo MessagePack")
+        return expand(msgpack.unpackb(bytes_data))
+
+    def event_frame(self, event_type: str, event: dict) -> bytes:
+        packed = event.get("packed")
+        if packed is not None:
+            return packed
+        frame = event.get("frame")
+        if frame is not None:
+            return self.stored_frame(frame)
+        return self.encode({"type": event_type, "message": event["message"]})
+
+    def stored_frame(self, frame: str) -> bytes:
+        return self.encode(orjson.loads(frame))
+
+    def batch(self, frames: list[bytes]) -> bytes:
+        # Os itens já são objetos MessagePack completos: basta escrever o cabeçalho do mapa e do array
+        packer = msgpack.Packer()
+        header = packer.pack_map_header(2) + packer.pack("t") + packer.pack("chat_messages") + packer.pack("ms")
+        return header + packer.pack_array_header(len(frames)) + b"".join(frames)
+
+
+json_protocol = JsonWireProtocol()
+msgpack_protocol = MsgpackWireProtocol()
+
+
+def negotiate(subprotocols: list[str]) -> JsonWireProtocol | MsgpackWireProtocol:
+    """Escolhe o protocolo pelos subprotocolos oferecidos no handshake (JSON se nenhum for suportado)."""
+    if settings.WS_MSGPACK_ENABLED and msgpack_protocol.subprotocol in subprotocols:
+        return msgpack_protocol
+    return json_protocol
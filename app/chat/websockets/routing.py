@@ -1,7 +1,8 @@
 from django.urls import re_path
 
-from app.chat.websockets.consumers import ChatConsumer
+from app.chat.websockets.consumers import ChatConsumer, MultiplexChatConsumer
 
 websocket_urlpatterns = [
+    re_path(r"ws/chat/$", MultiplexChatConsumer.as_asgi()),
     re_path(r"ws/chat/(?P<room_id>[0-9a-f-]+)/$", ChatConsumer.as_asgi()),
 ]
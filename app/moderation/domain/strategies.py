@@ -1,5 +1,6 @@
+import asyncio
 from abc import ABC, abstractmethod
-from typing import TypedDict
+from typing import NotRequired, TypedDict
 
 
 class ModerationResult(TypedDict):
@@ -7,6 +8,7 @@ class ModerationResult(TypedDict):
     provider: str
     score: float | None
     details: dict
+    cache: NotRequired[dict]
 
 
 class ModerationStrategy(ABC):
@@ -35,7 +37,53 @@ class ModerationStrategy(ABC):
         """
         pass
 
+    async def amoderate(self, content: str) -> ModerationResult:
+        """
+        Versão assíncrona de `moderate`, usada pelo worker asyncio.
+
+        A implementação padrão executa `moderate` numa thread; provedores com
+        cliente assíncrono devem sobrescrever para não ocupar uma thread por chamada.
+
+        Args:
+            content: Texto a ser moderado
+
+        Returns:
+            ModerationResult com verdict, provider, score e details
+        """
+        return await asyncio.to_thread(self.moderate, content)
+
+    def moderate_many(self, contents: list[str]) -> list[ModerationResult]:
+        """
+        Analisa vários conteúdos de uma vez, preservando a ordem de entrada.
+
+        A implementação padrão modera um a um; provedores que suportam lote
+        devem sobrescrever para fazer uma única chamada.
+
+        Args:
+            contents: Textos a serem moderados
+
+        Returns:
+            Lista de ModerationResult na mesma ordem de `contents`
+        """
+        return [self.moderate(content) for content in contents]
+
     @abstractmethod
     def get_provider_name(self) -> str:
         """Retorna identificador único do provedor."""
         pass
+
+    def get_policy_version(self) -> str:
+        """
+        Identifica a política aplicada pelo provedor (modelo, prompt, dicionário).
+
+        Veredictos em cache só são reaproveitados enquanto a versão não mudar.
+        """
+        return "default"
+
+    def close(self) -> None:
+        """Libera recursos de longa duração (ex: conexões HTTP). Por padrão não faz nada."""
+        pass
+
+    async def aclose(self) -> None:
+        """Libera recursos assíncronos (ex: cliente HTTP assíncrono). Por padrão não faz nada."""
+        pass
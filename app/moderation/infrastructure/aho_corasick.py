@@ -0,0 +1,103 @@
+from collections import deque
+from functools import lru_cache
+from typing import Iterable, NamedTuple
+
+
+class Match(NamedTuple):
+    term: str
+    start: int
+    end: int
+
+
+class AhoCorasickMatcher:
+    """
+    Autômato Aho-Corasick para busca simultânea de múltiplos termos.
+
+    A construção é O(soma dos tamanhos dos termos) e a busca faz uma única
+    varredura linear do texto, independente da quantidade de termos no dicionário.
+    """
+
+    def __init__(self, terms: Iterable[str]):
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._output: list[tuple[str, ...]] = [()]
+        self._size = 0
+
+        for term in terms:
+            if term:
+                self._add(term)
+
+        self._build_failure_links()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _add(self, term: str) -> None:
+        state = 0
+        for char in term:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(())
+            state = next_state
+
+        if not self._output[state]:
+            self._output[state] = (term,)
+            self._size += 1
+
+    def _build_failure_links(self) -> None:
+        queue = deque(self._goto[0].values())
+
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def iter_matches(self, text: str) -> Iterable[Match]:
+        """
+        Percorre o texto uma única vez retornando todas as ocorrências (inclusive sobrepostas).
+
+        Args:
+            text: Texto a ser analisado
+
+        Yields:
+            Match com o termo encontrado e seus offsets [start, end) no texto
+        """
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        state = 0
+
+        for index, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+
+            for term in output[state]:
+                yield Match(term=term, start=index - len(term) + 1, end=index + 1)
+
+    def find_all(self, text: str) -> list[Match]:
+        """Retorna todas as ocorrências ordenadas pela posição de término no texto."""
+        return list(self.iter_matches(text))
+
+
+@lru_cache(maxsize=4)
+def get_matcher(terms: tuple[str, ...]) -> AhoCorasickMatcher:
+    """
+    Retorna o autômato compilado para o dicionário informado.
+
+    O cache por processo garante que o autômato seja construído uma única vez
+    e reutilizado entre chamadas enquanto o dicionário não mudar.
+    """
+    return AhoCorasickMatcher(terms)
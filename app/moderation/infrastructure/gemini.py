@@ -1,5 +1,7 @@
+import hashlib
 import json
 
+import httpx
 import structlog
 from django.conf import settings
 from google import genai
@@ -37,28 +39,82 @@ class GeminiModerator(ModerationStrategy):
     }
     """
 
+    BATCH_SYSTEM_INSTRUCTION = """
+    Você é um sistema de moderação de chat de alta precisão.
+    Você receberá um array JSON de mensagens no formato [{"index": int, "content": "string"}].
+    Analise CADA mensagem de forma independente e verifique violações de segurança.
+
+    Regras de bloqueio:
+    - HATE: Discurso de ódio, racismo, homofobia.
+    - SEXUAL: Conteúdo sexualmente explícito.
+    - VIOLENCE: Ameaças reais, incentivo à violência ou autolesão.
+    - HARASSMENT: Assédio ou bullying severo.
+
+    Retorne APENAS um array JSON com exatamente um objeto por mensagem recebida, no formato:
+    [
+        {
+            "index": int,
+            "approved": boolean,
+            "reason": "string ou null",
+            "category": "string ou null",
+            "score": float
+        }
+    ]
+    """
+
     def __init__(self):
         api_key = settings.GOOGLE_API_KEY
         if not api_key:
             raise ValueError("GOOGLE_API_KEY não configurada")
 
-        self.client = genai.Client(api_key=api_key)
+        # O cliente assíncrono (worker asyncio) precisa de uma conexão por chamada em andamento.
+        async_max_connections = max(settings.GEMINI_MAX_CONNECTIONS, settings.MODERATION_ASYNC_CONCURRENCY)
+        self.client = genai.Client(
+            api_key=api_key,
+            http_options=types.HttpOptions(
+                client_args={"limits": self._build_limits(settings.GEMINI_MAX_CONNECTIONS)},
+                async_client_args={"limits": self._build_limits(async_max_connections)},
+            ),
+        )
         self.model = settings.GEMINI_MODEL
 
+    @staticmethod
+    def _build_limits(max_connections: int) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=settings.GEMINI_KEEPALIVE_EXPIRY,
+        )
+
     def moderate(self, content: str) -> ModerationResult:
         log = logger.bind(provider="gemini", content_length=len(content))
 
         try:
-            response = self.client.models.generate_content(
+            result = self._generate(content, self.SYSTEM_INSTRUCTION)
+
+            log.info(
+                "gemini_moderation_result",
+                approved=result["approved"],
+                category=result.get("category"),
+                score=result.get("score"),
+            )
+
+            return self._to_moderation_result(result)
+
+        except Exception as exc:
+            log.exception("gemini_api_error", error=str(exc))
+            raise
+
+    async def amoderate(self, content: str) -> ModerationResult:
+        """Modera usando o cliente assíncrono (`client.aio`), sem bloquear o event loop."""
+        log = logger.bind(provider="gemini", content_length=len(content))
+
+        try:
+            response = await self.client.aio.models.generate_content(
                 model=self.model,
                 contents=content,
-                config=types.GenerateContentConfig(
-                    system_instruction=self.SYSTEM_INSTRUCTION,
-                    response_mime_type="application/json",
-                    temperature=0.0,
-                ),
+                config=self._build_config(self.SYSTEM_INSTRUCTION),
             )
-
             result = json.loads(response.text)
 
             log.info(
@@ -68,24 +124,81 @@ class GeminiModerator(ModerationStrategy):
                 score=result.get("score"),
             )
 
-            if result["approved"]:
-                return ModerationResult(
-                    verdict="APPROVED",
-                    provider=self.get_provider_name(),
-                    score=result.get("score", 1.0),
-                    details={"reason": "clean_content"},
-                )
+            return self._to_moderation_result(result)
 
-            return ModerationResult(
-                verdict="REJECTED",
-                provider=self.get_provider_name(),
-                score=result.get("score", 1.0),
-                details={"reason": result.get("reason", "Conteúdo inapropriado"), "category": result.get("category")},
+        except Exception as exc:
+            log.exception("gemini_api_error", error=str(exc))
+            raise
+
+    def moderate_many(self, contents: list[str]) -> list[ModerationResult]:
+        """Modera o lote inteiro em uma única chamada `generate_content`."""
+        log = logger.bind(provider="gemini", batch_size=len(contents))
+
+        try:
+            payload = json.dumps(
+                [{"index": index, "content": content} for index, content in enumerate(contents)], ensure_ascii=False
             )
+            verdicts = self._generate(payload, self.BATCH_SYSTEM_INSTRUCTION)
+
+            by_index = {item["index"]: item for item in verdicts if isinstance(item, dict) and "index" in item}
+            missing = [index for index in range(len(contents)) if index not in by_index]
+            if missing:
+                raise ValueError(f"Resposta em lote incompleta, índices ausentes: {missing}")
+
+            log.info(
+                "gemini_batch_moderation_result",
+                approved=sum(1 for item in by_index.values() if item["approved"]),
+                rejected=sum(1 for item in by_index.values() if not item["approved"]),
+            )
+
+            return [self._to_moderation_result(by_index[index]) for index in range(len(contents))]
 
         except Exception as exc:
             log.exception("gemini_api_error", error=str(exc))
             raise
 
+    def _generate(self, contents: str, system_instruction: str):
+        response = self.client.models.generate_content(
+            model=self.model,
+            contents=contents,
+            config=self._build_config(system_instruction),
+        )
+        return json.loads(response.text)
+
+    @staticmethod
+    def _build_config(system_instruction: str) -> types.GenerateContentConfig:
+        return types.GenerateContentConfig(
+            system_instruction=system_instruction,
+            response_mime_type="application/json",
+            temperature=0.0,
+        )
+
+    def _to_moderation_result(self, result: dict) -> ModerationResult:
+        if result["approved"]:
+            return ModerationResult(
+                verdict="APPROVED",
+                provider=self.get_provider_name(),
+                score=result.get("score", 1.0),
+                details={"reason": "clean_content"},
+            )
+
+        return ModerationResult(
+            verdict="REJECTED",
+            provider=self.get_provider_name(),
+            score=result.get("score", 1.0),
+            details={"reason": result.get("reason", "Conteúdo inapropriado"), "category": result.get("category")},
+        )
+
     def get_provider_name(self) -> str:
         return "google_gemini"
+
+    def get_policy_version(self) -> str:
+        # Os dois prompts entram no hash: veredictos de `moderate` e `moderate_many` dividem o cache
+        policy = f"{self.model}\n{self.SYSTEM_INSTRUCTION}\n{self.BATCH_SYSTEM_INSTRUCTION}"
+        return hashlib.sha256(policy.encode()).hexdigest()[:16]
+
+    def close(self) -> None:
+        self.client.close()
+
+    async def aclose(self) -> None:
+        await self.client.aio.aclose()
@@ -1,7 +1,10 @@
+import hashlib
+
 import structlog
 from django.conf import settings
 
 from app.moderation.domain.strategies import ModerationResult, ModerationStrategy
+from app.moderation.infrastructure.aho_corasick import get_matcher
 
 logger = structlog.get_logger(__name__)
 
@@ -12,22 +15,30 @@ class LocalDictionaryModerator(ModerationStrategy):
 
     Camada de Infraestrutura: responsável por lógica de matching
     com lista de palavras proibidas configurada via settings.
+
+    O matching usa um autômato Aho-Corasick compilado uma vez por processo,
+    fazendo uma única varredura do conteúdo independente do tamanho do dicionário.
     """
 
     def __init__(self):
-        self.blocked_words = settings.PROFANITY_LIST
+        self.blocked_words = tuple(word.strip().lower() for word in settings.PROFANITY_LIST if word.strip())
+        self.matcher = get_matcher(self.blocked_words)
+        self.policy_version = hashlib.sha256("\n".join(sorted(set(self.blocked_words))).encode()).hexdigest()[:16]
 
     def moderate(self, content: str) -> ModerationResult:
         content_lower = content.lower()
-
-        for word in self.blocked_words:
-            if word in content_lower:
-                return ModerationResult(
-                    verdict="REJECTED",
-                    provider=self.get_provider_name(),
-                    score=1.0,
-                    details={"reason": f"Palavra proibida detectada: {word}"},
-                )
+        matches = self.matcher.find_all(content_lower)
+
+        if matches:
+            return ModerationResult(
+                verdict="REJECTED",
+                provider=self.get_provider_name(),
+                score=1.0,
+                details={
+                    "reason": f"Palavra proibida detectada: {matches[0].term}",
+                    "matches": [match._asdict() for match in matches],
+                },
+            )
 
         return ModerationResult(
             verdict="APPROVED",
@@ -36,5 +47,12 @@ class LocalDictionaryModerator(ModerationStrategy):
             details={"reason": "clean_content"},
         )
 
+    async def amoderate(self, content: str) -> ModerationResult:
+        # Matching em memória, sem I/O: não compensa delegar para uma thread.
+        return self.moderate(content)
+
     def get_provider_name(self) -> str:
         return "local_dictionary"
+
+    def get_policy_version(self) -> str:
+        return self.policy_version
@@ -0,0 +1,57 @@
+import random
+import string
+import time
+
+from django.core.management.base import BaseCommand
+
+from app.moderation.infrastructure.aho_corasick import AhoCorasickMatcher
+
+SAMPLE_MESSAGES = [
+    "Bom dia pessoal, alguém já testou a nova versão do app?",
+    "Acho que a reunião foi remarcada para amanhã às 15h",
+    "kkkkkkk não acredito que isso aconteceu de novo",
+    "Pode me mandar o link do documento compartilhado, por favor?",
+    "Valeu! Depois eu dou uma olhada com calma e te respondo",
+]
+
+
+class Command(BaseCommand):
+    help = "Mede a vazão do matching do LocalDictionaryModerator conforme o dicionário cresce."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", default="10,100,1000,10000,50000", help="Tamanhos de dicionário (CSV)")
+        parser.add_argument("--messages", type=int, default=2000, help="Mensagens analisadas por tamanho")
+        parser.add_argument("--naive", action="store_true", help="Inclui o loop `word in content` para comparação")
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        sizes = [int(size) for size in options["sizes"].split(",")]
+        corpus = [rng.choice(SAMPLE_MESSAGES).lower() for _ in range(options["messages"])]
+
+        header = f"{'termos':>8} {'build (ms)':>11} {'msgs/s':>12}"
+        if options["naive"]:
+            header += f" {'naive msgs/s':>13}"
+        self.stdout.write(header)
+
+        for size in sizes:
+            terms = {"".join(rng.choices(string.ascii_lowercase, k=rng.randint(5, 12))) for _ in range(size)}
+
+            started = time.perf_counter()
+            matcher = AhoCorasickMatcher(terms)
+            build_ms = (time.perf_counter() - started) * 1000
+
+            started = time.perf_counter()
+            for content in corpus:
+                matcher.find_all(content)
+            throughput = len(corpus) / (time.perf_counter() - started)
+
+            line = f"{size:>8} {build_ms:>11.1f} {throughput:>12.0f}"
+
+            if options["naive"]:
+                started = time.perf_counter()
+                for content in corpus:
+                    _ = [word for word in terms if word in content]
+                line += f" {len(corpus) / (time.perf_counter() - started):>13.0f}"
+
+            self.stdout.write(line)
@@ -0,0 +1,26 @@
+import asyncio
+import signal
+
+from django.core.management.base import BaseCommand
+
+from app.moderation.services.async_worker import AsyncModerationWorker
+
+
+class Command(BaseCommand):
+    help = "Executa o worker de moderação asyncio (MODERATION_WORKER_MODE=asyncio)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, help="Moderações simultâneas (padrão: settings)")
+        parser.add_argument("--poll-interval-ms", type=int, help="Espera entre buscas sem trabalho (padrão: settings)")
+
+    def handle(self, *args, **options):
+        asyncio.run(self._run(options["concurrency"], options["poll_interval_ms"]))
+
+    async def _run(self, concurrency: int | None, poll_interval_ms: int | None) -> None:
+        stop_event = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop_event.set)
+
+        worker = AsyncModerationWorker(concurrency=concurrency, poll_interval_ms=poll_interval_ms)
+        await worker.run(stop_event)
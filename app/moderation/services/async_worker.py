@@ -0,0 +1,136 @@
+import asyncio
+import os
+import socket
+
+import structlog
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+from app.chat.models import Message
+from app.chat.services.broadcast_service import BroadcastService
+from app.moderation.services.lease_service import ModerationLeaseService
+from app.moderation.services.moderator import ModerationService
+from app.moderation.services.registry import strategy_registry
+
+logger = structlog.get_logger(__name__)
+
+
+class AsyncModerationWorker:
+    """
+    Worker de moderação baseado em asyncio (`MODERATION_WORKER_MODE=asyncio`).
+
+    Busca mensagens PENDING direto no banco via lease e mantém até `concurrency`
+    moderações em andamento no mesmo processo, controladas por um semáforo.
+    As chamadas ao provedor usam o cliente assíncrono; claim e commit continuam
+    sendo operações curtas do ORM, executadas via `database_sync_to_async`.
+
+    Mensagens cuja moderação falha mantêm o lease e voltam a ser reivindicáveis
+    quando ele expira (`MODERATION_LEASE_SECONDS`), como um retry com espera. Falhas na
+    busca (ex: banco indisponível) são registradas e o loop tenta de novo após
+    `poll_interval`, sem encerrar o worker.
+    """
+
+    def __init__(self, concurrency: int | None = None, poll_interval_ms: int | None = None, owner: str | None = None):
+        self.concurrency = concurrency or settings.MODERATION_ASYNC_CONCURRENCY
+        self.poll_interval = (poll_interval_ms or settings.MODERATION_ASYNC_POLL_INTERVAL_MS) / 1000
+        self.owner = owner or f"async:{socket.gethostname()}:{os.getpid()}"
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._tasks: set[asyncio.Task] = set()
+
+    async def run(self, stop_event: asyncio.Event) -> None:
+        """
+        Executa o loop de busca até `stop_event` ser sinalizado e aguarda as moderações em andamento.
+
+        Args:
+            stop_event: Evento que encerra o worker (ex: SIGTERM)
+        """
+        logger.info("async_moderation_worker_started", owner=self.owner, concurrency=self.concurrency)
+
+        try:
+            while not stop_event.is_set():
+                try:
+                    claimed = await self.poll()
+                except Exception:
+                    # Erro transitório (ex: banco indisponível): descarta conexões quebradas e tenta de novo
+                    logger.exception("async_moderation_poll_failed", owner=self.owner)
+                    await database_sync_to_async(close_old_connections)()
+                    claimed = 0
+
+                if claimed == 0:
+                    try:
+                        await asyncio.wait_for(stop_event.wait(), timeout=self.poll_interval)
+                    except asyncio.TimeoutError:
+                        pass
+        finally:
+            await self.drain()
+            await strategy_registry.aclose()
+            logger.info("async_moderation_worker_stopped", owner=self.owner)
+
+    async def poll(self) -> int:
+        """
+        Aguarda ao menos uma vaga livre, reivindica uma mensagem por vaga e inicia as moderações.
+
+        Returns:
+            int: Quantidade de mensagens reivindicadas
+        """
+        free_slots = await self._acquire_slots()
+
+        try:
+            messages = await database_sync_to_async(ModerationLeaseService.claim_next)(free_slots, self.owner)
+        except Exception:
+            self._release_slots(free_slots)
+            raise
+
+        self._release_slots(free_slots - len(messages))
+
+        for message in messages:
+            task = asyncio.create_task(self._process(message))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+        if messages:
+            logger.debug("async_moderation_claimed", count=len(messages), in_flight=len(self._tasks))
+        return len(messages)
+
+    async def drain(self) -> None:
+        """Aguarda todas as moderações em andamento."""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _acquire_slots(self) -> int:
+        await self._slots.acquire()
+        acquired = 1
+        while not self._slots.locked():
+            await self._slots.acquire()
+            acquired += 1
+        return acquired
+
+    def _release_slots(self, count: int) -> None:
+        for _ in range(count):
+            self._slots.release()
+
+    async def _process(self, message: Message) -> None:
+        log = logger.bind(message_id=str(message.id), owner=self.owner)
+
+        try:
+            moderation_result = await asyncio.wait_for(
+                ModerationService.amoderate(message.content), timeout=settings.MODERATION_ASYNC_TIMEOUT_SECONDS
+            )
+            if not await database_sync_to_async(ModerationLeaseService.commit)(
+                [(message, moderation_result)], self.owner
+            ):
+                return
+
+            details = moderation_result.get("details", {})
+            if message.status == Message.Status.APPROVED:
+                log.info("message_approved")
+                await BroadcastService.abroadcast_message_to_room(message)
+            elif message.status == Message.Status.REJECTED:
+                log.info("message_rejected", reason=details.get("reason"))
+                await BroadcastService.anotify_author_rejection(message, details)
+
+        except Exception as exc:
+            log.exception("async_moderation_failed", error=str(exc))
+        finally:
+            self._slots.release()
@@ -0,0 +1,63 @@
+import asyncio
+
+import structlog
+from django.conf import settings
+
+from app.utils.task_publisher import task_publisher
+
+logger = structlog.get_logger(__name__)
+
+
+class ModerationBatcher:
+    """
+    Agrupa IDs de mensagens pendentes antes de enviá-los para moderação.
+
+    Um lote é despachado como uma única `moderate_messages_batch_task` quando atinge
+    `MODERATION_BATCH_SIZE` mensagens ou quando `MODERATION_BATCH_WINDOW_MS` se passam
+    desde a primeira mensagem do lote, o que ocorrer primeiro.
+
+    Vive no event loop do processo ASGI; o publish roda fora dele, via `task_publisher`.
+    IDs ainda não despachados se perdem se o processo morrer dentro da janela; as
+    mensagens permanecem PENDING no banco.
+    """
+
+    def __init__(self):
+        self._pending: list[str] = []
+        self._timer: asyncio.TimerHandle | None = None
+
+    @staticmethod
+    def is_enabled() -> bool:
+        return settings.MODERATION_BATCH_SIZE > 1
+
+    async def add(self, message_id: str) -> None:
+        """
+        Adiciona uma mensagem ao lote corrente, despachando-o se estiver cheio.
+
+        Args:
+            message_id: ID da mensagem em estado PENDING
+        """
+        self._pending.append(message_id)
+
+        if len(self._pending) >= settings.MODERATION_BATCH_SIZE:
+            self.flush()
+        elif self._timer is None:
+            loop = asyncio.get_running_loop()
+            self._timer = loop.call_later(settings.MODERATION_BATCH_WINDOW_MS / 1000, self.flush)
+
+    def flush(self) -> None:
+        """Despacha imediatamente o lote corrente (se houver)."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        message_ids, self._pending = self._pending, []
+        if not message_ids:
+            return
+
+        from app.moderation.tasks import moderate_messages_batch_task
+
+        task_publisher.submit(moderate_messages_batch_task, message_ids)
+        logger.info("moderation_batch_dispatched", batch_size=len(message_ids))
+
+
+moderation_batcher = ModerationBatcher()
@@ -0,0 +1,195 @@
+import uuid
+from datetime import timedelta
+from functools import partial
+
+import structlog
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from app.chat.models import Message
+from app.chat.services.history_cache import recent_messages_cache
+from app.moderation.domain.strategies import ModerationResult
+from app.moderation.models import ModerationLog
+
+logger = structlog.get_logger(__name__)
+
+
+class ModerationLeaseService:
+    """
+    Controla a posse (lease) de mensagens PENDING durante a moderação.
+
+    Fluxo:
+    1. `claim`: um UPDATE condicional marca as mensagens com o dono e a expiração do lease.
+    2. O provedor é chamado fora de qualquer transação.
+    3. `commit`: uma transação curta grava veredicto e log apenas se o lease ainda é do mesmo dono.
+
+    Uma mensagem PENDING pode ser reivindicada quando não tem dono, quando o lease
+    expirou ou quando o próprio dono a reivindica de novo (retry da mesma task).
+    """
+
+    @staticmethod
+    def _lease_deadline():
+        return timezone.now() + timedelta(seconds=settings.MODERATION_LEASE_SECONDS)
+
+    @staticmethod
+    def claim(message_ids: list[uuid.UUID], owner: str) -> list[Message]:
+        """
+        Reivindica as mensagens PENDING disponíveis.
+
+        Args:
+            message_ids: IDs das mensagens
+            owner: Identificador do worker/task que assume a moderação
+
+        Returns:
+            Mensagens efetivamente reivindicadas, em ordem de criação
+        """
+        now = timezone.now()
+        claimable = (
+            Q(moderation_lease_owner="") | Q(moderation_lease_owner=owner) | Q(moderation_lease_expires_at__lt=now)
+        )
+
+        Message.objects.filter(claimable, id__in=message_ids, status=Message.Status.PENDING).update(
+            moderation_lease_owner=owner,
+            moderation_lease_expires_at=ModerationLeaseService._lease_deadline(),
+        )
+
+        return list(
+            Message.objects.select_related("room", "author")
+            .filter(id__in=message_ids, status=Message.Status.PENDING, moderation_lease_owner=owner)
+            .order_by("created_at", "id")
+        )
+
+    @staticmethod
+    def claim_next(limit: int, owner: str) -> list[Message]:
+        """
+        Reivindica as próximas mensagens PENDING sem dono ou com lease expirado.
+
+        Usado pelo worker asyncio, que busca trabalho direto no banco em vez da fila.
+        `skip_locked` permite vários workers reivindicando em paralelo sem se bloquear.
+
+        Args:
+            limit: Máximo de mensagens reivindicadas
+            owner: Identificador do worker que assume a moderação
+
+        Returns:
+            Mensagens reivindicadas, em ordem de criação
+        """
+        now = timezone.now()
+        available = Q(moderation_lease_owner="") | Q(moderation_lease_expires_at__lt=now)
+
+        with transaction.atomic():
+            message_ids = list(
+                Message.objects.select_for_update(skip_locked=True)
+                .filter(available, status=Message.Status.PENDING)
+                .order_by("created_at")
+                .values_list("id", flat=True)[:limit]
+            )
+            if not message_ids:
+                return []
+
+            Message.objects.filter(id__in=message_ids).update(
+                moderation_lease_owner=owner,
+                moderation_lease_expires_at=ModerationLeaseService._lease_deadline(),
+            )
+
+        return list(
+            Message.objects.select_related("room", "author")
+            .filter(id__in=message_ids, moderation_lease_owner=owner)
+            .order_by("created_at", "id")
+        )
+
+    @staticmethod
+    def commit(verdicts: list[tuple[Message, ModerationResult]], owner: str) -> list[tuple[Message, ModerationResult]]:
+        """
+        Grava veredictos e logs das mensagens cujo lease ainda pertence a `owner`.
+
+        Após o commit, o cache do histórico recente é atualizado com os veredictos.
+
+        Args:
+            verdicts: Pares (mensagem reivindicada, resultado da moderação)
+            owner: Dono usado em `claim`
+
+        Returns:
+            Pares efetivamente gravados (leases perdidos são descartados)
+        """
+        with transaction.atomic():
+            owned_ids = set(
+                Message.objects.select_for_update()
+                .filter(
+                    id__in=[message.id for message, _ in verdicts],
+                    status=Message.Status.PENDING,
+                    moderation_lease_owner=owner,
+                )
+                .values_list("id", flat=True)
+            )
+            committed = [(message, result) for message, result in verdicts if message.id in owned_ids]
+
+            if len(committed) < len(verdicts):
+                logger.warning("moderation_lease_lost", owner=owner, lost=len(verdicts) - len(committed))
+
+            if not committed:
+                return []
+
+            ModerationLog.objects.bulk_create(
+                [
+                    ModerationLog(
+                        message=message,
+                        provider=result["provider"],
+                        verdict=result["verdict"],
+                        score=result.get("score"),
+                        raw_payload=result,
+                    )
+                    for message, result in committed
+                ]
+            )
+
+            now = timezone.now()
+            for message, result in committed:
+                message.status = result["verdict"]
+                message.moderation_lease_owner = ""
+                message.moderation_lease_expires_at = None
+                message.updated_at = now
+            Message.objects.bulk_update(
+                [message for message, _ in committed],
+                ["status", "moderation_lease_owner", "moderation_lease_expires_at", "updated_at"],
+            )
+            transaction.on_commit(partial(recent_messages_cache.on_verdicts, [message for message, _ in committed]))
+
+        return committed
+
+    @staticmethod
+    def release_stale(limit: int = 500) -> list[uuid.UUID]:
+        """
+        Libera mensagens PENDING cujo lease expirou (ou que nunca foram reivindicadas
+        dentro do prazo) para que possam ser re-enfileiradas.
+
+        O lease é zerado e ganha um novo prazo, evitando re-enfileirar a mesma
+        mensagem a cada varredura enquanto ela aguarda na fila.
+
+        Args:
+            limit: Máximo de mensagens liberadas por chamada
+
+        Returns:
+            IDs das mensagens liberadas
+        """
+        now = timezone.now()
+        stale = Q(moderation_lease_expires_at__lt=now) | Q(
+            moderation_lease_expires_at__isnull=True,
+            created_at__lt=now - timedelta(seconds=settings.MODERATION_LEASE_SECONDS),
+        )
+
+        with transaction.atomic():
+            message_ids = list(
+                Message.objects.select_for_update(skip_locked=True)
+                .filter(stale, status=Message.Status.PENDING)
+                .order_by("created_at")
+                .values_list("id", flat=True)[:limit]
+            )
+            Message.objects.filter(id__in=message_ids).update(
+                moderation_lease_owner="",
+                moderation_lease_expires_at=ModerationLeaseService._lease_deadline(),
+            )
+
+        return message_ids
@@ -1,9 +1,12 @@
 import structlog
+from asgiref.sync import sync_to_async
 from django.conf import settings
 
 from app.moderation.domain.strategies import ModerationResult, ModerationStrategy
 from app.moderation.infrastructure.gemini import GeminiModerator
 from app.moderation.infrastructure.local import LocalDictionaryModerator
+from app.moderation.services.registry import strategy_registry
+from app.moderation.services.verdict_cache import verdict_cache
 
 logger = structlog.get_logger(__name__)
 
@@ -19,6 +22,11 @@ class ModerationService:
 
     Esta camada NÃO conhece detalhes de implementação (APIs, arquivos).
     Apenas orquestra interfaces do Domain.
+
+    As estratégias são obtidas do `strategy_registry`, que as mantém vivas
+    (com seus clientes HTTP) durante todo o processo. Veredictos do provedor
+    principal passam pelo `verdict_cache`, evitando chamadas repetidas para
+    conteúdos idênticos.
     """
 
     _STRATEGIES: dict[str, type[ModerationStrategy]] = {
@@ -38,7 +46,50 @@ class ModerationService:
             )
             strategy_class = LocalDictionaryModerator
 
-        return strategy_class()
+        return strategy_registry.get(strategy_class)
+
+    @staticmethod
+    def _moderate_with_cache(strategy: ModerationStrategy, contents: list[str]) -> list[ModerationResult]:
+        if not verdict_cache.is_enabled():
+            return ModerationService._call_strategy(strategy, contents)
+
+        keys = [verdict_cache.build_key(content, strategy) for content in contents]
+        results = [verdict_cache.get(key) for key in keys]
+
+        misses: dict[str, str] = {}
+        for key, content, result in zip(keys, contents, results):
+            if result is None:
+                misses.setdefault(key, content)
+
+        if not misses:
+            return results
+
+        fresh_by_key = {}
+        for key, result in zip(misses, ModerationService._call_strategy(strategy, list(misses.values()))):
+            verdict_cache.set(key, result)
+            fresh_by_key[key] = {**result, "cache": {"hit": False}}
+
+        return [result or fresh_by_key[key] for key, result in zip(keys, results)]
+
+    @staticmethod
+    async def _amoderate_with_cache(strategy: ModerationStrategy, content: str) -> ModerationResult:
+        if not verdict_cache.is_enabled():
+            return await strategy.amoderate(content)
+
+        key = verdict_cache.build_key(content, strategy)
+        cached = await sync_to_async(verdict_cache.get)(key)
+        if cached is not None:
+            return cached
+
+        result = await strategy.amoderate(content)
+        await sync_to_async(verdict_cache.set)(key, result)
+        return {**result, "cache": {"hit": False}}
+
+    @staticmethod
+    def _call_strategy(strategy: ModerationStrategy, contents: list[str]) -> list[ModerationResult]:
+        if len(contents) == 1:
+            return [strategy.moderate(contents[0])]
+        return strategy.moderate_many(contents)
 
     @staticmethod
     def moderate(content: str) -> ModerationResult:
@@ -63,23 +114,93 @@ class ModerationService:
 
         try:
             strategy = ModerationService._get_strategy(provider)
-            result = strategy.moderate(content)
-            log.info("moderation_success", verdict=result["verdict"])
+            result = ModerationService._moderate_with_cache(strategy, [content])[0]
+            log.info("moderation_success", verdict=result["verdict"], cache=result.get("cache"))
             return result
 
         except Exception as exc:
             log.warning("primary_strategy_failed_fallback", error=str(exc))
 
             try:
-                fallback_strategy = LocalDictionaryModerator()
+                fallback_strategy = strategy_registry.get(LocalDictionaryModerator)
                 result = fallback_strategy.moderate(content)
                 log.info("fallback_success", verdict=result["verdict"])
                 return result
             except Exception as fallback_exc:
                 log.error("fallback_failed", error=str(fallback_exc))
-                return ModerationResult(
-                    verdict="REJECTED",
-                    provider="system",
-                    score=0.0,
-                    details={"reason": "Todos os provedores falharam", "error": str(fallback_exc)},
-                )
+                return ModerationService._system_rejection(fallback_exc)
+
+    @staticmethod
+    async def amoderate(content: str) -> ModerationResult:
+        """
+        Versão assíncrona de `moderate`, com o mesmo cache e a mesma cadeia de fallback.
+
+        Args:
+            content: Conteúdo da mensagem a ser moderada
+
+        Returns:
+            ModerationResult (ver `moderate`)
+        """
+        provider = settings.MODERATION_PROVIDER.lower()
+        log = logger.bind(provider=provider, content_length=len(content))
+
+        try:
+            strategy = ModerationService._get_strategy(provider)
+            result = await ModerationService._amoderate_with_cache(strategy, content)
+            log.info("moderation_success", verdict=result["verdict"], cache=result.get("cache"))
+            return result
+
+        except Exception as exc:
+            log.warning("primary_strategy_failed_fallback", error=str(exc))
+
+            try:
+                fallback_strategy = strategy_registry.get(LocalDictionaryModerator)
+                result = await fallback_strategy.amoderate(content)
+                log.info("fallback_success", verdict=result["verdict"])
+                return result
+            except Exception as fallback_exc:
+                log.error("fallback_failed", error=str(fallback_exc))
+                return ModerationService._system_rejection(fallback_exc)
+
+    @staticmethod
+    def moderate_many(contents: list[str]) -> list[ModerationResult]:
+        """
+        Analisa um lote de conteúdos com uma única chamada ao provedor (quando suportado).
+
+        Segue a mesma cadeia de fallback de `moderate`, aplicada ao lote inteiro.
+
+        Args:
+            contents: Conteúdos das mensagens a serem moderadas
+
+        Returns:
+            Lista de ModerationResult na mesma ordem de `contents`
+        """
+        provider = settings.MODERATION_PROVIDER.lower()
+        log = logger.bind(provider=provider, batch_size=len(contents))
+
+        try:
+            strategy = ModerationService._get_strategy(provider)
+            results = ModerationService._moderate_with_cache(strategy, contents)
+            log.info("batch_moderation_success", verdicts=[result["verdict"] for result in results])
+            return results
+
+        except Exception as exc:
+            log.warning("primary_strategy_failed_fallback", error=str(exc))
+
+            try:
+                fallback_strategy = strategy_registry.get(LocalDictionaryModerator)
+                results = fallback_strategy.moderate_many(contents)
+                log.info("fallback_success", verdicts=[result["verdict"] for result in results])
+                return results
+            except Exception as fallback_exc:
+                log.error("fallback_failed", error=str(fallback_exc))
+                return [ModerationService._system_rejection(fallback_exc) for _ in contents]
+
+    @staticmethod
+    def _system_rejection(exc: Exception) -> ModerationResult:
+        return ModerationResult(
+            verdict="REJECTED",
+            provider="system",
+            score=0.0,
+            details={"reason": "Todos os provedores falharam", "error": str(exc)},
+        )
@@ -0,0 +1,89 @@
+import threading
+
+import structlog
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from app.moderation.domain.strategies import ModerationStrategy
+
+logger = structlog.get_logger(__name__)
+
+RELOAD_SETTINGS = frozenset(
+    {
+        "MODERATION_PROVIDER",
+        "GOOGLE_API_KEY",
+        "GEMINI_MODEL",
+        "GEMINI_MAX_CONNECTIONS",
+        "GEMINI_KEEPALIVE_EXPIRY",
+        "MODERATION_ASYNC_CONCURRENCY",
+        "PROFANITY_LIST",
+    }
+)
+
+
+class StrategyRegistry:
+    """
+    Mantém instâncias de estratégias de moderação vivas durante todo o processo.
+
+    Evita recriar clientes HTTP (e refazer handshakes TLS) a cada mensagem moderada.
+    As instâncias são criadas sob demanda e descartadas explicitamente via `reset()`,
+    o que acontece automaticamente quando settings relevantes mudam.
+    """
+
+    def __init__(self):
+        self._instances: dict[type[ModerationStrategy], ModerationStrategy] = {}
+        self._lock = threading.Lock()
+
+    def get(self, strategy_class: type[ModerationStrategy]) -> ModerationStrategy:
+        """
+        Retorna a instância compartilhada da estratégia, criando-a na primeira chamada.
+
+        Args:
+            strategy_class: Classe concreta da estratégia
+
+        Returns:
+            ModerationStrategy: Instância reutilizável entre mensagens
+        """
+        instance = self._instances.get(strategy_class)
+        if instance is not None:
+            return instance
+
+        with self._lock:
+            instance = self._instances.get(strategy_class)
+            if instance is None:
+                instance = strategy_class()
+                self._instances[strategy_class] = instance
+                logger.info("moderation_strategy_created", provider=instance.get_provider_name())
+
+        return instance
+
+    def reset(self) -> None:
+        """Descarta todas as instâncias, liberando conexões. A próxima chamada a `get` recria a estratégia."""
+        with self._lock:
+            instances, self._instances = self._instances, {}
+
+        for instance in instances.values():
+            try:
+                instance.close()
+            except Exception as exc:
+                logger.warning("moderation_strategy_close_failed", error=str(exc))
+
+        if instances:
+            logger.info("moderation_registry_reset", discarded=len(instances))
+
+    async def aclose(self) -> None:
+        """Fecha os recursos assíncronos das instâncias vivas (ex: ao encerrar o worker asyncio)."""
+        for instance in list(self._instances.values()):
+            try:
+                await instance.aclose()
+            except Exception as exc:
+                logger.warning("moderation_strategy_close_failed", error=str(exc))
+
+
+strategy_registry = StrategyRegistry()
+
+
+@receiver(setting_changed)
+def reset_registry_on_setting_change(setting: str, **kwargs) -> None:
+    if setting in RELOAD_SETTINGS:
+        strategy_registry.reset()
@@ -0,0 +1,117 @@
+import copy
+import hashlib
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+import structlog
+from django.conf import settings
+from django.core.cache import caches
+
+from app.moderation.domain.strategies import ModerationResult, ModerationStrategy
+
+logger = structlog.get_logger(__name__)
+
+
+class VerdictCache:
+    """
+    Cache de veredictos indexado pelo hash do conteúdo normalizado.
+
+    Dois níveis:
+    - Local: LRU em memória do processo, limitado por `MODERATION_CACHE_LOCAL_SIZE`.
+    - Compartilhado: cache Django (`MODERATION_CACHE_ALIAS`, Redis em produção).
+
+    Ambos expiram após `MODERATION_CACHE_TTL` segundos. A chave inclui o provedor e
+    a versão da política, então mudar modelo, prompt ou dicionário invalida o cache.
+    """
+
+    KEY_PREFIX = "moderation:verdict"
+
+    def __init__(self):
+        self._local: OrderedDict[str, tuple[float, ModerationResult]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def is_enabled() -> bool:
+        return settings.MODERATION_CACHE_ENABLED
+
+    @staticmethod
+    def normalize(content: str) -> str:
+        return " ".join(unicodedata.normalize("NFKC", content).casefold().split())
+
+    def build_key(self, content: str, strategy: ModerationStrategy) -> str:
+        """
+        Monta a chave do veredicto para o conteúdo na estratégia informada.
+
+        Args:
+            content: Conteúdo original da mensagem
+            strategy: Estratégia que produziria o veredicto
+
+        Returns:
+            str: Chave derivada do provedor, da versão de política e do conteúdo normalizado
+        """
+        policy = f"{settings.MODERATION_POLICY_VERSION}.{strategy.get_policy_version()}"
+        fingerprint = f"{strategy.get_provider_name()}\0{policy}\0{self.normalize(content)}"
+        return f"{self.KEY_PREFIX}:{hashlib.sha256(fingerprint.encode()).hexdigest()}"
+
+    def get(self, key: str) -> ModerationResult | None:
+        """
+        Busca o veredicto no nível local e, se ausente, no compartilhado.
+
+        Returns:
+            ModerationResult com `cache.hit=True` e o nível que respondeu, ou None
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is not None:
+                expires_at, result = entry
+                if expires_at > now:
+                    self._local.move_to_end(key)
+                    return self._mark_hit(result, "local")
+                del self._local[key]
+
+        try:
+            result = caches[settings.MODERATION_CACHE_ALIAS].get(key)
+        except Exception as exc:
+            logger.warning("verdict_cache_shared_get_failed", error=str(exc))
+            return None
+
+        if result is None:
+            return None
+
+        self._store_local(key, result)
+        return self._mark_hit(result, "shared")
+
+    def set(self, key: str, result: ModerationResult) -> None:
+        """Grava o veredicto nos dois níveis."""
+        result = {field: value for field, value in result.items() if field != "cache"}
+        self._store_local(key, result)
+
+        try:
+            caches[settings.MODERATION_CACHE_ALIAS].set(key, result, timeout=settings.MODERATION_CACHE_TTL)
+        except Exception as exc:
+            logger.warning("verdict_cache_shared_set_failed", error=str(exc))
+
+    def clear(self) -> None:
+        """Esvazia o nível local do processo."""
+        with self._lock:
+            self._local.clear()
+
+    def _store_local(self, key: str, result: ModerationResult) -> None:
+        expires_at = time.monotonic() + settings.MODERATION_CACHE_TTL
+        with self._lock:
+            self._local[key] = (expires_at, result)
+            self._local.move_to_end(key)
+            while len(self._local) > settings.MODERATION_CACHE_LOCAL_SIZE:
+                self._local.popitem(last=False)
+
+    @staticmethod
+    def _mark_hit(result: ModerationResult, tier: str) -> ModerationResult:
+        hit = copy.deepcopy(result)
+        hit["cache"] = {"hit": True, "tier": tier}
+        return hit
+
+
+verdict_cache = VerdictCache()
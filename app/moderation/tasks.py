@@ -3,11 +3,11 @@ import uuid
 import structlog
 from celery import shared_task
 from celery.exceptions import SoftTimeLimitExceeded
-from django.db import transaction
+from django.conf import settings
 
 from app.chat.models import Message
 from app.chat.services.broadcast_service import BroadcastService
-from app.moderation.models import ModerationLog
+from app.moderation.services.lease_service import ModerationLeaseService
 from app.moderation.services.moderator import ModerationService
 
 logger = structlog.get_logger(__name__)
@@ -27,36 +27,37 @@ def moderate_message_task(self, message_id: str) -> dict:
     """
     Task para moderar uma mensagem com garantia de consistência.
 
-    Combina 'acks_late=True' (Garantia de Entrega) com 'select_for_update'
-    (Garantia de Idempotência) para evitar processamento duplicado em caso de
-    retries ou falhas de worker.
+    Combina 'acks_late=True' (Garantia de Entrega) com um lease na mensagem
+    (Garantia de Idempotência): a mensagem é reivindicada com um UPDATE curto,
+    o provedor é chamado fora de transação e o veredicto só é gravado se o
+    lease ainda pertence a esta task.
     """
     log = logger.bind(message_id=message_id, task_id=self.request.id)
+    owner = self.request.id or uuid.uuid4().hex
     try:
         message_uuid = uuid.UUID(message_id)
 
-        with transaction.atomic():
-            message = (
-                Message.objects.select_for_update(nowait=False).select_related("room", "author").get(id=message_uuid)
-            )
+        claimed = ModerationLeaseService.claim([message_uuid], owner)
+        if not claimed:
+            current_status = Message.objects.filter(id=message_uuid).values_list("status", flat=True).first()
 
-            if message.status != Message.Status.PENDING:
-                log.info("moderation_skipped", current_status=message.status)
-                return {"status": "skipped", "reason": f"Message already {message.status}", "message_id": message_id}
+            if current_status is None:
+                log.error("message_not_found")
+                return {"status": "error", "reason": "Message not found", "message_id": message_id}
 
-            log.info("starting_moderation", content=message.content[:50])
-            moderation_result = ModerationService.moderate(message.content)
+            if current_status != Message.Status.PENDING:
+                log.info("moderation_skipped", current_status=current_status)
+                return {"status": "skipped", "reason": f"Message already {current_status}", "message_id": message_id}
 
-            ModerationLog.objects.create(
-                message=message,
-                provider=moderation_result["provider"],
-                verdict=moderation_result["verdict"],
-                score=moderation_result.get("score"),
-                raw_payload=moderation_result,
-            )
+            log.info("moderation_skipped", reason="leased_by_another_worker")
+            return {"status": "skipped", "reason": "Message leased by another worker", "message_id": message_id}
 
-            message.status = moderation_result["verdict"]
-            message.save(update_fields=["status", "updated_at"])
+        message = claimed[0]
+        log.info("starting_moderation", content=message.content[:50])
+        moderation_result = ModerationService.moderate(message.content)
+
+        if not ModerationLeaseService.commit([(message, moderation_result)], owner):
+            return {"status": "skipped", "reason": "Moderation lease lost", "message_id": message_id}
 
         if message.status == Message.Status.APPROVED:
             log.info("message_approved")
@@ -72,12 +73,92 @@ def moderate_message_task(self, message_id: str) -> dict:
             "provider": moderation_result["provider"],
         }
 
-    except Message.DoesNotExist:
-        log.error("message_not_found")
-        return {"status": "error", "reason": "Message not found", "message_id": message_id}
     except SoftTimeLimitExceeded:
         logger.warning("moderation_timeout_soft", message_id=message_id, retry=self.request.retries)
         raise self.retry(exc=SoftTimeLimitExceeded("Timeout de moderação atingido"))
     except Exception as exc:
         log.exception("moderation_task_failed", retry_count=self.request.retries)
         raise self.retry(exc=exc)
+
+
+@shared_task(
+    bind=True,
+    max_retries=3,
+    default_retry_delay=5,
+    autoretry_for=(Exception,),
+    retry_backoff=True,
+    task_time_limit=300,
+    task_soft_time_limit=290,
+    acks_late=True,
+)
+def moderate_messages_batch_task(self, message_ids: list[str]) -> dict:
+    """
+    Task para moderar um lote de mensagens com uma única chamada ao provedor.
+
+    Mantém as mesmas garantias de `moderate_message_task`: apenas mensagens
+    PENDING reivindicadas por esta task são moderadas, e status e logs são
+    gravados com operações em lote numa transação curta.
+    """
+    log = logger.bind(batch_size=len(message_ids), task_id=self.request.id)
+    owner = self.request.id or uuid.uuid4().hex
+    try:
+        messages = ModerationLeaseService.claim([uuid.UUID(message_id) for message_id in message_ids], owner)
+
+        if not messages:
+            log.info("batch_moderation_skipped")
+            return {"status": "skipped", "reason": "No pending messages", "processed": 0}
+
+        log.info("starting_batch_moderation", pending=len(messages))
+        moderation_results = ModerationService.moderate_many([message.content for message in messages])
+
+        committed = ModerationLeaseService.commit(list(zip(messages, moderation_results)), owner)
+
+        BroadcastService.broadcast_many(
+            approved=[message for message, _ in committed if message.status == Message.Status.APPROVED],
+            rejected=[
+                (message, result.get("details", {}))
+                for message, result in committed
+                if message.status == Message.Status.REJECTED
+            ],
+        )
+
+        verdicts = {str(message.id): message.status for message, _ in committed}
+        log.info("batch_moderation_finished", verdicts=verdicts)
+
+        return {
+            "status": "success",
+            "processed": len(committed),
+            "skipped": len(message_ids) - len(committed),
+            "verdicts": verdicts,
+        }
+
+    except SoftTimeLimitExceeded:
+        log.warning("moderation_timeout_soft", retry=self.request.retries)
+        raise self.retry(exc=SoftTimeLimitExceeded("Timeout de moderação atingido"))
+    except Exception as exc:
+        log.exception("batch_moderation_task_failed", retry_count=self.request.retries)
+        raise self.retry(exc=exc)
+
+
+@shared_task
+def requeue_stale_moderations_task() -> dict:
+    """
+    Varredura periódica (Celery Beat) que re-enfileira mensagens PENDING cujo lease
+    expirou ou que nunca foram reivindicadas dentro de `MODERATION_LEASE_SECONDS`.
+    """
+    message_ids = [str(message_id) for message_id in ModerationLeaseService.release_stale()]
+
+    if not message_ids:
+        return {"status": "success", "requeued": 0}
+
+    if settings.MODERATION_BATCH_SIZE > 1:
+        batch_size = settings.MODERATION_BATCH_SIZE
+        for start in range(0, len(message_ids), batch_size):
+            end = start + batch_size
+            moderate_messages_batch_task.delay(message_ids[start:end])
+    else:
+        for message_id in message_ids:
+            moderate_message_task.delay(message_id)
+
+    logger.warning("stale_moderations_requeued", count=len(message_ids))
+    return {"status": "success", "requeued": len(message_ids)}
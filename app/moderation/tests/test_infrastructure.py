@@ -1,5 +1,10 @@
+import json
+from unittest.mock import AsyncMock, MagicMock
+
 import pytest
 
+from app.moderation.infrastructure.aho_corasick import AhoCorasickMatcher
+from app.moderation.infrastructure.gemini import GeminiModerator
 from app.moderation.infrastructure.local import LocalDictionaryModerator
 
 
@@ -27,3 +32,91 @@ class TestLocalDictionaryModerator:
 
         if should_find_word:
             assert should_find_word in result["details"]["reason"]
+
+    def test_moderate_reports_all_matches_with_offsets(self, settings):
+        settings.PROFANITY_LIST = ["bobo", "idiota"]
+        moderator = LocalDictionaryModerator()
+
+        result = moderator.moderate("Seu bobo, seu IDIOTA")
+
+        assert result["details"]["matches"] == [
+            {"term": "bobo", "start": 4, "end": 8},
+            {"term": "idiota", "start": 14, "end": 20},
+        ]
+
+    def test_matcher_is_compiled_once_per_dictionary(self, settings):
+        settings.PROFANITY_LIST = ["bobo", "idiota"]
+
+        assert LocalDictionaryModerator().matcher is LocalDictionaryModerator().matcher
+
+
+@pytest.mark.unit
+class TestAhoCorasickMatcher:
+    @pytest.mark.parametrize(
+        "terms,text,expected",
+        [
+            (["he", "she", "his", "hers"], "ushers", [("she", 1, 4), ("he", 2, 4), ("hers", 2, 6)]),
+            (["aa"], "aaaa", [("aa", 0, 2), ("aa", 1, 3), ("aa", 2, 4)]),
+            (["abc", "bcd", "c"], "xabcdx", [("abc", 1, 4), ("c", 3, 4), ("bcd", 2, 5)]),
+            (["bobo", ""], "texto limpo", []),
+        ],
+        ids=["classic", "overlapping", "suffix_outputs", "ignores_empty_terms"],
+    )
+    def test_find_all(self, terms, text, expected):
+        matcher = AhoCorasickMatcher(terms)
+
+        assert [tuple(match) for match in matcher.find_all(text)] == expected
+
+
+@pytest.mark.unit
+class TestGeminiModerator:
+    @pytest.fixture
+    def moderator(self, settings):
+        settings.GOOGLE_API_KEY = "fake-key"
+        moderator = GeminiModerator()
+        moderator.client = MagicMock()
+        return moderator
+
+    def test_moderate_many_makes_single_call_and_keeps_order(self, moderator):
+        moderator.client.models.generate_content.return_value.text = json.dumps(
+            [
+                {"index": 1, "approved": False, "reason": "Ameaça", "category": "VIOLENCE", "score": 0.9},
+                {"index": 0, "approved": True, "reason": None, "category": None, "score": 0.99},
+            ]
+        )
+
+        results = moderator.moderate_many(["bom dia", "vou te pegar"])
+
+        moderator.client.models.generate_content.assert_called_once()
+        sent = json.loads(moderator.client.models.generate_content.call_args.kwargs["contents"])
+        assert sent == [{"index": 0, "content": "bom dia"}, {"index": 1, "content": "vou te pegar"}]
+        assert [result["verdict"] for result in results] == ["APPROVED", "REJECTED"]
+        assert results[1]["details"]["category"] == "VIOLENCE"
+
+    async def test_amoderate_uses_async_client(self, moderator):
+        moderator.client.aio.models.generate_content = AsyncMock()
+        moderator.client.aio.models.generate_content.return_value.text = json.dumps(
+            {"approved": False, "reason": "Ameaça", "category": "VIOLENCE", "score": 0.9}
+        )
+
+        result = await moderator.amoderate("vou te pegar")
+
+        moderator.client.aio.models.generate_content.assert_awaited_once()
+        moderator.client.models.generate_content.assert_not_called()
+        assert result["verdict"] == "REJECTED"
+        assert result["details"]["category"] == "VIOLENCE"
+
+    def test_policy_version_covers_batch_prompt(self, moderator, monkeypatch):
+        version = moderator.get_policy_version()
+
+        monkeypatch.setattr(
+            GeminiModerator, "BATCH_SYSTEM_INSTRUCTION", GeminiModerator.BATCH_SYSTEM_INSTRUCTION + "\n"
+        )
+
+        assert moderator.get_policy_version() != version
+
+    def test_moderate_many_raises_on_incomplete_response(self, moderator):
+        moderator.client.models.generate_content.return_value.text = json.dumps([{"index": 0, "approved": True}])
+
+        with pytest.raises(ValueError):
+            moderator.moderate_many(["um", "dois"])
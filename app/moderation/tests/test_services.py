@@ -1,8 +1,23 @@
+import asyncio
+from datetime import timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
+
 import pytest
+from channels.db import database_sync_to_async
+from django.db import OperationalError
+from django.utils import timezone
+from model_bakery import baker
 
+from app.chat.models import Message
 from app.moderation.infrastructure.gemini import GeminiModerator
 from app.moderation.infrastructure.local import LocalDictionaryModerator
+from app.moderation.services.async_worker import AsyncModerationWorker
+from app.moderation.services.batcher import ModerationBatcher
+from app.moderation.services.lease_service import ModerationLeaseService
 from app.moderation.services.moderator import ModerationService
+from app.moderation.services.registry import strategy_registry
+from app.moderation.services.verdict_cache import verdict_cache
+from app.moderation.tasks import moderate_messages_batch_task
 
 
 @pytest.mark.unit
@@ -39,3 +54,253 @@ class TestModerationService:
         assert result["verdict"] == "REJECTED"
         assert result["provider"] == "system"
         assert "Todos os provedores falharam" in result["details"]["reason"]
+
+    async def test_amoderate_fallback_on_primary_failure(self, settings):
+        settings.MODERATION_PROVIDER = "gemini"
+        settings.PROFANITY_LIST = ["idiota"]
+        strategy_class = MagicMock()
+        strategy_class.return_value.get_provider_name.return_value = "google_gemini"
+        strategy_class.return_value.amoderate = AsyncMock(side_effect=RuntimeError("quota"))
+
+        with patch.dict(ModerationService._STRATEGIES, {"gemini": strategy_class}):
+            result = await ModerationService.amoderate("seu idiota")
+
+        assert result["verdict"] == "REJECTED"
+        assert result["provider"] == "local_dictionary"
+
+
+@pytest.mark.unit
+class TestStrategyRegistry:
+    def test_strategy_instance_is_reused_between_messages(self, settings):
+        settings.MODERATION_PROVIDER = "gemini"
+        strategy_class = MagicMock()
+        strategy_class.return_value.moderate.return_value = {"verdict": "APPROVED", "provider": "google_gemini"}
+
+        with patch.dict(ModerationService._STRATEGIES, {"gemini": strategy_class}):
+            ModerationService.moderate("primeira")
+            ModerationService.moderate("segunda")
+
+        strategy_class.assert_called_once_with()
+        assert strategy_class.return_value.moderate.call_count == 2
+
+    def test_setting_change_closes_and_discards_instances(self, settings):
+        settings.PROFANITY_LIST = ["bobo"]
+        strategy_class = MagicMock(side_effect=lambda: MagicMock())
+        instance = strategy_registry.get(strategy_class)
+
+        settings.PROFANITY_LIST = ["bobo", "idiota"]
+
+        instance.close.assert_called_once_with()
+        assert strategy_registry.get(strategy_class) is not instance
+
+    def test_moderate_many_falls_back_for_whole_batch(self, settings):
+        settings.MODERATION_PROVIDER = "gemini"
+        settings.PROFANITY_LIST = ["idiota"]
+        strategy_class = MagicMock()
+        strategy_class.return_value.moderate_many.side_effect = RuntimeError("quota")
+
+        with patch.dict(ModerationService._STRATEGIES, {"gemini": strategy_class}):
+            results = ModerationService.moderate_many(["olá", "seu idiota"])
+
+        assert [result["verdict"] for result in results] == ["APPROVED", "REJECTED"]
+        assert {result["provider"] for result in results} == {"local_dictionary"}
+
+
+@pytest.mark.unit
+class TestModerationBatcher:
+    async def test_dispatches_when_batch_is_full(self, settings):
+        settings.MODERATION_BATCH_SIZE = 2
+        batcher = ModerationBatcher()
+
+        with patch("app.moderation.services.batcher.task_publisher.submit") as mock_submit:
+            await batcher.add("a")
+            mock_submit.assert_not_called()
+            await batcher.add("b")
+
+        mock_submit.assert_called_once_with(moderate_messages_batch_task, ["a", "b"])
+
+    async def test_dispatches_partial_batch_after_window(self, settings):
+        settings.MODERATION_BATCH_SIZE = 10
+        settings.MODERATION_BATCH_WINDOW_MS = 10
+        batcher = ModerationBatcher()
+
+        with patch("app.moderation.services.batcher.task_publisher.submit") as mock_submit:
+            await batcher.add("a")
+            await asyncio.sleep(0.05)
+
+        mock_submit.assert_called_once_with(moderate_messages_batch_task, ["a"])
+
+
+@pytest.mark.unit
+class TestVerdictCache:
+    @pytest.fixture
+    def strategy_class(self, settings):
+        settings.MODERATION_PROVIDER = "gemini"
+        strategy_class = MagicMock()
+        strategy = strategy_class.return_value
+        strategy.get_provider_name.return_value = "google_gemini"
+        strategy.get_policy_version.return_value = "v1"
+        strategy.moderate.return_value = {"verdict": "APPROVED", "provider": "google_gemini", "details": {}}
+
+        with patch.dict(ModerationService._STRATEGIES, {"gemini": strategy_class}):
+            yield strategy_class
+
+    def test_normalized_duplicates_hit_local_tier(self, strategy_class):
+        first = ModerationService.moderate("Bom   dia")
+        second = ModerationService.moderate("  bom dia ")
+
+        strategy_class.return_value.moderate.assert_called_once_with("Bom   dia")
+        assert first["cache"] == {"hit": False}
+        assert second["cache"] == {"hit": True, "tier": "local"}
+
+    def test_shared_tier_is_used_when_local_misses(self, strategy_class):
+        ModerationService.moderate("Bom dia")
+        verdict_cache.clear()
+
+        result = ModerationService.moderate("Bom dia")
+
+        strategy_class.return_value.moderate.assert_called_once()
+        assert result["cache"] == {"hit": True, "tier": "shared"}
+
+    def test_policy_version_change_misses(self, strategy_class):
+        ModerationService.moderate("Bom dia")
+        strategy_class.return_value.get_policy_version.return_value = "v2"
+
+        result = ModerationService.moderate("Bom dia")
+
+        assert strategy_class.return_value.moderate.call_count == 2
+        assert result["cache"] == {"hit": False}
+
+    def test_local_tier_is_size_bounded(self, settings, strategy_class):
+        settings.MODERATION_CACHE_LOCAL_SIZE = 1
+        strategy = strategy_class.return_value
+
+        verdict_cache.set(verdict_cache.build_key("um", strategy), {"verdict": "APPROVED"})
+        verdict_cache.set(verdict_cache.build_key("dois", strategy), {"verdict": "APPROVED"})
+
+        assert list(verdict_cache._local) == [verdict_cache.build_key("dois", strategy)]
+
+    def test_moderate_many_only_sends_misses_once(self, strategy_class):
+        strategy = strategy_class.return_value
+        strategy.moderate_many.side_effect = lambda contents: [
+            {"verdict": "APPROVED", "provider": "google_gemini", "details": {}} for _ in contents
+        ]
+        ModerationService.moderate("oi")
+
+        results = ModerationService.moderate_many(["oi", "tudo bem?", "Tudo  bem?", "tchau"])
+
+        strategy.moderate_many.assert_called_once_with(["tudo bem?", "tchau"])
+        assert [result["cache"]["hit"] for result in results] == [True, False, False, False]
+
+
+@pytest.mark.integration
+@pytest.mark.django_db(transaction=True)
+class TestAsyncModerationWorker:
+    @pytest.fixture
+    def pending_messages(self, settings, room, user):
+        settings.MODERATION_PROVIDER = "local"
+        settings.PROFANITY_LIST = ["idiota"]
+        return [
+            baker.make(Message, room=room, author=user, content=content, status=Message.Status.PENDING)
+            for content in ["bom dia", "seu idiota", "tudo bem?"]
+        ]
+
+    async def test_moderates_pending_messages_and_broadcasts(self, pending_messages):
+        worker = AsyncModerationWorker(concurrency=5, owner="worker-a")
+
+        with (
+            patch(
+                "app.chat.services.broadcast_service.BroadcastService.abroadcast_message_to_room", new=AsyncMock()
+            ) as mock_broadcast,
+            patch(
+                "app.chat.services.broadcast_service.BroadcastService.anotify_author_rejection", new=AsyncMock()
+            ) as mock_notify,
+        ):
+            assert await worker.poll() == 3
+            await worker.drain()
+
+        statuses = await database_sync_to_async(lambda: dict(Message.objects.values_list("content", "status")))()
+        assert statuses == {
+            "bom dia": Message.Status.APPROVED,
+            "seu idiota": Message.Status.REJECTED,
+            "tudo bem?": Message.Status.APPROVED,
+        }
+        assert mock_broadcast.await_count == 2
+        mock_notify.assert_awaited_once()
+
+    async def test_keeps_at_most_concurrency_provider_calls_in_flight(self, settings, room, user):
+        settings.MODERATION_CACHE_ENABLED = False
+        await database_sync_to_async(baker.make)(
+            Message, room=room, author=user, status=Message.Status.PENDING, _quantity=7
+        )
+        in_flight = 0
+        peak = 0
+
+        async def slow_moderate(content):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.02)
+            in_flight -= 1
+            return {"verdict": "APPROVED", "provider": "local_dictionary", "score": 1.0, "details": {}}
+
+        worker = AsyncModerationWorker(concurrency=3, owner="worker-a")
+
+        with (
+            patch("app.moderation.services.moderator.ModerationService.amoderate", side_effect=slow_moderate),
+            patch("app.chat.services.broadcast_service.BroadcastService.abroadcast_message_to_room", new=AsyncMock()),
+        ):
+            claimed = 0
+            while claimed < 7:
+                claimed += await worker.poll()
+            await worker.drain()
+
+        assert peak == 3
+        approved = database_sync_to_async(Message.objects.filter(status=Message.Status.APPROVED).count)
+        assert await approved() == 7
+
+    async def test_ignores_messages_leased_by_another_worker(self, pending_messages):
+        await database_sync_to_async(Message.objects.filter(id=pending_messages[0].id).update)(
+            moderation_lease_owner="worker-b", moderation_lease_expires_at=timezone.now() + timedelta(minutes=1)
+        )
+        worker = AsyncModerationWorker(concurrency=5, owner="worker-a")
+
+        with (
+            patch("app.chat.services.broadcast_service.BroadcastService.abroadcast_message_to_room", new=AsyncMock()),
+            patch("app.chat.services.broadcast_service.BroadcastService.anotify_author_rejection", new=AsyncMock()),
+        ):
+            assert await worker.poll() == 2
+            await worker.drain()
+
+        message = await database_sync_to_async(Message.objects.get)(id=pending_messages[0].id)
+        assert message.status == Message.Status.PENDING
+        assert message.moderation_lease_owner == "worker-b"
+
+    async def test_run_survives_failed_poll(self, pending_messages):
+        worker = AsyncModerationWorker(concurrency=5, poll_interval_ms=10, owner="worker-a")
+        stop_event = asyncio.Event()
+        claim_next = ModerationLeaseService.claim_next
+        calls = 0
+
+        def flaky_claim_next(*args):
+            nonlocal calls
+            calls += 1
+            if calls == 1:
+                raise OperationalError("server closed the connection unexpectedly")
+            return claim_next(*args)
+
+        async def stop_when_moderated():
+            pending = database_sync_to_async(Message.objects.filter(status=Message.Status.PENDING).exists)
+            while await pending():
+                await asyncio.sleep(0.01)
+            stop_event.set()
+
+        with (
+            patch.object(ModerationLeaseService, "claim_next", side_effect=flaky_claim_next),
+            patch("app.chat.services.broadcast_service.BroadcastService.abroadcast_message_to_room", new=AsyncMock()),
+            patch("app.chat.services.broadcast_service.BroadcastService.anotify_author_rejection", new=AsyncMock()),
+        ):
+            await asyncio.wait_for(asyncio.gather(worker.run(stop_event), stop_when_moderated()), timeout=5)
+
+        assert calls > 1
+        assert not await database_sync_to_async(Message.objects.filter(status=Message.Status.PENDING).exists)()
@@ -1,13 +1,20 @@
+from datetime import timedelta
 from unittest.mock import MagicMock, patch
 
 import pytest
+from django.db import connection
+from django.utils import timezone
 from model_bakery import baker
 
 from app.accounts.models import User
 from app.chat.models import Message, Room
 from app.moderation.domain.strategies import ModerationResult
 from app.moderation.models import ModerationLog
-from app.moderation.tasks import moderate_message_task
+from app.moderation.tasks import (
+    moderate_message_task,
+    moderate_messages_batch_task,
+    requeue_stale_moderations_task,
+)
 
 
 @pytest.mark.django_db
@@ -122,3 +129,111 @@ class TestModerationTaskIntegration:
         result = moderate_message_task(str(message.id))
         assert result["status"] == "skipped"
         assert "already" in result["reason"]
+
+    def test_moderate_messages_batch_task_applies_verdicts_in_bulk(self, db, django_assert_max_num_queries):
+        user = baker.make(User)
+        room = baker.make(Room)
+        clean = baker.make(Message, room=room, author=user, content="Olá", status=Message.Status.PENDING)
+        offensive = baker.make(Message, room=room, author=user, content="idiota", status=Message.Status.PENDING)
+        done = baker.make(Message, room=room, author=user, content="Oi", status=Message.Status.APPROVED)
+
+        with (
+            patch("app.chat.services.broadcast_service.BroadcastService.broadcast_many") as mock_broadcast_many,
+            django_assert_max_num_queries(7),
+        ):
+            result = moderate_messages_batch_task([str(clean.id), str(offensive.id), str(done.id)])
+
+        assert result["processed"] == 2
+        assert result["skipped"] == 1
+        clean.refresh_from_db()
+        offensive.refresh_from_db()
+        assert clean.status == Message.Status.APPROVED
+        assert offensive.status == Message.Status.REJECTED
+        assert ModerationLog.objects.filter(message__in=[clean, offensive]).count() == 2
+        assert not ModerationLog.objects.filter(message=done).exists()
+        mock_broadcast_many.assert_called_once()
+        assert mock_broadcast_many.call_args.kwargs["approved"] == [clean]
+        assert [message for message, _ in mock_broadcast_many.call_args.kwargs["rejected"]] == [offensive]
+
+    def test_moderate_message_task_records_cache_hit_in_log(self, db):
+        user = baker.make(User)
+        room = baker.make(Room)
+        first = baker.make(Message, room=room, author=user, content="Bom dia", status=Message.Status.PENDING)
+        repeated = baker.make(Message, room=room, author=user, content="bom dia", status=Message.Status.PENDING)
+
+        with patch("app.chat.services.broadcast_service.BroadcastService.broadcast_message_to_room"):
+            moderate_message_task(str(first.id))
+            moderate_message_task(str(repeated.id))
+
+        assert ModerationLog.objects.get(message=first).raw_payload["cache"] == {"hit": False}
+        assert ModerationLog.objects.get(message=repeated).raw_payload["cache"] == {"hit": True, "tier": "local"}
+
+
+@pytest.mark.integration
+class TestModerationLease:
+    @pytest.fixture
+    def message(self, db):
+        return baker.make(Message, content="Olá", status=Message.Status.PENDING)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_provider_is_called_outside_transaction(self, message):
+        def moderate(content):
+            assert not connection.in_atomic_block
+            assert Message.objects.get(id=message.id).moderation_lease_owner != ""
+            return ModerationResult(verdict="APPROVED", provider="local_dictionary", score=1.0, details={})
+
+        with (
+            patch("app.moderation.services.moderator.ModerationService.moderate", side_effect=moderate),
+            patch("app.chat.services.broadcast_service.BroadcastService.broadcast_message_to_room"),
+        ):
+            result = moderate_message_task(str(message.id))
+
+        message.refresh_from_db()
+        assert result["status"] == "success"
+        assert message.status == Message.Status.APPROVED
+        assert message.moderation_lease_owner == ""
+        assert message.moderation_lease_expires_at is None
+
+    def test_active_lease_from_another_worker_is_respected(self, message):
+        Message.objects.filter(id=message.id).update(
+            moderation_lease_owner="other-task", moderation_lease_expires_at=timezone.now() + timedelta(minutes=1)
+        )
+
+        with patch("app.moderation.services.moderator.ModerationService.moderate") as mock_moderate:
+            result = moderate_message_task(str(message.id))
+
+        assert result["status"] == "skipped"
+        mock_moderate.assert_not_called()
+
+    def test_lost_lease_discards_verdict(self, message):
+        def moderate(content):
+            Message.objects.filter(id=message.id).update(moderation_lease_owner="other-task")
+            return ModerationResult(verdict="APPROVED", provider="local_dictionary", score=1.0, details={})
+
+        with (
+            patch("app.moderation.services.moderator.ModerationService.moderate", side_effect=moderate),
+            patch("app.chat.services.broadcast_service.BroadcastService.broadcast_message_to_room") as mock_broadcast,
+        ):
+            result = moderate_message_task(str(message.id))
+
+        message.refresh_from_db()
+        assert result["status"] == "skipped"
+        assert message.status == Message.Status.PENDING
+        assert not ModerationLog.objects.filter(message=message).exists()
+        mock_broadcast.assert_not_called()
+
+    def test_expired_leases_are_requeued(self, message):
+        fresh = baker.make(Message, status=Message.Status.PENDING)
+        Message.objects.filter(id=message.id).update(
+            moderation_lease_owner="dead-worker", moderation_lease_expires_at=timezone.now() - timedelta(seconds=1)
+        )
+
+        with patch("app.moderation.tasks.moderate_message_task.delay") as mock_delay:
+            result = requeue_stale_moderations_task()
+
+        assert result["requeued"] == 1
+        mock_delay.assert_called_once_with(str(message.id))
+        message.refresh_from_db()
+        assert message.moderation_lease_owner == ""
+        assert message.moderation_lease_expires_at > timezone.now()
+        assert Message.objects.get(id=fresh.id).moderation_lease_expires_at is None
@@ -157,6 +157,14 @@ REDIS_PORT = config("REDIS_PORT", default="6379")
 REDIS_PASSWORD = config("REDIS_PASSWORD", default="")
 REDIS_URL = f"redis://:{REDIS_PASSWORD}@{REDIS_HOST}:{REDIS_PORT}/0"
 
+# Cache Configuration
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": f"redis://:{REDIS_PASSWORD}@{REDIS_HOST}:{REDIS_PORT}/1",
+    },
+}
+
 # Django Channels Configuration
 CHANNEL_LAYERS = {
     "default": {
@@ -166,6 +174,45 @@ CHANNEL_LAYERS = {
         },
     },
 }
+# Tempo máximo de espera por um envio ao channel layer a partir de código síncrono (tasks Celery)
+BROADCAST_TIMEOUT_SECONDS = config("BROADCAST_TIMEOUT_SECONDS", default=5, cast=int)
+# Buffer de replay por sala: últimos frames aprovados, reenviados a quem reconecta com `last_seq`
+ROOM_REPLAY_CACHE_ALIAS = "default"
+ROOM_REPLAY_BUFFER_SIZE = config("ROOM_REPLAY_BUFFER_SIZE", default=500, cast=int)
+ROOM_REPLAY_TTL = config("ROOM_REPLAY_TTL", default=3600, cast=int)
+# Máximo de salas assinadas por conexão multiplexada (`ws/chat/`)
+WS_MAX_SUBSCRIPTIONS = config("WS_MAX_SUBSCRIPTIONS", default=100, cast=int)
+# Fila de saída por conexão: máximo de frames pendentes e política ao encher
+# (drop_oldest, coalesce ou disconnect)
+WS_OUTBOUND_QUEUE_SIZE = config("WS_OUTBOUND_QUEUE_SIZE", default=256, cast=int)
+WS_OUTBOUND_OVERFLOW_POLICY = config("WS_OUTBOUND_OVERFLOW_POLICY", default="coalesce")
+# Agrupamento adaptativo: acima de N chat_message/s por conexão (0 desliga), os eventos de uma
+# janela curta saem num único frame `chat_messages`
+WS_COALESCE_RATE_THRESHOLD = config("WS_COALESCE_RATE_THRESHOLD", default=50, cast=float)
+WS_COALESCE_WINDOW_MS = config("WS_COALESCE_WINDOW_MS", default=30, cast=int)
+WS_COALESCE_MAX_BATCH = config("WS_COALESCE_MAX_BATCH", default=100, cast=int)
+# Subprotocolo `chat.msgpack.v1` (frames MessagePack compactos); os eventos de fan-out passam a
+# levar também o frame codificado em MessagePack
+WS_MSGPACK_ENABLED = config("WS_MSGPACK_ENABLED", default=True, cast=bool)
+# permessage-deflate (worker `ChatUvicornWorker`): mensagens menores que WS_DEFLATE_MIN_SIZE bytes
+# saem sem compressão; janela de 2^12 e memLevel 5 mantêm o compressor em ~32 KB por conexão
+WS_DEFLATE_ENABLED = config("WS_DEFLATE_ENABLED", default=True, cast=bool)
+WS_DEFLATE_MIN_SIZE = config("WS_DEFLATE_MIN_SIZE", default=256, cast=int)
+WS_DEFLATE_LEVEL = config("WS_DEFLATE_LEVEL", default=3, cast=int)
+WS_DEFLATE_WINDOW_BITS = config("WS_DEFLATE_WINDOW_BITS", default=12, cast=int)
+WS_DEFLATE_MEM_LEVEL = config("WS_DEFLATE_MEM_LEVEL", default=5, cast=int)
+# Rate limit de `chat_message` (token bucket): rajada máxima e reposição em mensagens por segundo,
+# por usuário em cada sala e por usuário em todas as salas
+CHAT_RATE_LIMIT_ENABLED = config("CHAT_RATE_LIMIT_ENABLED", default=True, cast=bool)
+CHAT_RATE_LIMIT_CACHE_ALIAS = "default"
+CHAT_RATE_LIMIT_ROOM_BURST = config("CHAT_RATE_LIMIT_ROOM_BURST", default=5, cast=int)
+CHAT_RATE_LIMIT_ROOM_PER_SECOND = config("CHAT_RATE_LIMIT_ROOM_PER_SECOND", default=1.0, cast=float)
+CHAT_RATE_LIMIT_USER_BURST = config("CHAT_RATE_LIMIT_USER_BURST", default=15, cast=int)
+CHAT_RATE_LIMIT_USER_PER_SECOND = config("CHAT_RATE_LIMIT_USER_PER_SECOND", default=3.0, cast=float)
+# Buffer de escrita de `chat_message`: as mensagens de até CHAT_WRITE_BUFFER_WINDOW_MS ms são gravadas com
+# um único bulk_create (0 desativa: um INSERT por mensagem)
+CHAT_WRITE_BUFFER_WINDOW_MS = config("CHAT_WRITE_BUFFER_WINDOW_MS", default=0, cast=int)
+CHAT_WRITE_BUFFER_MAX_SIZE = config("CHAT_WRITE_BUFFER_MAX_SIZE", default=100, cast=int)
 
 # RabbitMQ Configuration
 RABBITMQ_HOST = config("RABBITMQ_HOST", default="localhost")
@@ -178,21 +225,50 @@ RABBITMQ_URL = f"amqp://{RABBITMQ_USER}:{RABBITMQ_PASSWORD}@{RABBITMQ_HOST}:{RAB
 
 # Celery Configuration
 CELERY_BROKER_URL = config("CELERY_BROKER_URL", default=RABBITMQ_URL)
+# Publisher confirms: o publish só retorna após o ack do broker
+CELERY_BROKER_TRANSPORT_OPTIONS = {"confirm_publish": True}
+# Threads dedicadas para publicar tasks a partir do event loop ASGI
+TASK_PUBLISH_THREADS = config("TASK_PUBLISH_THREADS", default=2, cast=int)
+CELERY_BEAT_SCHEDULE = {
+    "requeue-stale-moderations": {
+        "task": "app.moderation.tasks.requeue_stale_moderations_task",
+        "schedule": config("MODERATION_LEASE_SWEEP_SECONDS", default=60, cast=int),
+    },
+}
 
 # Moderation Configuration
 MODERATION_PROVIDER = config("MODERATION_PROVIDER", default="local")
 GOOGLE_API_KEY = config("GOOGLE_API_KEY", default="")
 GEMINI_MODEL = config("GEMINI_MODEL", default="gemini-2.0-flash-exp")
+GEMINI_MAX_CONNECTIONS = config("GEMINI_MAX_CONNECTIONS", default=10, cast=int)
+GEMINI_KEEPALIVE_EXPIRY = config("GEMINI_KEEPALIVE_EXPIRY", default=120.0, cast=float)
 PROFANITY_LIST = config(
     "PROFANITY_LIST",
     default="bobo,idiota,estupido",
     cast=Csv(),
 )
+# Micro-batching: 1 desativa (uma task por mensagem)
+MODERATION_BATCH_SIZE = config("MODERATION_BATCH_SIZE", default=1, cast=int)
+MODERATION_BATCH_WINDOW_MS = config("MODERATION_BATCH_WINDOW_MS", default=200, cast=int)
+# Lease de moderação: deve ser maior que o task_time_limit (300s) das tasks de moderação
+MODERATION_LEASE_SECONDS = config("MODERATION_LEASE_SECONDS", default=330, cast=int)
+# Cache de veredictos (LRU local + cache compartilhado)
+MODERATION_CACHE_ENABLED = config("MODERATION_CACHE_ENABLED", default=True, cast=bool)
+MODERATION_CACHE_ALIAS = "default"
+MODERATION_CACHE_TTL = config("MODERATION_CACHE_TTL", default=3600, cast=int)
+MODERATION_CACHE_LOCAL_SIZE = config("MODERATION_CACHE_LOCAL_SIZE", default=5000, cast=int)
+MODERATION_POLICY_VERSION = config("MODERATION_POLICY_VERSION", default="1")
+# Worker de moderação: "celery" (tasks na fila) ou "asyncio" (busca PENDING no banco, N chamadas simultâneas)
+MODERATION_WORKER_MODE = config("MODERATION_WORKER_MODE", default="celery")
+MODERATION_ASYNC_CONCURRENCY = config("MODERATION_ASYNC_CONCURRENCY", default=32, cast=int)
+MODERATION_ASYNC_POLL_INTERVAL_MS = config("MODERATION_ASYNC_POLL_INTERVAL_MS", default=250, cast=int)
+# Mesmo papel do task_soft_time_limit das tasks Celery; deve ser menor que MODERATION_LEASE_SECONDS
+MODERATION_ASYNC_TIMEOUT_SECONDS = config("MODERATION_ASYNC_TIMEOUT_SECONDS", default=290, cast=int)
 
 # Django REST Framework Configuration
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "app.accounts.authentication.CachedJWTAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
@@ -202,6 +278,14 @@ REST_FRAMEWORK = {
     "EXCEPTION_HANDLER": "app.utils.exceptions.custom_exception_handler",
 }
 
+# Sincronização incremental do histórico (`?since=`): margem para commits em andamento
+MESSAGE_SYNC_SETTLE_SECONDS = config("MESSAGE_SYNC_SETTLE_SECONDS", default=2, cast=int)
+
+# Cache da primeira página do histórico (mensagens aprovadas por sala + overlay por usuário)
+MESSAGE_HISTORY_CACHE_ENABLED = config("MESSAGE_HISTORY_CACHE_ENABLED", default=True, cast=bool)
+MESSAGE_HISTORY_CACHE_ALIAS = "default"
+MESSAGE_HISTORY_CACHE_TTL = config("MESSAGE_HISTORY_CACHE_TTL", default=300, cast=int)
+
 # Logging Configuration
 LOGGING = {
     "version": 1,
@@ -276,6 +360,14 @@ SIMPLE_JWT = {
     "USER_ID_CLAIM": "user_id",
 }
 
+# Cache de usuários autenticados por JWT (WebSocket e REST). Desativações valem na hora no
+# processo que as fez e no nível compartilhado; nos demais processos, em até USER_CACHE_LOCAL_TTL segundos
+USER_CACHE_TTL = config("USER_CACHE_TTL", default=30, cast=int)
+USER_CACHE_LOCAL_TTL = config("USER_CACHE_LOCAL_TTL", default=2, cast=int)
+USER_CACHE_LOCAL_SIZE = config("USER_CACHE_LOCAL_SIZE", default=10000, cast=int)
+USER_CACHE_SHARED_ENABLED = config("USER_CACHE_SHARED_ENABLED", default=True, cast=bool)
+USER_CACHE_ALIAS = "default"
+
 # drf-spectacular (Swagger/OpenAPI) Configuration
 SPECTACULAR_SETTINGS = {
     "TITLE": "Moderated Chat API",
@@ -1,4 +1,12 @@
-from rest_framework.pagination import PageNumberPagination
+import uuid
+from base64 import b64decode, b64encode
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
 
 class CustomPageNumberPagination(PageNumberPagination):
@@ -9,3 +17,108 @@ class CustomPageNumberPagination(PageNumberPagination):
     page_size = 25
     page_size_query_param = "page_size"
     max_page_size = 100
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginação keyset em (created_at, id), do mais recente para o mais antigo.
+
+    A chave é o primeiro campo de `ordering` desempatado pelo id; subclasses podem
+    trocar o campo e o sentido (ex: `("updated_at", "id")` para sincronização).
+
+    Aceita um queryset ou uma lista de "ramos" disjuntos (ex: salas públicas e salas
+    privadas do usuário). Cada ramo é filtrado pela posição do cursor e limitado antes
+    de ser combinado com UNION ALL, então cada um pode usar o próprio índice e nenhuma
+    página exige COUNT ou OFFSET.
+    """
+
+    page_size = 25
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    ordering = ("-created_at", "-id")
+    invalid_cursor_message = "Cursor inválido"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        position = self.decode_cursor(request)
+        limit = self.page_size + 1
+
+        branches = list(queryset) if isinstance(queryset, (list, tuple)) else [queryset]
+        branches = [self._after(branch, position).order_by(*self.ordering)[:limit] for branch in branches]
+
+        combined = branches[0]
+        if len(branches) > 1:
+            combined = branches[0].union(*branches[1:], all=True).order_by(*self.ordering)[:limit]
+
+        rows = list(combined)
+        self.has_next = len(rows) > self.page_size
+        rows = rows[: self.page_size]
+        self.last_position = (getattr(rows[-1], self.key_field), rows[-1].id) if rows else position
+        self.next_position = self.last_position if self.has_next else None
+        return rows
+
+    def get_page_size(self, request) -> int:
+        if not self.page_size_query_param:
+            return self.page_size
+        try:
+            requested = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(requested, self.max_page_size))
+
+    @property
+    def key_field(self) -> str:
+        return self.ordering[0].lstrip("-")
+
+    def _after(self, queryset, position):
+        if position is None:
+            return queryset
+        value, pk = position
+        lookup = "lt" if self.ordering[0].startswith("-") else "gt"
+        return queryset.filter(
+            Q(**{f"{self.key_field}__{lookup}": value}) | Q(**{self.key_field: value, f"id__{lookup}": pk})
+        )
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            value, pk = b64decode(encoded.encode(), altchars=b"-_").decode().split("|")
+            return datetime.fromisoformat(value), uuid.UUID(pk)
+        except (ValueError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    @staticmethod
+    def encode_position(position) -> str:
+        """Token opaco (base64 de "timestamp|id") de uma posição da chave."""
+        value, pk = position
+        return b64encode(f"{value.isoformat()}|{pk}".encode(), altchars=b"-_").decode()
+
+    def encode_cursor(self, position) -> str:
+        encoded = self.encode_position(position)
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, encoded)
+
+    def get_next_link(self) -> str | None:
+        return self.encode_cursor(self.next_position) if self.has_next else None
+
+    def get_previous_link(self) -> None:
+        # Só há cursor para frente; o campo segue na resposta por compatibilidade com a paginação anterior
+        return None
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "previous": self.get_previous_link(), "results": data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
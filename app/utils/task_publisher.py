@@ -0,0 +1,69 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import structlog
+from celery import Task
+from celery.result import AsyncResult
+from django.conf import settings
+
+logger = structlog.get_logger(__name__)
+
+
+class TaskPublisher:
+    """
+    Publica tasks Celery a partir de código assíncrono sem bloquear o event loop.
+
+    `task.delay` faz um publish síncrono no broker (com publisher confirms, espera o
+    ack do RabbitMQ). Executado direto num consumer ASGI, um broker lento congela
+    todas as conexões do processo. Aqui o publish roda em threads dedicadas
+    (`TASK_PUBLISH_THREADS`), reaproveitando o pool de producers do Celery.
+    """
+
+    def __init__(self):
+        self._executor: ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=settings.TASK_PUBLISH_THREADS, thread_name_prefix="task-publisher"
+                    )
+        return self._executor
+
+    async def publish(self, task: Task, *args) -> AsyncResult:
+        """
+        Enfileira a task e aguarda a confirmação do broker sem bloquear o event loop.
+
+        Args:
+            task: Task Celery
+            *args: Argumentos posicionais da task
+
+        Returns:
+            AsyncResult da task publicada
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), functools.partial(task.delay, *args))
+
+    def submit(self, task: Task, *args) -> Future:
+        """
+        Enfileira a task em segundo plano, sem aguardar (ex: callbacks do event loop).
+
+        Falhas são apenas registradas em log; mensagens não publicadas permanecem
+        PENDING e são recuperadas pela varredura de leases.
+        """
+        future = self._get_executor().submit(task.delay, *args)
+        future.add_done_callback(functools.partial(self._log_failure, task.name))
+        return future
+
+    @staticmethod
+    def _log_failure(task_name: str, future: Future) -> None:
+        exc = future.exception()
+        if exc is not None:
+            logger.error("task_publish_failed", task=task_name, error=str(exc))
+
+
+task_publisher = TaskPublisher()
@@ -57,3 +57,38 @@ def use_in_memory_channel_layer(settings):
             "BACKEND": "channels.layers.InMemoryChannelLayer",
         },
     }
+
+
+@pytest.fixture(autouse=True)
+def reset_moderation_registry():
+    """Garante que instâncias de estratégias não vazem entre testes."""
+    from app.moderation.services.registry import strategy_registry
+
+    strategy_registry.reset()
+    yield
+    strategy_registry.reset()
+
+
+@pytest.fixture(autouse=True)
+def use_local_memory_cache(settings):
+    """Sobrescreve CACHES para usar LocMemCache nos testes e limpa os caches em memória do processo."""
+    from django.core.cache import cache
+
+    from app.accounts.services.user_cache import user_cache
+    from app.chat.services.rate_limiter import message_rate_limiter
+    from app.moderation.services.verdict_cache import verdict_cache
+
+    settings.CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        },
+    }
+    cache.clear()
+    verdict_cache.clear()
+    user_cache.clear()
+    message_rate_limiter.reset()
+    yield
+    cache.clear()
+    verdict_cache.clear()
+    user_cache.clear()
+    message_rate_limiter.reset()
@@ -16,7 +16,7 @@ else
 
     echo "Starting Gunicorn ..."
     exec uv run gunicorn app.asgi:application \
-        -k uvicorn.workers.UvicornWorker \
+        -k app.chat.websockets.compression.ChatUvicornWorker \
         -w 1 \
         --threads 2 \
         -b 0.0.0.0:8000
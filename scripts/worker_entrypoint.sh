@@ -4,10 +4,17 @@ set -o errexit
 set -o pipefail
 set -o nounset
 
+if [ "${MODERATION_WORKER_MODE:-celery}" = "asyncio" ]; then
+    echo "Starting asyncio moderation worker ..."
+    exec uv run python manage.py run_moderation_worker
+fi
+
 echo "Starting Celery worker ..."
 exec uv run celery -A app worker \
     --loglevel=info \
     --concurrency=1 \
     --prefetch-multiplier=1 \
     --max-tasks-per-child=50 \
-    --optimization=fair
+    --optimization=fair \
+    --beat \
+    --schedule=/tmp/celerybeat-schedule